@@ -2,6 +2,10 @@
 ASGI config for college project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The read views of dataStore are served as async views in this mode, see
+DATASTORE_ASYNC_VIEWS. Run it with, e.g.::
+
+    uvicorn college.asgi:application --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
@@ -12,5 +16,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'college.settings')
+os.environ.setdefault('asgi', '1')
 
 application = get_asgi_application()
+
+# compile the admin templates before the first request, see dataStore.warmup.
+from dataStore.warmup import warm_templates
+
+warm_templates()
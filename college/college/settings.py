@@ -55,6 +55,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'dataStore.middleware.StaticFilesMiddleware',
+    'dataStore.middleware.RequestTimingMiddleware',
+    'dataStore.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,10 +79,14 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
         'OPTIONS': {
+            # templates are compiled once per process, see dataStore.warmup;
+            # the dev server empties the cache when a template changes.
             'loaders': [
-                'apptemplates.Loader',
-                'django.template.loaders.filesystem.Loader',
-                'django.template.loaders.app_directories.Loader',
+                ('django.template.loaders.cached.Loader', [
+                    'apptemplates.Loader',
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -101,21 +108,106 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # keep connections across requests, see DATASTORE_SQLITE_PRAGMAS.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pragmas run on every new SQLite connection, see dataStore.sqlite. An empty
+# dict keeps the SQLite defaults.
+DATASTORE_SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'memory',
+}
+# WAL lets readers go on while the admin writes, but it is recorded in the
+# database file and leaves -wal and -shm files next to it, so it is only
+# turned on for a deployed database, with sqlite_wal=1.
+if os.getenv('sqlite_wal') == '1':
+    DATASTORE_SQLITE_PRAGMAS.update(journal_mode='wal', synchronous='normal')
+DATASTORE_SQLITE_MAINTENANCE_INTERVAL = 3600
+
+# Read replicas
+# Point "replica" at a copy of the database kept up to date by replication
+# to send the reads of dataStore, the admin log and the sessions there, see
+# dataStore.routers. Writes and the reads that follow them use "default".
+if os.getenv('replica'):
+    DATABASES['replica'] = dict(DATABASES['default'], NAME=os.getenv('replica'),
+        TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['dataStore.routers.ReplicaRouter']
+DATASTORE_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATASTORE_REPLICA_PIN_SECONDS = 5
+
+
+# Caches
+# "default" is shared by the worker processes: the changelist count versions,
+# the counts and the cached sessions live there. Set "cache" to a directory
+# for the file backend, or to a memcached address ("unix:/run/memcached.sock"
+# or "host:port", needs pymemcache), so every worker sees the invalidations of
+# the others. Unset, each process has its own, which only suits a single one.
+# "local" is per process, in front of "default" for values keyed by version.
+CACHE_LOCATION = os.getenv('cache', '')
+if not CACHE_LOCATION:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'}
+elif CACHE_LOCATION.startswith('unix:') or (':' in CACHE_LOCATION and not os.path.isabs(CACHE_LOCATION)):
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_LOCATION}
+else:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION, 'OPTIONS': {'MAX_ENTRIES': 20000}}
+CACHES = {
+    'default': dict(SHARED_CACHE, KEY_PREFIX='college'),
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+
+# Sessions
+# "sessions" picks the engine: "cached_db" (the default with a shared cache)
+# reads sessions from the cache and only writes django_session when they
+# change, "signed_cookies" keeps them in the browser and never touches the
+# database, "db" reads the table on every request. Expired rows are deleted by
+# "manage.py purge_sessions", DATASTORE_SESSION_PURGE_BATCH at a time.
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[os.getenv('sessions', 'cached_db' if CACHE_LOCATION else 'db')]
+SESSION_CACHE_ALIAS = 'default'
+DATASTORE_SESSION_PURGE_BATCH = 1000
+
 
 
 #Email config
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_USE_TLS = True
-EMAIL_PORT = 587
+EMAIL_BACKEND = 'dataStore.mail.QueuedEmailBackend'
+EMAIL_HOST = os.getenv('email_host', 'smtp.gmail.com')
+EMAIL_USE_TLS = os.getenv('email_tls', '1') == '1'
+EMAIL_PORT = int(os.getenv('email_port', 587))
+EMAIL_TIMEOUT = 30
 EMAIL_HOST_USER = os.getenv('Gmail_Address')
 EMAIL_HOST_PASSWORD = os.getenv('Gmail_App_Password')
 EMAIL_USE_SSL = False
 
+# Outbound mail queue
+# Requests only queue their mail, see dataStore.mail. "manage.py
+# send_queued_mail --loop" sends it through DATASTORE_MAIL_BACKEND, retrying
+# a failed message after DATASTORE_MAIL_RETRY_SECONDS, doubled per attempt up
+# to DATASTORE_MAIL_RETRY_MAX_SECONDS, DATASTORE_MAIL_MAX_ATTEMPTS times. For a
+# local SMTP stand-in, run e.g. "python -m aiosmtpd -n -l localhost:1025" with
+# email_host=localhost email_port=1025 email_tls=0.
+DATASTORE_MAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+DATASTORE_MAIL_BATCH = 50
+DATASTORE_MAIL_MAX_ATTEMPTS = 6
+DATASTORE_MAIL_RETRY_SECONDS = 60
+DATASTORE_MAIL_RETRY_MAX_SECONDS = 3600
+
 
 
 # Password validation
@@ -165,7 +257,57 @@ MEDIA_ROOT = 'media/'
 STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 
+# Outside DEBUG, collectstatic writes content hashed names with gzip (and
+# brotli, when installed) variants, which dataStore.middleware.StaticFilesMiddleware
+# serves when DATASTORE_SERVE_STATIC is on: hashed names are cached for a year,
+# the others for DATASTORE_STATIC_MAX_AGE seconds.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'dataStore.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+DATASTORE_SERVE_STATIC = not DEBUG
+DATASTORE_STATIC_MAX_AGE = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Admin changelist counts
+# Filtered counts stop after DATASTORE_COUNT_LIMIT rows, and every count is
+# cached for DATASTORE_COUNT_TIMEOUT seconds or until the next write.
+DATASTORE_COUNT_LIMIT = 10000
+DATASTORE_COUNT_TIMEOUT = 300
+
+
+# Admin log retention
+# "manage.py archive_log_entries" moves the entries older than
+# DATASTORE_LOG_RETENTION_DAYS to gzipped JSONL files in DATASTORE_LOG_ARCHIVE_DIR.
+DATASTORE_LOG_RETENTION_DAYS = 365
+DATASTORE_LOG_ARCHIVE_DIR = BASE_DIR / 'archive'
+
+
+# Flattened student and lecturer read models, see dataStore.readmodels.
+# migrate fills them when this is on; after turning it on later, fill them
+# with "manage.py check_read_models --repair".
+DATASTORE_READ_MODELS = True
+
+
+# Request timing
+# Share of requests sent back with a Server-Timing header; those slower than
+# DATASTORE_SLOW_REQUEST_MS are logged to "dataStore.timing" with their
+# slowest queries and any statement run DATASTORE_DUPLICATE_QUERIES times.
+DATASTORE_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+DATASTORE_SLOW_REQUEST_MS = 500
+DATASTORE_DUPLICATE_QUERIES = 5
+
+
+# ASGI
+# college/asgi.py sets "asgi", which serves the read views as native async
+# views. Under WSGI they stay sync: an async view there costs an event loop
+# per request.
+DATASTORE_ASYNC_VIEWS = bool(os.getenv('asgi'))
@@ -24,6 +24,7 @@ urlpatterns = [
     path("i18n/", include("django.conf.urls.i18n")),
     path('data/', admin.site.urls),
     path('', include(('dataStore.urls', 'dataStore'), namespace='app')),
+    path('api/', include(('dataStore.api', 'api'), namespace='api')),
     path('^admin/', admin.site.urls),
     path('doc/', include('django.contrib.admindocs.urls')),
     path('admin/password_reset/', auth_views.PasswordResetView.as_view(),name='admin_password_reset',),
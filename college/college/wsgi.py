@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'college.settings')
 
 application = get_wsgi_application()
+
+# compile the admin templates before the first request, see dataStore.warmup.
+from dataStore.warmup import warm_templates
+
+warm_templates()
@@ -1,8 +1,18 @@
 
 from django.contrib import admin
 from django.contrib.admin.models import LogEntry
-from .models import Person, Lecturer, Student, Department, Faculty 
-from .form import StudentAdminForm
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from .models import Person, Lecturer, Student, Department, Faculty, StudentRecord, LecturerRecord, QueuedMail
+from . import readmodels, stats
+from .audit import BulkAuditMixin
+from .autocomplete import IndexedAutocompleteMixin
+from .export import export_csv, export_jsonl
+from .filters import UsernameFilter, RegisteredContentTypeFilter
+from .pagination import CachedCountMixin
+from .reassign import reassign_selected
+from .search import FullTextSearchMixin, PERSON_INDEX, DEPARTMENT_INDEX, LOGENTRY_INDEX
 from django.utils.translation import gettext_lazy as _
 
 
@@ -17,7 +27,7 @@ admin.site.site_title = _("Data Admin")
 
 
 @admin.register(LogEntry)
-class LogEntryAdmin(admin.ModelAdmin):
+class LogEntryAdmin(CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
   
     """
     Register the django log table into the admin.
@@ -26,9 +36,10 @@ class LogEntryAdmin(admin.ModelAdmin):
     
     date_hierarchy = 'action_time'
 
+    # a text box for the user, and only the content types of the admin.
     list_filter = [
-        'user',
-        'content_type',
+        UsernameFilter,
+        RegisteredContentTypeFilter,
         'action_flag',
         'action_time'
     ]
@@ -39,12 +50,17 @@ class LogEntryAdmin(admin.ModelAdmin):
         'change_message'
     ]
 
+    search_index = LOGENTRY_INDEX
+
     list_display = [
         'action_time',
         'user',
         'content_type',
         'action_flag',
     ]
+
+    # content_type is nullable, so the admin does not join it by itself.
+    list_select_related = ('user', 'content_type')
     
     def has_add_permission(self, request):
         return False
@@ -62,8 +78,28 @@ class LogEntryAdmin(admin.ModelAdmin):
     
     
 
+class DisplayColumns:
+  
+  """
+  Sortable full name and address columns, built by the database with
+  :meth:`dataStore.models.PersonQuerySet.with_display`.
+  """
+  
+  def get_queryset(self, request):
+    return super().get_queryset(request).with_display()
+  
+  @admin.display(description=_('full name'), ordering='full_name')
+  def full_name(self, obj):
+    return obj.full_name
+  
+  @admin.display(description=_('address'), ordering='full_address')
+  def full_address(self, obj):
+    return obj.full_address
+
+
+
 @admin.register(Person)
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(BulkAuditMixin, DisplayColumns, CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
   
   """
     Register the person model into the admin.
@@ -86,19 +122,23 @@ class PersonAdmin(admin.ModelAdmin):
 
   ordering = ['first_name']
     
-  list_display = ('fullName', 'sex', 'address')
+  list_display = ('full_name', 'sex', 'full_address')
   
   list_filter = ('sex',)
   
   preserve_filters = False
 
   search_fields = ['first_name', 'middle_name', 'last_name']
+  
+  search_index = PERSON_INDEX
+  
+  actions = [export_csv, export_jsonl]
 
 
 
 
 @admin.register(Lecturer)
-class LecturerAdmin(admin.ModelAdmin):
+class LecturerAdmin(BulkAuditMixin, DisplayColumns, CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
   
   """
     Register the Lecturer model into the admin.
@@ -126,7 +166,7 @@ class LecturerAdmin(admin.ModelAdmin):
 
   ordering = ['first_name',]
   
-  list_display = ('fullName', 'rank', 'office_address')
+  list_display = ('full_name', 'rank', 'office_address')
   
   list_filter = ('sex', 'rank', 'salary')
   
@@ -134,12 +174,16 @@ class LecturerAdmin(admin.ModelAdmin):
 
   search_fields = ['first_name', 'middle_name', 'last_name']
   
+  search_index = PERSON_INDEX
+  
+  actions = [export_csv, export_jsonl, reassign_selected]
+  
 
 
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(BulkAuditMixin, IndexedAutocompleteMixin, DisplayColumns, CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
   
   """
     Register the student model into the admin.
@@ -163,13 +207,13 @@ class StudentAdmin(admin.ModelAdmin):
     }),
     )
   
-  form = StudentAdminForm
-
   date_hierarchy = 'time'
 
   ordering = ['first_name',]
   
-  list_display = ('fullName', 'level', 'minor', 'major')
+  list_display = ('full_name', 'level', 'minor', 'major')
+  
+  list_select_related = ('minor', 'major')
   
   list_filter = ('sex', 'level',)
   
@@ -177,13 +221,49 @@ class StudentAdmin(admin.ModelAdmin):
 
   search_fields = ['first_name', 'middle_name', 'last_name']
   
+  search_index = PERSON_INDEX
+  
+  actions = [export_csv, export_jsonl, reassign_selected]
+  
   autocomplete_fields = ['minor', 'major']
   
   
 
 
+class StatColumns:
+  
+  """
+  Sortable columns of the department counts annotated by
+  :func:`dataStore.stats.with_totals`.
+  """
+  
+  @admin.display(description=_('majors'), ordering='major_count')
+  def major_count(self, obj):
+    return obj.major_count
+  
+  @admin.display(description=_('minors'), ordering='minor_count')
+  def minor_count(self, obj):
+    return obj.minor_count
+  
+  @admin.display(description=_('lecturers'), ordering='lecturer_count')
+  def lecturer_count(self, obj):
+    return obj.lecturer_count
+
+
+
+def stats_table(departments):
+  "Render the counts of the departments by class and rank, for the change form."
+  counts = stats.breakdown(departments)
+  labels = dict(stats.DepartmentStat.kindType)
+  return format_html_join('', '<p><b>{}</b>: {}</p>', (
+    (labels[kind], ', '.join('%s %s' % (label, n) for label, n in values.items()) or '0')
+    for kind, values in counts.items()
+  ))
+
+
+
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(BulkAuditMixin, IndexedAutocompleteMixin, StatColumns, CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
   
   """
     Register the department model into the admin.
@@ -194,7 +274,9 @@ class DepartmentAdmin(admin.ModelAdmin):
 
   ordering = ['name',]
   
-  list_display = ('name', 'faculty', 'phone_no', 'office_no')
+  list_display = ('name', 'faculty', 'phone_no', 'office_no', 'major_count', 'minor_count', 'lecturer_count')
+  
+  list_select_related = ('faculty',)
   
   list_filter = ('faculty__name',)
   
@@ -202,12 +284,24 @@ class DepartmentAdmin(admin.ModelAdmin):
 
   search_fields = ['name',]
   
+  search_index = DEPARTMENT_INDEX
+  
   autocomplete_fields = ('faculty',)
+  
+  readonly_fields = ('statistics',)
+  
+  
+  def get_queryset(self, request):
+    return stats.with_totals(super().get_queryset(request))
+  
+  @admin.display(description=_('statistics'))
+  def statistics(self, obj):
+    return stats_table([obj.pk])
 
 
 
 @admin.register(Faculty)
-class FacultyAdmin(admin.ModelAdmin):
+class FacultyAdmin(BulkAuditMixin, StatColumns, CachedCountMixin, admin.ModelAdmin):
   
   """
     Register the faculty model into the admin.
@@ -218,9 +312,126 @@ class FacultyAdmin(admin.ModelAdmin):
 
   ordering = ['name',]
   
-  list_display = ('name', 'dean', 'phone_no')
+  list_display = ('name', 'dean', 'phone_no', 'major_count', 'minor_count', 'lecturer_count')
   
   search_fields = ['name',]
+  
+  readonly_fields = ('statistics',)
+  
+  
+  def get_queryset(self, request):
+    return stats.with_totals(super().get_queryset(request), 'department__faculty')
+  
+  @admin.display(description=_('statistics'))
+  def statistics(self, obj):
+    return stats_table(Department.objects.filter(faculty=obj.pk).values('pk'))
+
+
+
+
+
+
+
+class RecordAdmin(CachedCountMixin, FullTextSearchMixin, admin.ModelAdmin):
+  
+  """
+    Read-only changelist over a flattened read model.
+    Rows link to the change page of the student or lecturer they copy.
+    Only shown while DATASTORE_READ_MODELS is on.
+  """
+  
+  source = None
+  
+  ordering = ['first_name',]
+  
+  list_display_links = None
+  
+  preserve_filters = False
+
+  search_fields = ['first_name', 'middle_name', 'last_name']
+  
+  search_index = PERSON_INDEX
+  
+  actions = [export_csv, export_jsonl]
+  
+  @admin.display(description=_('full name'), ordering='full_name')
+  def person(self, obj):
+    url = reverse('admin:dataStore_%s_change' % self.source._meta.model_name, args=[obj.pk])
+    return format_html('<a href="{}">{}</a>', url, obj.full_name)
+  
+  def has_module_permission(self, request):
+    return readmodels.enabled() and super().has_module_permission(request)
+  
+  def has_add_permission(self, request):
+    return False
+
+  def has_change_permission(self, request, obj=None):
+    return False
+
+  def has_delete_permission(self, request, obj=None):
+    return False
 
 
 
+@admin.register(StudentRecord)
+class StudentRecordAdmin(RecordAdmin):
+  
+  """
+    Register the student read model into the admin.
+  """
+  
+  source = Student
+  
+  list_display = ('person', 'level', 'minor', 'major')
+  
+  list_filter = ('sex', 'level',)
+
+
+
+@admin.register(LecturerRecord)
+class LecturerRecordAdmin(RecordAdmin):
+  
+  """
+    Register the lecturer read model into the admin.
+  """
+  
+  source = Lecturer
+  
+  list_display = ('person', 'rank', 'office_address')
+  
+  list_filter = ('sex', 'rank', 'salary')
+
+
+
+@admin.action(description=_('Send selected mail again'), permissions=['change'])
+def send_again(modeladmin, request, queryset):
+  count = queryset.update(status='queued', attempts=0, send_after=timezone.now())
+  modeladmin.message_user(request, _('%d messages queued again.') % count)
+
+
+
+@admin.register(QueuedMail)
+class QueuedMailAdmin(admin.ModelAdmin):
+  
+  """
+    Mail waiting for, or given up by, manage.py send_queued_mail.
+  """
+  
+  list_display = ('subject', 'recipient_list', 'status', 'attempts', 'send_after', 'last_error')
+  
+  list_filter = ('status',)
+  
+  ordering = ['send_after',]
+  
+  exclude = ('message',)
+  
+  readonly_fields = ('from_email', 'recipients', 'subject', 'status', 'attempts', 'send_after', 'last_error', 'time')
+  
+  actions = [send_again]
+  
+  @admin.display(description=_('recipients'))
+  def recipient_list(self, obj):
+    return ', '.join(obj.recipients)
+  
+  def has_add_permission(self, request):
+    return False
@@ -0,0 +1,184 @@
+"""
+Read-only JSON API over faculties, departments, lecturers and students.
+
+Lists are paged with keyset cursors: a page holds the rows after the sort key
+of the last row of the previous page, on ``(time, id)`` for people and on the
+natural primary key otherwise, so any page costs what the first one does.
+``?fields=`` picks the columns to return, the admin ``list_filter`` fields
+filter on exact values, ``?limit=`` sets the page size. Rows are read with
+``values()``, no model instance is created. Students and lecturers are read
+from their read models when those are on.
+
+Clients log in like admin users and need the view permission of the model.
+"""
+
+
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import path
+
+from . import readmodels
+from .models import Lecturer, Student, Department, Faculty
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+PERSON_FIELDS = ('id',) + readmodels.PERSON_FIELDS
+
+
+
+
+class Resource:
+
+  """
+  A model served by the API: the fields clients may ask for, the admin
+  filters and the sort key of its pages.
+  """
+
+  def __init__(self, model, fields, filters=(), keyset=('pk',)):
+    self.model = model
+    self.fields = fields
+    self.filters = filters
+    self.keyset = keyset
+
+  @property
+  def permission(self):
+    return '%s.view_%s' % (self.model._meta.app_label, self.model._meta.model_name)
+
+  def queryset(self):
+    if self.model in readmodels.RECORDS and readmodels.enabled():
+      return readmodels.RECORDS[self.model].objects.all()
+    return self.model.objects.all()
+
+  def query(self, params):
+    """
+    Return the queryset of the page asked for by the query params and the
+    fields to return. Raise ValidationError on a bad parameter.
+    """
+    fields = self.fields
+    if params.get('fields'):
+      fields = tuple(params['fields'].split(','))
+      unknown = set(fields) - set(self.fields)
+      if unknown:
+        raise ValidationError('Unknown fields: %s.' % ', '.join(sorted(unknown)))
+
+    try:
+      limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+      raise ValidationError('limit must be a number.')
+    if limit < 1:
+      raise ValidationError('limit must be positive.')
+
+    rows = self.queryset().filter(**{
+      name: params[name] for name in self.filters if name in params
+    })
+    if params.get('cursor'):
+      rows = rows.filter(self.after(self.cursor_values(params['cursor'], rows.model)))
+    columns = dict.fromkeys(fields + tuple(self.keyset))
+    rows = rows.order_by(*self.keyset).values(*columns)[:limit + 1]
+    return rows, fields, limit
+
+  def cursor_values(self, cursor, model):
+    "Return the keyset values of a cursor, checked by the fields of model."
+    values = decode_cursor(cursor, self.keyset)
+    fields = [model._meta.pk if name == 'pk' else model._meta.get_field(name) for name in self.keyset]
+    try:
+      values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+      raise ValidationError('Invalid cursor.')
+    if None in values:
+      raise ValidationError('Invalid cursor.')
+    return values
+
+  def after(self, values):
+    "Return the filter on the rows sorted after the given keyset values."
+    condition = Q()
+    for n in reversed(range(len(self.keyset))):
+      equal = {name: value for name, value in zip(self.keyset[:n], values)}
+      condition |= Q(**equal, **{'%s__gt' % self.keyset[n]: values[n]})
+    return condition
+
+  def page(self, request, rows, fields, limit):
+    "Return the JSON payload of a page from its rows, one more than limit if any."
+    payload = {'results': [{name: row[name] for name in fields} for row in rows[:limit]]}
+    payload['next'] = None
+    if len(rows) > limit:
+      params = request.GET.copy()
+      params['cursor'] = encode_cursor([rows[limit - 1][name] for name in self.keyset])
+      payload['next'] = request.build_absolute_uri('?' + params.urlencode())
+    return payload
+
+
+RESOURCES = {
+  'faculties': Resource(Faculty, ('name', 'dean', 'phone_no', 'time')),
+  'departments': Resource(Department, ('name', 'phone_no', 'office_no', 'faculty', 'time'),
+    filters=('faculty__name',)),
+  'lecturers': Resource(Lecturer,
+    PERSON_FIELDS + ('rank', 'salary', 'office_address', 'office_phone', 'department'),
+    filters=('sex', 'rank', 'salary'), keyset=('time', 'id')),
+  'students': Resource(Student, PERSON_FIELDS + ('level', 'minor', 'major'),
+    filters=('sex', 'level'), keyset=('time', 'id')),
+}
+
+
+def encode_cursor(values):
+  # isoformat() keeps the microseconds that DjangoJSONEncoder drops.
+  text = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+  return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keyset):
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+  except ValueError:
+    raise ValidationError('Invalid cursor.')
+  if not isinstance(values, list) or len(values) != len(keyset):
+    raise ValidationError('Invalid cursor.')
+  if not all(isinstance(value, (str, int, float)) for value in values):
+    raise ValidationError('Invalid cursor.')
+  return values
+
+
+def error(message, status):
+  return JsonResponse({'error': message}, status=status)
+
+
+def denied(user):
+  return error('Permission denied.' if user.is_authenticated else 'Authentication required.', 403)
+
+
+def list_view(resource):
+  "Return the list view of resource, async for ASGI deployments."
+
+  def view(request):
+    if not request.user.has_perm(resource.permission):
+      return denied(request.user)
+    try:
+      rows, fields, limit = resource.query(request.GET)
+    except ValidationError as e:
+      return error(e.message, 400)
+    return JsonResponse(resource.page(request, list(rows), fields, limit))
+
+  async def aview(request):
+    user = await request.auser()
+    if not await sync_to_async(user.has_perm)(resource.permission):
+      return denied(user)
+    try:
+      rows, fields, limit = resource.query(request.GET)
+    except ValidationError as e:
+      return error(e.message, 400)
+    return JsonResponse(resource.page(request, [row async for row in rows], fields, limit))
+
+  return aview if settings.DATASTORE_ASYNC_VIEWS else view
+
+
+urlpatterns = [
+  path('%s/' % name, list_view(resource), name=name) for name, resource in RESOURCES.items()
+]
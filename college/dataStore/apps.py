@@ -6,4 +6,7 @@ class DatastoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dataStore'
     verbose_name = _('data store')
+
+    def ready(self):
+        from . import signals
    
@@ -0,0 +1,162 @@
+"""
+Aggregated admin log entries for bulk actions.
+
+Django's admin logs a bulk deletion with one LogEntry, and one INSERT, per
+object. The dataStore admins use :class:`BulkAuditMixin` instead: deleting
+many objects with integer primary keys writes one entry whose change message
+lists them as compact ranges, ``[{"objects": "1-250,300"}]``, and one
+multi-row INSERT of :model:`dataStore.AuditRange` indexing them. Objects
+keyed by name, departments and faculties, keep an entry each, written by a
+single INSERT. :func:`history` finds the entries of an object through those
+ranges as well as by its ID, so the history page of each object still lists
+the bulk actions on it; :func:`dataStore.reassign.reassign` logs the same way.
+"""
+
+
+import json
+
+from django.contrib.admin.models import LogEntry, DELETION
+from django.contrib.admin.utils import unquote
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, router, transaction
+from django.db.models import Q
+from django.utils.text import Truncator
+
+from .bulk import insert_rows
+from .models import AuditRange
+
+
+# object names written in the summary of a bulk entry.
+SUMMARY_NAMES = 20
+
+
+def integer_pks(model):
+  "Whether the primary keys of model are integers, which AuditRange can index."
+  field = model._meta.pk
+  while field.is_relation:
+    field = field.target_field
+  return isinstance(field, models.IntegerField)
+
+
+def pk_ranges(pks):
+  "Return the (first, last) runs of consecutive integers in pks, in order."
+  runs = []
+  for pk in sorted({int(pk) for pk in pks}):
+    if runs and pk == runs[-1][1] + 1:
+      runs[-1][1] = pk
+    else:
+      runs.append([pk, pk])
+  return [tuple(run) for run in runs]
+
+
+def compact_pks(pks):
+  "Return pks as text, e.g. '1-250,300'."
+  return ','.join(str(first) if first == last else '%s-%s' % (first, last) for first, last in pk_ranges(pks))
+
+
+def parse_pks(text):
+  "Return the (first, last) runs of a compact_pks() text."
+  runs = []
+  for item in filter(None, text.split(',')):
+    first, sep, last = item.partition('-')
+    runs.append((int(first), int(last if sep else first)))
+  return runs
+
+
+def log_bulk_action(user, model, pks, action_flag, object_repr, change_message=(), using=None):
+  """
+  Write one admin log entry for an action of user on the objects pks of
+  model, and the ranges indexing them. Return the entry.
+  """
+  using = using or router.db_for_write(LogEntry)
+  ranges = pk_ranges(pks)
+  with transaction.atomic(using=using):
+    # not log_action(), which stores the object ID None as 'None'.
+    entry = LogEntry.objects.using(using).create(
+      user_id=user.pk,
+      content_type_id=ContentType.objects.db_manager(using).get_for_model(model).pk,
+      object_id=None,
+      object_repr=Truncator(object_repr).chars(200),
+      action_flag=action_flag,
+      change_message=json.dumps([*change_message, {'objects': compact_pks(pks)}]),
+    )
+    AuditRange.objects.using(using).bulk_create(
+      AuditRange(entry=entry, first=first, last=last) for first, last in ranges
+    )
+  return entry
+
+
+def log_objects(user, model, objects, action_flag, using=None):
+  """
+  Write the admin log entry of each (object, repr) of objects, as
+  log_action() does, with a single INSERT.
+  """
+  using = using or router.db_for_write(LogEntry)
+  content_type = ContentType.objects.db_manager(using).get_for_model(model, for_concrete_model=False)
+  entries = [
+    LogEntry(user_id=user.pk, content_type_id=content_type.pk, object_id=str(obj.pk),
+      object_repr=str(name)[:200], action_flag=action_flag, change_message='')
+    for obj, name in objects
+  ]
+  insert_rows(LogEntry, entries, [f for f in LogEntry._meta.local_concrete_fields if not f.primary_key], using)
+
+
+def history(model, object_id, using=None):
+  "Return the log entries of an object of model, its bulk ones included."
+  content_type = ContentType.objects.db_manager(using).get_for_model(model, for_concrete_model=False)
+  entries = LogEntry.objects.db_manager(using).filter(content_type=content_type)
+  try:
+    pk = int(object_id)
+  except (TypeError, ValueError):
+    return entries.filter(object_id=object_id)
+  ranges = AuditRange.objects.using(using).filter(first__lte=pk, last__gte=pk).values('entry')
+  return entries.filter(Q(object_id=object_id) | Q(pk__in=ranges))
+
+
+
+
+class BulkAuditMixin:
+
+  """
+  Log a bulk deletion as one admin log entry listing the primary keys, or
+  as an entry per object in one INSERT for keys that aren't integers, and
+  show the bulk entries on the history page of each object.
+  """
+
+  def log_deletion(self, request, obj, object_repr):
+    # delete_model() and delete_queryset() log the objects collected here.
+    request.__dict__.setdefault('datastore_deleted', []).append((obj, object_repr))
+
+  def log_deleted(self, request):
+    deleted = request.__dict__.pop('datastore_deleted', [])
+    if len(deleted) == 1:
+      super().log_deletion(request, *deleted[0])
+    elif deleted and not integer_pks(self.model):
+      log_objects(request.user, self.model, deleted, DELETION)
+    elif deleted:
+      names = [name for obj, name in deleted[:SUMMARY_NAMES]]
+      log_bulk_action(
+        request.user, self.model, [obj.pk for obj, name in deleted], DELETION,
+        '%s %s: %s' % (len(deleted), self.opts.verbose_name_plural, ', '.join(names)),
+      )
+
+  def delete_model(self, request, obj):
+    with transaction.atomic(using=router.db_for_write(self.model)):
+      self.log_deleted(request)
+      super().delete_model(request, obj)
+
+  def delete_queryset(self, request, queryset):
+    with transaction.atomic(using=router.db_for_write(self.model)):
+      self.log_deleted(request)
+      super().delete_queryset(request, queryset)
+
+  def history_view(self, request, object_id, extra_context=None):
+    # get_paginator() swaps in the entries of history().
+    request.datastore_history = unquote(object_id)
+    return super().history_view(request, object_id, extra_context)
+
+  def get_paginator(self, request, queryset, per_page, *args, **kwargs):
+    object_id = getattr(request, 'datastore_history', None)
+    if object_id is not None and queryset.model is LogEntry:
+      queryset = history(self.model, object_id, queryset.db).select_related().order_by('action_time')
+    return super().get_paginator(request, queryset, per_page, *args, **kwargs)
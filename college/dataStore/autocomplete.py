@@ -0,0 +1,146 @@
+"""
+Admin autocomplete of departments and faculties from an in-memory index.
+
+The generic admin autocomplete runs a ``LIKE '%term%'`` search and a COUNT
+on every keystroke. Departments and faculties are few and rarely written, so
+each process keeps their labels in a sorted list and answers with a bisect:
+a term matches the start of the label, of any word of it, or of the primary
+key. The index is rebuilt when the count version of the model, bumped on
+every write by :func:`dataStore.pagination.invalidate_counts`, changes.
+
+Admins with :class:`IndexedAutocompleteMixin` point their autocomplete
+fields on indexed models to :class:`IndexedAutocompleteJsonView`, which
+checks the request like the admin view does.
+"""
+
+
+import bisect
+import threading
+
+from django.contrib import admin
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.translation import get_language
+
+from .models import Department, Faculty
+from .pagination import count_version
+
+
+
+
+class LabelIndex:
+
+  "Sorted search keys of the labels of a model, for one count version and language."
+
+  def __init__(self, model):
+    self.model = model
+    self.built = {}
+    self.lock = threading.Lock()
+
+  def entries(self):
+    """
+    Return (keys, labels): the sorted (key, pk) pairs to bisect, and {pk:
+    label}, rebuilt when the model was written since.
+    """
+    version = count_version(self.model)
+    language = get_language()
+    built = self.built.get(language)
+    if built is None or built[0] != version:
+      with self.lock:
+        built = self.built.get(language)
+        if built is None or built[0] != version:
+          built = (version,) + self.build()
+          self.built[language] = built
+    return built[1], built[2]
+
+  def build(self):
+    # read from the primary, a lagging replica would pin a stale index to this version.
+    rows = self.model.objects.using(DEFAULT_DB_ALIAS).with_display().values_list('pk', 'display_name')
+    labels = dict(rows)
+    keys = set()
+    for pk, label in labels.items():
+      keys.add((str(pk).casefold(), pk))
+      words = label.casefold().split(' ')
+      for n in range(len(words)):
+        keys.add((' '.join(words[n:]), pk))
+    return sorted(keys), labels
+
+  def search(self, term):
+    "Return the (pk, label) pairs matching term, in label order."
+    keys, labels = self.entries()
+    term = ' '.join(term.casefold().split())
+    if not term:
+      found = labels
+    else:
+      found = set()
+      for key, pk in keys[bisect.bisect_left(keys, (term,)):]:
+        if not key.startswith(term):
+          break
+        found.add(pk)
+    return sorted(((pk, labels[pk]) for pk in found), key=lambda item: item[1].casefold())
+
+
+INDEXES = {
+  Department: LabelIndex(Department),
+  Faculty: LabelIndex(Faculty),
+}
+
+
+
+
+class IndexedAutocompleteJsonView(AutocompleteJsonView):
+
+  """
+  The admin autocomplete view, answering from the index of the model when
+  it has one and the field has no limit_choices_to.
+  """
+
+  def get(self, request, *args, **kwargs):
+    self.term, self.model_admin, self.source_field, to_field_name = self.process_request(request)
+    model = self.model_admin.model
+    if (model not in INDEXES or self.source_field.get_limit_choices_to()
+        or to_field_name != model._meta.pk.attname):
+      return super().get(request, *args, **kwargs)
+    if not self.has_perm(request):
+      raise PermissionDenied
+
+    try:
+      page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+      page = 1
+    matches = INDEXES[model].search(self.term)
+    start = (page - 1) * self.paginate_by
+    return JsonResponse({
+      'results': [
+        {'id': str(pk), 'text': label} for pk, label in matches[start:start + self.paginate_by]
+      ],
+      'pagination': {'more': len(matches) > start + self.paginate_by},
+    })
+
+
+autocomplete_view = admin.site.admin_view(IndexedAutocompleteJsonView.as_view(admin_site=admin.site))
+
+
+
+
+class IndexedAutocompleteSelect(AutocompleteSelect):
+
+  def get_url(self):
+    return reverse('app:autocomplete')
+
+
+
+
+class IndexedAutocompleteMixin:
+
+  "Send the autocomplete fields on indexed models to the indexed view."
+
+  def formfield_for_foreignkey(self, db_field, request, **kwargs):
+    if (db_field.name in self.get_autocomplete_fields(request)
+        and db_field.remote_field.model in INDEXES and 'widget' not in kwargs):
+      kwargs['widget'] = IndexedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using'))
+    return super().formfield_for_foreignkey(db_field, request, **kwargs)
@@ -0,0 +1,71 @@
+"""
+Bulk writes for the multi-table :model:`dataStore.Person` hierarchy.
+
+``bulk_create()`` refuses multi-table inherited models, so the parent rows go
+through ``bulk_create()`` and the child rows through one ``executemany()``.
+"""
+
+
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+from . import readmodels, stats
+from .models import Person
+from .pagination import invalidate_counts
+from .rollups import ROLLUP_FIELDS, add_to_rollups
+
+
+def insert_rows(model, objs, fields=None, using=DEFAULT_DB_ALIAS):
+  """
+  INSERT objs into the table of model with a single executemany().
+
+  Only the local columns are written, primary key included. save(), signals
+  and field pre_save() hooks (auto_now_add) are skipped, the cached counts,
+  date rollups, department stats and read models of model are updated here
+  instead.
+  """
+  connection = connections[using]
+  fields = fields or model._meta.local_concrete_fields
+  sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+    connection.ops.quote_name(model._meta.db_table),
+    ', '.join(connection.ops.quote_name(f.column) for f in fields),
+    ', '.join(['%s'] * len(fields)),
+  )
+  with connection.cursor() as cursor:
+    cursor.executemany(sql, [
+      [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields]
+      for obj in objs
+    ])
+  invalidate_counts(model)
+  if model in ROLLUP_FIELDS:
+    add_to_rollups(model, [getattr(obj, ROLLUP_FIELDS[model]) for obj in objs], using=using)
+  if model in stats.STAT_FIELDS:
+    stats.add_to_stats(model, objs, using=using)
+  if model in readmodels.RECORDS and readmodels.enabled():
+    # the rows are new, so are their records.
+    records = [readmodels.record_of(obj) for obj in objs]
+    insert_rows(readmodels.RECORDS[model], records, using=using)
+
+
+def bulk_create_people(model, objs, using=DEFAULT_DB_ALIAS):
+  """
+  Save new Student or Lecturer instances with one INSERT per table, in one
+  transaction. The primary keys are set on objs.
+  """
+  connection = connections[using]
+  parent_fields = [f for f in Person._meta.concrete_fields if not f.primary_key]
+  parents = [Person(**{f.attname: getattr(obj, f.attname) for f in parent_fields}) for obj in objs]
+
+  with transaction.atomic(using=using):
+    if connection.features.can_return_rows_from_bulk_insert:
+      Person.objects.using(using).bulk_create(parents)
+      add_to_rollups(Person, [parent.time for parent in parents], using=using)
+    else:
+      for parent in parents:
+        parent.save(using=using, force_insert=True)
+    for obj, parent in zip(objs, parents):
+      obj.pk = parent.pk
+      obj.time = parent.time
+      obj._state.adding = False
+      obj._state.db = using
+    insert_rows(model, objs, using=using)
+  return objs
@@ -9,22 +9,31 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 
-class StudentAdminForm(forms.ModelForm):
-  
+SAME_DEPARTMENT_ERROR = _("A student can't have same department as minor and major")
+
+
+class ReassignForm(forms.Form):
+
     """
-    Ensure minor and major field don't contain the same department.
+    New values of a bulk reassignment, the blank fields are kept.
     """
-      
+
+    def __init__(self, model, field_names, *args, **kwargs):
+      super().__init__(*args, **kwargs)
+      for name in field_names:
+        self.fields[name] = model._meta.get_field(name).formfield(required=False)
+
+    def changes(self):
+      "Return {field name: new value} of the fields given."
+      return {name: value for name, value in self.cleaned_data.items() if value not in (None, '')}
+
     def clean(self):
       cleaned_data = super().clean()
       minor = cleaned_data.get('minor')
       major = cleaned_data.get('major')
-      
-      if not minor or not major:
-        return cleaned_data
-      elif minor == major:
-        text = _("A student can't have same department as minor and major")
-        raise ValidationError(text)
-      else:
-         return cleaned_data
-     
\ No newline at end of file
+
+      if not self.changes():
+        raise ValidationError(_("Pick at least one new value."))
+      elif minor and minor == major:
+        raise ValidationError(SAME_DEPARTMENT_ERROR)
+      return cleaned_data
@@ -0,0 +1,60 @@
+"""
+Database functions building the display strings of the models in SQL.
+
+They give the same strings as the Python methods of the models, so lists can
+sort on them and read them with ``values()`` instead of creating instances.
+"""
+
+
+from django.db.models import CharField, F, Func, Value
+from django.db.models.functions import Concat
+
+
+class Title(Func):
+
+  """
+  str.title() of a text expression.
+
+  SQLite has no such function, :mod:`dataStore.sqlite` registers
+  ``datastore_title`` on each connection; PostgreSQL has INITCAP.
+  """
+
+  function = 'DATASTORE_TITLE'
+  output_field = CharField()
+
+  def as_postgresql(self, compiler, connection, **extra_context):
+    return super().as_sql(compiler, connection, function='INITCAP', **extra_context)
+
+
+class Upper(Func):
+
+  """
+  str.upper() of a text expression.
+
+  SQLite's UPPER only changes the ASCII letters, :mod:`dataStore.sqlite`
+  registers ``datastore_upper`` on each connection; PostgreSQL's UPPER
+  follows the locale.
+  """
+
+  function = 'DATASTORE_UPPER'
+  output_field = CharField()
+
+  def as_postgresql(self, compiler, connection, **extra_context):
+    return super().as_sql(compiler, connection, function='UPPER', **extra_context)
+
+
+def full_name():
+  "Person.fullName() of the row."
+  return Upper(Concat(
+    F('first_name'), Value(' '), F('middle_name'), Value(' '), F('last_name'),
+    output_field=CharField(),
+  ))
+
+
+def address():
+  "Person.address() of the row."
+  return Title(Concat(
+    Value('no '), F('apt_no'), Value(', lane '), F('lane_no'), Value(', '),
+    F('street'), Value(', '), F('city'), Value(', '), F('state'),
+    output_field=CharField(),
+  ))
@@ -0,0 +1,175 @@
+"""
+Outbound mail queue.
+
+With ``EMAIL_BACKEND = 'dataStore.mail.QueuedEmailBackend'`` sending mail,
+the password reset included, only stores each message in
+:model:`dataStore.QueuedMail`, so no request waits on the mail server.
+``manage.py send_queued_mail`` sends the due messages in batches through
+``DATASTORE_MAIL_BACKEND``, over one connection per batch. A message that
+fails is tried again after ``DATASTORE_MAIL_RETRY_SECONDS``, doubled on each
+attempt up to ``DATASTORE_MAIL_RETRY_MAX_SECONDS``, and is marked failed
+after ``DATASTORE_MAIL_MAX_ATTEMPTS``.
+"""
+
+
+import datetime
+import email
+import email.policy
+import logging
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import EmailMessage
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import QueuedMail
+
+
+logger = logging.getLogger('dataStore.mail')
+
+
+def transport():
+  return getattr(settings, 'DATASTORE_MAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+
+
+def batch_size():
+  return getattr(settings, 'DATASTORE_MAIL_BATCH', 50)
+
+
+def max_attempts():
+  return getattr(settings, 'DATASTORE_MAIL_MAX_ATTEMPTS', 6)
+
+
+def retry_delay(attempts):
+  "Return the timedelta to wait before the next try, after attempts failures."
+  base = getattr(settings, 'DATASTORE_MAIL_RETRY_SECONDS', 60)
+  ceiling = getattr(settings, 'DATASTORE_MAIL_RETRY_MAX_SECONDS', 3600)
+  return datetime.timedelta(seconds=min(base * 2 ** (attempts - 1), ceiling))
+
+
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+
+  "Store the messages in the queue instead of sending them."
+
+  def send_messages(self, email_messages):
+    rows = [
+      QueuedMail(
+        from_email=message.from_email, recipients=message.recipients(),
+        subject=str(message.subject)[:255], message=message.message().as_bytes(linesep='\n'),
+      )
+      for message in email_messages if message.recipients()
+    ]
+    try:
+      QueuedMail.objects.using(router.db_for_write(QueuedMail)).bulk_create(rows)
+    except Exception:
+      if not self.fail_silently:
+        raise
+      return 0
+    return len(rows)
+
+
+
+
+class StoredMessage(EmailMessage):
+
+  "A queued message, sent as the bytes it was stored with."
+
+  def __init__(self, row):
+    self.raw = bytes(row.message)
+    parsed = email.message_from_bytes(self.raw, policy=email.policy.default)
+    body = parsed.get_body(('plain', 'html'))
+    super().__init__(row.subject, body.get_content() if body else '', row.from_email, row.recipients)
+
+  def recipients(self):
+    return self.to
+
+  def message(self):
+    return RawMessage(self.raw)
+
+
+
+
+class RawMessage:
+
+  "The as_bytes() of a MIME message already built, as the mail backends call it."
+
+  def __init__(self, raw):
+    self.raw = raw
+
+  def as_bytes(self, linesep='\n'):
+    return self.raw.replace(b'\n', linesep.encode()) if linesep != '\n' else self.raw
+
+  def get_charset(self):
+    return None
+
+
+
+
+def due_mail(limit, using):
+  """
+  Take up to limit due messages, oldest first, and push their send_after a
+  retry delay away so an overlapping run leaves them alone meanwhile.
+  """
+  now = timezone.now()
+  with transaction.atomic(using=using):
+    rows = list(
+      QueuedMail.objects.using(using).select_for_update(skip_locked=True)
+      .filter(status='queued', send_after__lte=now).order_by('send_after', 'pk')[:limit]
+    )
+    QueuedMail.objects.using(using).filter(pk__in=[row.pk for row in rows]).update(
+      send_after=now + retry_delay(1))
+  return rows
+
+
+def failed(row, error, using):
+  "Count a failed attempt of row, and schedule the next one or give up."
+  row.attempts += 1
+  row.last_error = str(error)[:2000] or error.__class__.__name__
+  row.send_after = timezone.now() + retry_delay(row.attempts)
+  if row.attempts >= max_attempts():
+    row.status = 'failed'
+  row.save(using=using, update_fields=['attempts', 'last_error', 'send_after', 'status'])
+  logger.warning('mail %s to %s failed (attempt %s): %s', row.pk, row.recipients, row.attempts, row.last_error)
+
+
+def send_batch(limit=None, using=None, connection=None):
+  """
+  Send up to limit due messages over one connection. Return (sent, failed)
+  counts.
+  """
+  using = using or router.db_for_write(QueuedMail)
+  rows = due_mail(limit or batch_size(), using)
+  if not rows:
+    return 0, 0
+  connection = connection or get_connection(transport())
+  sent = errors = 0
+  try:
+    connection.open()
+  except Exception as error:
+    for row in rows:
+      failed(row, error, using)
+    return 0, len(rows)
+  try:
+    for row in rows:
+      try:
+        if not connection.send_messages([StoredMessage(row)]):
+          raise ValueError('the backend sent nothing')
+      except Exception as error:
+        errors += 1
+        failed(row, error, using)
+        # the connection may be broken, start a new one for the rest.
+        connection.close()
+        connection.open()
+      else:
+        sent += 1
+        QueuedMail.objects.using(using).filter(pk=row.pk).delete()
+  except Exception as error:
+    # reconnecting failed, the rest wait for the next run.
+    logger.warning('mail connection lost: %s', error)
+  finally:
+    connection.close()
+  return sent, errors
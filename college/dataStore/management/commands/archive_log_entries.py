@@ -0,0 +1,56 @@
+"""
+Move old admin log entries out of django_admin_log into archive files.
+"""
+
+
+import datetime
+import gzip
+from pathlib import Path
+
+from django.contrib.admin.models import LogEntry
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from dataStore.retention import archive_dir, archive_entries, retention_days
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Archive the admin log entries older than the retention period to gzipped JSONL files."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--days', type=int, default=retention_days(),
+      help="Keep the entries of the last DAYS days (default: DATASTORE_LOG_RETENTION_DAYS).")
+    parser.add_argument('--batch-size', type=int, default=1000,
+      help="Entries moved per transaction (default: 1000).")
+    parser.add_argument('--pause', type=float, default=0,
+      help="Seconds to wait between batches, to leave room to other writers.")
+    parser.add_argument('--output-dir', default=archive_dir(),
+      help="Directory of the archive files (default: DATASTORE_LOG_ARCHIVE_DIR).")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the entries to archive.")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    if options['days'] < 0 or options['batch_size'] < 1:
+      raise CommandError("--days must be positive or zero and --batch-size positive.")
+    before = timezone.now() - datetime.timedelta(days=options['days'])
+    using = options['database']
+
+    if options['dry_run']:
+      count = LogEntry.objects.using(using).filter(action_time__lt=before).count()
+      self.stdout.write("%s log entries are older than %s." % (count, before.date()))
+      return
+
+    directory = Path(options['output_dir'])
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / ('django_admin_log-%s.jsonl.gz' % timezone.now().strftime('%Y%m%d%H%M%S'))
+    with gzip.open(path, 'wt', encoding='utf-8') as stream:
+      moved = archive_entries(before, stream, options['batch_size'], options['pause'], using)
+    if not moved:
+      path.unlink()
+      self.stdout.write("No log entry is older than %s." % before.date())
+      return
+    self.stdout.write("Archived %s log entries older than %s to %s." % (moved, before.date(), path))
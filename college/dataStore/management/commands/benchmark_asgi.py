@@ -0,0 +1,96 @@
+"""
+Compare requests per second and tail latency of the WSGI and ASGI request
+paths under concurrent load.
+
+The WSGI run sends the requests from a pool of threads, as a threaded WSGI
+server would; the ASGI run sends them as tasks on one event loop, as uvicorn
+would. Both go through the whole middleware stack of the project, in process,
+so the numbers compare the request paths rather than the servers or the
+network. Run it with and without the "asgi" environment variable to time
+the async and the sync versions of the read views.
+"""
+
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .benchmark_college import percentile
+
+
+class Command(BaseCommand):
+
+  help = "Compare WSGI and ASGI throughput and latency of read pages under concurrent load."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--url', action='append', default=[],
+      help="Path to request, repeatable (default: the index page).")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per run (default: 2000).")
+    parser.add_argument('--concurrency', type=int, default=50,
+      help="Requests in flight at once (default: 50).")
+
+  def handle(self, *args, **options):
+    self.urls = options['url'] or [reverse('app:index')]
+    total, concurrency = options['requests'], options['concurrency']
+
+    for name, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+      # the test clients send "testserver" as the host.
+      with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        start = time.perf_counter()
+        latencies, statuses = run(total, concurrency)
+        elapsed = time.perf_counter() - start
+      self.stdout.write(
+        '%s  %7.1f req/s  mean %7.2f ms  p50 %7.2f ms  p95 %7.2f ms  p99 %7.2f ms  status %s' % (
+          name, total / elapsed, statistics.mean(latencies), percentile(latencies, 50),
+          percentile(latencies, 95), percentile(latencies, 99), sorted(statuses),
+        ))
+
+  def run_wsgi(self, total, concurrency):
+    latencies, statuses = [], set()
+
+    def worker(count):
+      client = Client()
+      try:
+        for n in range(count):
+          start = time.perf_counter()
+          response = client.get(self.urls[n % len(self.urls)])
+          latencies.append((time.perf_counter() - start) * 1000)
+          statuses.add(response.status_code)
+      finally:
+        connections.close_all()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+      list(pool.map(worker, self.shares(total, concurrency)))
+    return latencies, statuses
+
+  def run_asgi(self, total, concurrency):
+    latencies, statuses = [], set()
+
+    async def worker(count):
+      client = AsyncClient()
+      for n in range(count):
+        start = time.perf_counter()
+        # as ASGIHandler does, so sync code of a request shares one thread.
+        async with ThreadSensitiveContext():
+          response = await client.get(self.urls[n % len(self.urls)])
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses.add(response.status_code)
+
+    async def main():
+      await asyncio.gather(*(worker(count) for count in self.shares(total, concurrency)))
+
+    asyncio.run(main())
+    return latencies, statuses
+
+  def shares(self, total, concurrency):
+    "Split total requests between concurrency workers."
+    return [total // concurrency + (n < total % concurrency) for n in range(concurrency)]
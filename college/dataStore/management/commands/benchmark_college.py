@@ -0,0 +1,180 @@
+"""
+Time the admin changelists, search, autocomplete, the API and the index view
+through the Django test client, and report the latency percentiles and query
+counts of each scenario as JSON.
+
+Save the reports of successive runs and pass an older one with --compare to
+see how the timings moved. Use seed_college first for realistic volumes.
+"""
+
+
+import json
+import math
+import platform
+import statistics
+import time
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from dataStore import readmodels
+from dataStore.middleware import QueryRecorder
+from dataStore.models import Person, Lecturer, Student, Department
+
+
+def percentile(values, pct):
+  "Nearest-rank percentile of a non-empty list."
+  ordered = sorted(values)
+  return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def admin_url(model_name, **params):
+  url = reverse('admin:dataStore_%s_changelist' % model_name)
+  if params:
+    url += '?' + '&'.join('%s=%s' % item for item in params.items())
+  return url
+
+
+def scenarios():
+  "Return (name, url) of the requests to time."
+  year = timezone.now().year
+  urls = [
+    ('index', reverse('app:index')),
+    ('person changelist', admin_url('person')),
+    ('person changelist, page 3', admin_url('person', p=3)),
+    ('person changelist, sex filter', admin_url('person', sex__exact='F')),
+    ('person changelist, year', admin_url('person', time__year=year)),
+    ('person search', admin_url('person', q='jo')),
+    ('student changelist', admin_url('student')),
+    ('student changelist, level filter', admin_url('student', level__exact='Cls 3')),
+    ('student search', admin_url('student', q='smith')),
+    ('lecturer changelist', admin_url('lecturer')),
+    ('lecturer changelist, rank filter', admin_url('lecturer', rank__exact='Asc')),
+    ('department changelist', admin_url('department')),
+    ('faculty changelist', admin_url('faculty')),
+    ('log entry changelist', reverse('admin:admin_logentry_changelist')),
+    ('log entry search', reverse('admin:admin_logentry_changelist') + '?q=changed'),
+    ('department autocomplete', reverse('app:autocomplete') +
+      '?app_label=dataStore&model_name=student&field_name=minor&term=ph'),
+    ('student api', reverse('api:students') + '?fields=id,first_name,last_name,level'),
+  ]
+  if readmodels.enabled():
+    urls += [
+      ('student record changelist', admin_url('studentrecord')),
+      ('lecturer record changelist', admin_url('lecturerrecord')),
+    ]
+  return urls
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Report p50/p95/p99 latency and query counts of the admin and index pages as JSON."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--requests', type=int, default=20,
+      help="Timed requests per scenario (default: 20).")
+    parser.add_argument('--warmup', type=int, default=2,
+      help="Untimed requests per scenario first (default: 2).")
+    parser.add_argument('--username',
+      help="Staff user to log in as (default: the first active superuser).")
+    parser.add_argument('--host',
+      help="Host header to send (default: the first ALLOWED_HOSTS entry or localhost).")
+    parser.add_argument('--only', action='append', default=[],
+      help="Run the scenarios whose name contains this text. Repeatable.")
+    parser.add_argument('--output', help="Write the report to this file instead of stdout.")
+    parser.add_argument('--compare', help="An earlier report to compare the timings with.")
+
+  def handle(self, *args, **options):
+    if options['requests'] < 1:
+      raise CommandError("--requests must be at least 1.")
+    client = Client(HTTP_HOST=options['host'] or self.default_host())
+    client.force_login(self.user(options['username']))
+
+    results = []
+    for name, url in scenarios():
+      if options['only'] and not any(text in name for text in options['only']):
+        continue
+      for run in range(options['warmup']):
+        client.get(url)
+      results.append(self.measure(client, name, url, options['requests']))
+
+    report = {
+      'date': timezone.now().isoformat(),
+      'python': platform.python_version(),
+      'django': django.get_version(),
+      'database': connections['default'].vendor,
+      'rows': {model._meta.label: model._base_manager.count()
+        for model in (Person, Student, Lecturer, Department)},
+      'requests': options['requests'],
+      'scenarios': results,
+    }
+    text = json.dumps(report, indent=2)
+    if options['output']:
+      with open(options['output'], 'w') as stream:
+        stream.write(text + '\n')
+    else:
+      self.stdout.write(text)
+
+    if options['compare']:
+      self.compare(options['compare'], results)
+
+  def default_host(self):
+    for host in settings.ALLOWED_HOSTS:
+      host = host.lstrip('.')
+      if host and host != '*':
+        return host
+    return 'localhost'
+
+  def user(self, username):
+    users = get_user_model()._default_manager.filter(is_active=True, is_staff=True)
+    user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+    if user is None:
+      raise CommandError("No active staff user to log in as; create one or pass --username.")
+    return user
+
+  def measure(self, client, name, url, requests):
+    timings, queries, statuses = [], [], set()
+    for run in range(requests):
+      recorder = QueryRecorder()
+      with ExitStack() as stack:
+        for connection in connections.all():
+          stack.enter_context(connection.execute_wrapper(recorder))
+        start = time.perf_counter()
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+          b''.join(response.streaming_content)
+        timings.append((time.perf_counter() - start) * 1000)
+      queries.append(len(recorder.queries))
+      statuses.add(response.status_code)
+    return {
+      'name': name,
+      'url': url,
+      'status': sorted(statuses),
+      'p50_ms': round(percentile(timings, 50), 2),
+      'p95_ms': round(percentile(timings, 95), 2),
+      'p99_ms': round(percentile(timings, 99), 2),
+      'mean_ms': round(statistics.mean(timings), 2),
+      'queries': max(queries),
+    }
+
+  def compare(self, path, results):
+    "Write the p50/p95 ratios against an earlier report to stderr."
+    with open(path) as stream:
+      earlier = {item['name']: item for item in json.load(stream)['scenarios']}
+    for item in results:
+      old = earlier.get(item['name'])
+      if old is None:
+        continue
+      ratios = ['%s %.2fx' % (key, item[key] / old[key] if old[key] else math.inf)
+        for key in ('p50_ms', 'p95_ms')]
+      self.stderr.write('%-36s %s  queries %s -> %s' % (
+        item['name'], '  '.join(ratios), old['queries'], item['queries']))
@@ -0,0 +1,113 @@
+"""
+Compare the query plans and timings of the admin changelist queries with and
+without the indexes declared on the dataStore models.
+
+The "before" run drops those indexes inside a transaction that is rolled back,
+so the database is left as it was. Use --students/--lecturers to first add
+synthetic rows, on a scratch database only.
+"""
+
+
+import statistics
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+from dataStore import synthetic
+from dataStore.models import Person, Lecturer, Student, Department
+
+
+ORDER = ('first_name', '-pk')
+PAGE = slice(0, 50)
+
+
+def changelist_queries():
+  """
+  The queries behind each changelist, as built by the admin: the page, its
+  filtered count and the date_hierarchy dates. Counts are flagged True.
+  """
+  students = Student.objects.select_related('minor', 'major')
+  return [
+    ('person page', Person.objects.order_by(*ORDER)[PAGE], False),
+    ('person page, sex filter', Person.objects.filter(sex='F').order_by(*ORDER)[PAGE], False),
+    ('person count, sex filter', Person.objects.filter(sex='F'), True),
+    ('person years', Person.objects.dates('time', 'year'), False),
+    ('person months of a year', Person.objects.filter(time__year=2024).dates('time', 'month'), False),
+    ('student page', students.order_by(*ORDER)[PAGE], False),
+    ('student page, level filter', students.filter(level='Cls 3').order_by(*ORDER)[PAGE], False),
+    ('student count, level filter', Student.objects.filter(level='Cls 3'), True),
+    ('student years', Student.objects.dates('time', 'year'), False),
+    ('lecturer page', Lecturer.objects.order_by(*ORDER)[PAGE], False),
+    ('lecturer page, rank filter', Lecturer.objects.filter(rank='Asc').order_by(*ORDER)[PAGE], False),
+    ('lecturer count, rank and salary filter', Lecturer.objects.filter(rank='Asc', salary='C'), True),
+    ('lecturer count, salary filter', Lecturer.objects.filter(salary='C'), True),
+    ('department years', Department.objects.dates('time', 'year'), False),
+  ]
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Show EXPLAIN QUERY PLAN and timings of the changelist queries before and after the indexes."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--students', type=int, default=0,
+      help="Synthetic students to add first.")
+    parser.add_argument('--lecturers', type=int, default=0,
+      help="Synthetic lecturers to add first.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5,
+      help="Runs per query, the median is reported (default: 5).")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    self.using = options['database']
+    self.repeat = options['repeat']
+    self.connection = connections[self.using]
+    if self.connection.vendor != 'sqlite':
+      raise CommandError("EXPLAIN QUERY PLAN needs an SQLite database.")
+
+    if options['students'] or options['lecturers']:
+      created = synthetic.populate(options['students'], options['lecturers'],
+        seed=options['seed'], using=self.using)
+      self.stdout.write("Added %s synthetic people." % created)
+
+    queries = [(label, qs.using(self.using), count) for label, qs, count in changelist_queries()]
+    with transaction.atomic(using=self.using):
+      self.drop_indexes()
+      before = [self.measure(qs, count) for label, qs, count in queries]
+      transaction.set_rollback(True, using=self.using)
+    after = [self.measure(qs, count) for label, qs, count in queries]
+
+    for (label, qs, count), (old_plan, old_ms), (new_plan, new_ms) in zip(queries, before, after):
+      self.stdout.write(self.style.MIGRATE_HEADING(label))
+      self.stdout.write('  before %8.2f ms  %s' % (old_ms, old_plan))
+      self.stdout.write('  after  %8.2f ms  %s' % (new_ms, new_plan))
+
+  def drop_indexes(self):
+    with self.connection.cursor() as cursor:
+      for model in apps.get_app_config('dataStore').get_models():
+        for index in model._meta.indexes:
+          cursor.execute('DROP INDEX IF EXISTS %s' % self.connection.ops.quote_name(index.name))
+
+  def measure(self, queryset, count=False):
+    "Return the query plan on one line and the median run time in ms."
+    if count:
+      queryset = queryset.values('pk')
+    sql, params = queryset.query.sql_with_params()
+    if count:
+      sql = 'SELECT COUNT(*) FROM (%s) subquery' % sql
+
+    with self.connection.cursor() as cursor:
+      cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+      plan = ' | '.join(row[-1] for row in cursor.fetchall())
+      timings = []
+      for run in range(self.repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return plan, statistics.median(timings)
@@ -0,0 +1,137 @@
+"""
+Compare the throughput of concurrent admin reads and writes on SQLite with
+its default settings and with the DATASTORE_SQLITE_PRAGMAS profile.
+
+Reader processes load changelist pages and counts while writer processes
+save people the way the admin does, signals included. Each profile runs for
+the same time on the configured database; the journal mode is set back to
+what it was afterwards. Use a scratch database filled by seed_college.
+"""
+
+
+import multiprocessing
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError, DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.test.utils import override_settings
+
+from dataStore import sqlite
+from dataStore.models import Person, Student
+
+
+# the pragmas SQLite starts with, for the baseline run.
+DEFAULT_PRAGMAS = {
+  'journal_mode': 'delete',
+  'synchronous': 'full',
+  'busy_timeout': 5000,
+  'cache_size': -2000,
+  'mmap_size': 0,
+  'temp_store': 'default',
+}
+
+
+def read(using, rng):
+  sex = rng.choice('MFP')
+  list(Person.objects.using(using).filter(sex=sex).order_by('first_name', '-pk')[:50])
+  Student.objects.using(using).filter(level='Cls %s' % rng.randrange(1, 7)).count()
+
+
+def write(using, rng, last_pk):
+  person = Person.objects.using(using).filter(pk__gte=rng.randrange(1, last_pk + 1)).first()
+  if person is not None:
+    person.lane_no = rng.randrange(1, 50)
+    with transaction.atomic(using=using):
+      person.save(using=using)
+
+
+def worker(role, seed, using, last_pk, deadline, results):
+  "Run reads or writes until deadline, then put (role, latencies, locked errors) on results."
+  rng = random.Random(seed)
+  latencies, errors = [], 0
+  while time.time() < deadline:
+    start = time.perf_counter()
+    try:
+      if role == 'read':
+        read(using, rng)
+      else:
+        write(using, rng, last_pk)
+    except OperationalError:
+      errors += 1
+      continue
+    latencies.append((time.perf_counter() - start) * 1000)
+  connections.close_all()
+  results.put((role, latencies, errors))
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Measure concurrent read/write throughput with and without the SQLite profile."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--seconds', type=float, default=10, help="Run time per profile (default: 10).")
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    self.using = options['database']
+    connection = connections[self.using]
+    if connection.vendor != 'sqlite':
+      raise CommandError("This benchmark needs an SQLite database.")
+    with override_settings(DATASTORE_SQLITE_PRAGMAS={}):
+      journal_mode = sqlite.read_pragmas(connection, ['journal_mode'])['journal_mode']
+      self.last_pk = Person.objects.using(self.using).aggregate(last=Max('pk'))['last']
+    if not self.last_pk:
+      raise CommandError("The database is empty, run seed_college first.")
+
+    try:
+      for name, profile in (('sqlite defaults', DEFAULT_PRAGMAS), ('profile', sqlite.pragmas())):
+        connections.close_all()
+        with override_settings(DATASTORE_SQLITE_PRAGMAS=profile):
+          self.report(name, self.run(options))
+    finally:
+      connections.close_all()
+      with override_settings(DATASTORE_SQLITE_PRAGMAS={'journal_mode': journal_mode}):
+        connections[self.using].ensure_connection()
+      connections.close_all()
+
+  def run(self, options):
+    "Return {role: (latencies in ms, locked errors)} of one timed run."
+    # forked workers inherit the settings, and open their own connections.
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    deadline = time.time() + options['seconds']
+    roles = ['read'] * options['readers'] + ['write'] * options['writers']
+    processes = [
+      context.Process(target=worker, args=(role, n, self.using, self.last_pk, deadline, results))
+      for n, role in enumerate(roles)
+    ]
+    for process in processes:
+      process.start()
+
+    merged = {'read': [[], 0], 'write': [[], 0]}
+    for process in processes:
+      role, latencies, errors = results.get()
+      merged[role][0] += latencies
+      merged[role][1] += errors
+    for process in processes:
+      process.join()
+    self.seconds = options['seconds']
+    return merged
+
+  def report(self, name, results):
+    self.stdout.write(self.style.MIGRATE_HEADING(name))
+    for role, (latencies, errors) in results.items():
+      if latencies:
+        ordered = sorted(latencies)
+        self.stdout.write('  %-5s %8.1f ops/s  p50 %7.2f ms  p95 %7.2f ms  %s locked' % (
+          role, len(latencies) / self.seconds, statistics.median(ordered),
+          ordered[int(0.95 * (len(ordered) - 1))], errors))
+      else:
+        self.stdout.write('  %-5s no operation completed, %s locked' % (role, errors))
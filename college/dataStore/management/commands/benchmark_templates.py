@@ -0,0 +1,85 @@
+"""
+Compare the template render time of the admin changelists with the plain
+template loaders and with the cached loader, warmed up.
+
+The render time is read from the Server-Timing header of
+:class:`dataStore.middleware.RequestTimingMiddleware`, which is made to time
+every request for the run.
+"""
+
+
+import copy
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from dataStore.warmup import CACHED_LOADER, uncached_loaders, warm_templates
+
+from .benchmark_college import Command as BenchmarkCommand, percentile, scenarios
+
+
+TEMPLATE_TIMING = re.compile(r'template;dur=([0-9.]+)')
+
+
+def templates_setting(cached):
+  "Return TEMPLATES with the loaders of the django engine wrapped in the cache or not."
+  templates = copy.deepcopy(settings.TEMPLATES)
+  for backend in templates:
+    if backend['BACKEND'] == 'django.template.backends.django.DjangoTemplates':
+      loaders = uncached_loaders(backend['OPTIONS']['loaders'])
+      backend['OPTIONS']['loaders'] = [(CACHED_LOADER, loaders)] if cached else loaders
+  return templates
+
+
+
+
+class Command(BenchmarkCommand):
+
+  help = "Compare changelist template render times with the plain and the cached template loaders."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--requests', type=int, default=20,
+      help="Timed requests per changelist and loader (default: 20).")
+    parser.add_argument('--username',
+      help="Staff user to log in as (default: the first active superuser).")
+    parser.add_argument('--only', action='append', default=[],
+      help="Run the changelists whose name contains this text. Repeatable.")
+
+  def handle(self, *args, **options):
+    if options['requests'] < 1:
+      raise CommandError("--requests must be at least 1.")
+    user = self.user(options['username'])
+    changelists = [
+      (name, url) for name, url in scenarios()
+      if 'changelist' in name and (not options['only'] or any(text in name for text in options['only']))
+    ]
+
+    timings = {}
+    for cached in (False, True):
+      with override_settings(TEMPLATES=templates_setting(cached), DATASTORE_TIMING_SAMPLE_RATE=1.0,
+          ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        start = time.perf_counter()
+        if cached:
+          compiled, failed = warm_templates()
+          self.stdout.write('warm-up: %s templates compiled in %.1f ms' % (
+            compiled, (time.perf_counter() - start) * 1000))
+        client = Client()
+        client.force_login(user)
+        for name, url in changelists:
+          timings[name, cached] = [self.render_ms(client, url) for run in range(options['requests'])]
+
+    self.stdout.write('%-36s %14s %14s' % ('changelist', 'plain p50 ms', 'cached p50 ms'))
+    for name, url in changelists:
+      self.stdout.write('%-36s %14.2f %14.2f' % (
+        name, percentile(timings[name, False], 50), percentile(timings[name, True], 50)))
+
+  def render_ms(self, client, url):
+    response = client.get(url)
+    match = TEMPLATE_TIMING.search(response.headers.get('Server-Timing', ''))
+    if match is None:
+      raise CommandError("%s answered %s without a template timing." % (url, response.status_code))
+    return float(match.group(1))
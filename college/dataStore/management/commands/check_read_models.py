@@ -0,0 +1,42 @@
+"""
+Check the student and lecturer read models against their source tables.
+"""
+
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore import readmodels
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Report read model rows that are missing, stale or orphaned, and optionally repair them."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--repair', action='store_true',
+      help="Rewrite missing and stale rows and delete orphans.")
+    parser.add_argument('--chunk-size', type=int, default=2000,
+      help="Rows compared at a time (default: 2000).")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    if not readmodels.enabled():
+      raise CommandError("DATASTORE_READ_MODELS is off.")
+
+    drift = 0
+    for model in readmodels.RECORDS:
+      problems = list(readmodels.check_records(model, options['chunk_size'], options['database']))
+      kinds = {kind: sum(1 for p in problems if p[0] == kind) for kind in ('missing', 'stale', 'orphan')}
+      self.stdout.write('%s: %s missing, %s stale, %s orphan' % (
+        readmodels.RECORDS[model]._meta.label, kinds['missing'], kinds['stale'], kinds['orphan'],
+      ))
+      if problems and options['repair']:
+        readmodels.repair_records(model, problems, options['database'])
+        self.stdout.write(self.style.SUCCESS('  repaired %s row(s)' % len(problems)))
+      drift += len(problems)
+
+    if drift and not options['repair']:
+      raise CommandError("%s read model row(s) out of sync, run with --repair." % drift)
@@ -0,0 +1,158 @@
+"""
+Bulk import students and lecturers from CSV or JSONL files.
+
+Rows are streamed from disk and written in fixed-size batches, each batch in
+its own transaction: one bulk INSERT for the :model:`dataStore.Person` rows
+and one for the child rows.
+"""
+
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore.bulk import bulk_create_people
+from dataStore.form import SAME_DEPARTMENT_ERROR
+from dataStore.models import Person, Lecturer, Student, Department
+
+
+ROLES = {
+  'student': Student,
+  'lecturer': Lecturer,
+}
+
+# foreign keys to Department given by name in the import files.
+DEPARTMENT_FIELDS = ('minor', 'major', 'department')
+
+
+def read_rows(path, fmt):
+  """
+  Yield (line number, row dict) from a CSV or JSONL file, one at a time. A
+  JSONL line that isn't a JSON object yields the ValidationError saying so.
+  """
+  with open(path, newline='', encoding='utf-8') as stream:
+    if fmt == 'csv':
+      reader = csv.DictReader(stream)
+      for row in reader:
+        yield reader.line_num, row
+    else:
+      for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+          continue
+        try:
+          row = json.loads(line)
+        except ValueError as error:
+          yield line_no, ValidationError("Invalid JSON: %s." % error)
+          continue
+        yield line_no, row if isinstance(row, dict) else ValidationError("Not a JSON object.")
+
+
+def batched(iterable, size):
+  "Split an iterable into lists of at most size items."
+  iterator = iter(iterable)
+  while True:
+    batch = list(islice(iterator, size))
+    if not batch:
+      return
+    yield batch
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Bulk import students or lecturers from CSV or JSONL files."
+
+  def add_arguments(self, parser):
+    parser.add_argument('files', nargs='+', help="CSV or JSONL files to import.")
+    parser.add_argument('--role', choices=sorted(ROLES), required=True,
+      help="Kind of person stored in the files.")
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+      help="File format, guessed from the file extension by default.")
+    parser.add_argument('--batch-size', type=int, default=1000,
+      help="Number of rows written per transaction (default: 1000).")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+      help="Database to import into.")
+
+  def handle(self, *args, **options):
+    self.model = ROLES[options['role']]
+    self.using = options['database']
+    if options['batch_size'] < 1:
+      raise CommandError("--batch-size must be a positive number.")
+
+    self.departments = self.load_departments()
+    self.person_fields = [
+      f for f in Person._meta.concrete_fields if not f.primary_key and f.name != 'time'
+    ]
+    self.child_fields = [
+      f for f in self.model._meta.local_concrete_fields if not f.primary_key
+    ]
+
+    imported = rejected = 0
+    for name in options['files']:
+      path = Path(name)
+      fmt = options['format'] or path.suffix.lstrip('.').lower()
+      if fmt not in ('csv', 'jsonl'):
+        raise CommandError("Can't guess the format of %s, use --format." % path)
+      if not path.exists():
+        raise CommandError("%s does not exist." % path)
+
+      rows = self.build_objects(path, read_rows(path, fmt))
+      for batch in batched(rows, options['batch_size']):
+        imported += self.write_batch([obj for obj in batch if obj is not None])
+        rejected += batch.count(None)
+
+    self.stdout.write(self.style.SUCCESS(
+      "Imported %s %s(s), rejected %s row(s)." % (imported, options['role'], rejected)
+    ))
+
+  def load_departments(self):
+    "Map every department name, case insensitively, to its primary key."
+    names = Department.objects.using(self.using).values_list('name', flat=True)
+    return {name.lower(): name for name in names.iterator()}
+
+  def build_objects(self, path, rows):
+    """
+    Turn rows into unsaved model instances.
+
+    Rows that fail validation are reported and yield None.
+    """
+    for line_no, row in rows:
+      try:
+        if isinstance(row, ValidationError):
+          raise row
+        yield self.build_object(row)
+      except ValidationError as error:
+        self.stderr.write("%s:%s: %s" % (path, line_no, '; '.join(error.messages)))
+        yield None
+
+  def build_object(self, row):
+    obj = self.model()
+    for field in self.person_fields + self.child_fields:
+      if field.name in DEPARTMENT_FIELDS:
+        value = str(row.get(field.name) or '').strip()
+        if not value:
+          continue
+        try:
+          setattr(obj, field.attname, self.departments[value.lower()])
+        except KeyError:
+          raise ValidationError("Unknown department %r." % value)
+      elif field.name in row:
+        setattr(obj, field.attname, field.clean(row[field.name], obj))
+      elif not field.blank:
+        raise ValidationError("Missing %s." % field.name)
+
+    if self.model is Student and obj.minor_id and obj.minor_id == obj.major_id:
+      raise ValidationError(SAME_DEPARTMENT_ERROR)
+    return obj
+
+  def write_batch(self, objs):
+    "Insert the parent and child rows of a batch in one transaction."
+    if objs:
+      bulk_create_people(self.model, objs, using=self.using)
+    return len(objs)
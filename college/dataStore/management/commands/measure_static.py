@@ -0,0 +1,79 @@
+"""
+Report the static bytes an admin page transfers, uncompressed and with the
+gzip and brotli variants collectstatic wrote, and how many of its assets a
+repeat visit still revalidates.
+
+Run ``manage.py collectstatic`` with the production settings first: the
+pages are rendered with the hashed names of its manifest and the assets are
+served by :class:`dataStore.middleware.StaticFilesMiddleware`.
+"""
+
+
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from .benchmark_college import Command as BenchmarkCommand, scenarios
+
+
+STATIC_STORAGE = 'dataStore.staticfiles.CompressedManifestStaticFilesStorage'
+
+# Accept-Encoding header sent for each column of the report.
+ENCODINGS = (('identity', 'identity'), ('gzip', 'gzip'), ('br', 'br, gzip'))
+
+
+def static_urls(html, prefix):
+  "Return the static URLs a page links to, in order, without duplicates."
+  pattern = re.compile(r'''(?:src|href)=["'](%s[^"'?#]+)''' % re.escape(prefix))
+  return list(dict.fromkeys(pattern.findall(html)))
+
+
+
+
+class Command(BenchmarkCommand):
+
+  help = "Report the static bytes transferred per admin page, by Accept-Encoding."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--username',
+      help="Staff user to log in as (default: the first active superuser).")
+    parser.add_argument('--only', action='append', default=[],
+      help="Measure the pages whose name contains this text. Repeatable.")
+
+  def handle(self, *args, **options):
+    manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    if not os.path.exists(manifest):
+      raise CommandError("%s is missing; run collectstatic with %s first." % (manifest, STATIC_STORAGE))
+    storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': STATIC_STORAGE}}
+    prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+    pages = [
+      (name, url) for name, url in scenarios()
+      if 'changelist' in name and (not options['only'] or any(text in name for text in options['only']))
+    ]
+
+    with override_settings(DEBUG=False, STORAGES=storages, DATASTORE_SERVE_STATIC=True,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+      client = Client()
+      client.force_login(self.user(options['username']))
+      self.stdout.write('%-36s %7s %12s %12s %12s %11s' % (
+        'page', 'assets', 'identity KB', 'gzip KB', 'br KB', 'revalidated'))
+      for name, url in pages:
+        response = client.get(url)
+        if response.status_code != 200:
+          raise CommandError("%s answered %s." % (url, response.status_code))
+        assets = static_urls(response.content.decode(), prefix)
+        sizes = {column: 0 for column, header in ENCODINGS}
+        revalidated = 0
+        for asset in assets:
+          for column, header in ENCODINGS:
+            response = client.get(asset, HTTP_ACCEPT_ENCODING=header)
+            if response.status_code != 200:
+              raise CommandError("%s answered %s." % (asset, response.status_code))
+            sizes[column] += len(b''.join(response.streaming_content))
+          revalidated += 'immutable' not in response.headers.get('Cache-Control', '')
+        self.stdout.write('%-36s %7d %12.1f %12.1f %12.1f %11d' % (
+          name, len(assets), *(sizes[column] / 1024 for column, header in ENCODINGS), revalidated))
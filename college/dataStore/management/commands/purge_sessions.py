@@ -0,0 +1,32 @@
+"""
+Delete the expired sessions in small transactions.
+"""
+
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore.retention import purge_sessions, session_model, session_purge_batch
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Delete the expired sessions, a batch per transaction. Run it periodically, e.g. from cron."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=session_purge_batch(),
+      help="Sessions deleted per transaction (default: DATASTORE_SESSION_PURGE_BATCH).")
+    parser.add_argument('--pause', type=float, default=0,
+      help="Seconds to wait between batches, to leave room to other writers.")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    if options['batch_size'] < 1:
+      raise CommandError("--batch-size must be positive.")
+    if session_model() is None:
+      self.stdout.write("The session engine keeps no table; nothing to purge.")
+      return
+    deleted = purge_sessions(options['batch_size'], options['pause'], options['database'])
+    self.stdout.write("Deleted %s expired sessions." % deleted)
@@ -0,0 +1,88 @@
+"""
+Move many students to another major, minor or class, or many lecturers to
+another department, with one UPDATE, see dataStore.reassign.
+"""
+
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+
+from dataStore.form import ReassignForm, SAME_DEPARTMENT_ERROR
+from dataStore.models import Lecturer, Student
+from dataStore.reassign import REASSIGN_FIELDS, reassign
+
+
+ROLES = {
+  'student': Student,
+  'lecturer': Lecturer,
+}
+
+
+def assignments(items, option):
+  "Turn name=value arguments into a dict."
+  pairs = {}
+  for item in items:
+    name, sep, value = item.partition('=')
+    if not sep or not name:
+      raise CommandError("%s expects name=value, not %r." % (option, item))
+    pairs[name.strip()] = value.strip()
+  return pairs
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Reassign the major, minor or class of students, or the department of lecturers, in bulk."
+
+  def add_arguments(self, parser):
+    parser.add_argument('role', choices=sorted(ROLES), help="Kind of person to reassign.")
+    parser.add_argument('--set', action='append', default=[], metavar='FIELD=VALUE',
+      help="New value, a department by name. Repeatable; fields: %s." % ', '.join(
+        sorted({name for names in REASSIGN_FIELDS.values() for name in names})))
+    parser.add_argument('--where', action='append', default=[], metavar='LOOKUP=VALUE',
+      help="Only the rows matching this filter, e.g. major=Physics or level__in=Cls 1,Cls 2. Repeatable.")
+    parser.add_argument('--all', action='store_true', help="Reassign every row, without --where.")
+    parser.add_argument('--username',
+      help="Staff user the admin log entry is written for (default: the first active superuser).")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the rows to reassign.")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    model = ROLES[options['role']]
+    using = options['database']
+    where = assignments(options['where'], '--where')
+    if not where and not options['all']:
+      raise CommandError("Pass --where to pick the rows, or --all for every one.")
+    for lookup, value in where.items():
+      if lookup.endswith('__in'):
+        where[lookup] = value.split(',')
+
+    form = ReassignForm(model, REASSIGN_FIELDS[model], assignments(options['set'], '--set'))
+    unknown = set(form.data) - set(form.fields)
+    if unknown:
+      raise CommandError("%s can't be reassigned." % ', '.join(sorted(unknown)))
+    if not form.is_valid():
+      raise CommandError('; '.join(
+        '%s: %s' % (name, ' '.join(errors)) if name != '__all__' else ' '.join(errors)
+        for name, errors in form.errors.items()
+      ))
+
+    queryset = model._base_manager.using(using).filter(**where)
+    if options['dry_run']:
+      self.stdout.write("%s %s would be reassigned." % (queryset.count(), model._meta.verbose_name_plural))
+      return
+    user = self.user(options['username'], using)
+    try:
+      count = reassign(queryset, form.changes(), user, using)
+    except IntegrityError:
+      raise CommandError("Nothing was changed: %s." % SAME_DEPARTMENT_ERROR)
+    self.stdout.write(self.style.SUCCESS("Reassigned %s %s." % (count, model._meta.verbose_name_plural)))
+
+  def user(self, username, using):
+    users = get_user_model()._default_manager.using(using).filter(is_active=True, is_staff=True)
+    user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+    if user is None:
+      raise CommandError("No active staff user to log the change for; create one or pass --username.")
+    return user
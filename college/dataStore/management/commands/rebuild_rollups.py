@@ -0,0 +1,24 @@
+"""
+Recompute the date rollups behind the admin date hierarchy.
+"""
+
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore.rollups import ROLLUP_FIELDS, rebuild_rollups
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Recompute the per year, month and day row counts of every rolled up model."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    for model in ROLLUP_FIELDS:
+      rebuild_rollups(model, using=options['database'])
+      self.stdout.write("Rebuilt the rollups of %s." % model._meta.label)
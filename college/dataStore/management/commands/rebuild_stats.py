@@ -0,0 +1,23 @@
+"""
+Recompute the department statistics behind the department and faculty lists.
+"""
+
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore.stats import rebuild_stats
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Recompute the per department counts of majors, minors and lecturers."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    rebuild_stats(using=options['database'])
+    self.stdout.write("Rebuilt the department statistics.")
@@ -0,0 +1,47 @@
+"""
+Send the mail queued by dataStore.mail.QueuedEmailBackend.
+"""
+
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from dataStore.mail import batch_size, send_batch
+
+
+
+
+class Command(BaseCommand):
+
+  help = "Send the due queued mail in batches, once or, with --loop, until interrupted."
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=batch_size(),
+      help="Messages sent per connection (default: DATASTORE_MAIL_BATCH).")
+    parser.add_argument('--loop', action='store_true',
+      help="Keep running, waiting --interval seconds whenever the queue is empty.")
+    parser.add_argument('--interval', type=float, default=5,
+      help="Seconds between two looks at an empty queue (default: 5).")
+    parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+  def handle(self, *args, **options):
+    if options['batch_size'] < 1:
+      raise CommandError("--batch-size must be positive.")
+    total_sent = total_failed = 0
+    try:
+      while True:
+        sent, failed = send_batch(options['batch_size'], options['database'])
+        total_sent += sent
+        total_failed += failed
+        if sent or failed:
+          if options['verbosity'] > 1:
+            self.stdout.write("Sent %s, failed %s." % (sent, failed))
+        elif not options['loop']:
+          break
+        else:
+          time.sleep(options['interval'])
+    except KeyboardInterrupt:
+      pass
+    self.stdout.write("Sent %s messages, %s attempts failed." % (total_sent, total_failed))
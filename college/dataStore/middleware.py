@@ -0,0 +1,289 @@
+"""
+Per request SQL and timing instrumentation, replica pinning, and static files.
+
+A sample of the requests is measured: the number and time of the SQL queries
+on every database, the view and template render times, and the total. They
+are sent back in a ``Server-Timing`` header, which the browser dev tools
+show, and requests slower than ``DATASTORE_SLOW_REQUEST_MS`` are logged as
+JSON with their slowest and duplicated queries. Requests left out of the
+sample only pay for one random() call.
+
+All the middleware run natively under ASGI as well as WSGI.
+"""
+
+
+import json
+import logging
+import random
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import routers
+from .staticfiles import StaticIndex
+
+
+logger = logging.getLogger('dataStore.timing')
+
+
+def sample_rate():
+  return getattr(settings, 'DATASTORE_TIMING_SAMPLE_RATE', 0)
+
+
+def slow_request_ms():
+  return getattr(settings, 'DATASTORE_SLOW_REQUEST_MS', 500)
+
+
+def duplicate_threshold():
+  return getattr(settings, 'DATASTORE_DUPLICATE_QUERIES', 5)
+
+
+def mark_view(request):
+  if hasattr(request, '_timing'):
+    request._timing['view'] = time.perf_counter()
+
+
+def mark_render(request, response):
+  # called once the view returned, right before the template is rendered.
+  timing = getattr(request, '_timing', None)
+  if timing is not None:
+    timing['render'] = time.perf_counter()
+    response.add_post_render_callback(lambda response: timing.update(rendered=time.perf_counter()))
+  return response
+
+
+
+
+class QueryRecorder:
+
+  "A database execute wrapper that keeps the SQL and duration of each query."
+
+  def __init__(self):
+    self.queries = []
+
+  def __call__(self, execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+      return execute(sql, params, many, context)
+    finally:
+      self.queries.append((sql, (time.perf_counter() - start) * 1000, context['connection'].alias))
+
+  @property
+  def total_ms(self):
+    return sum(ms for sql, ms, alias in self.queries)
+
+  def slowest(self, n=5):
+    return sorted(self.queries, key=lambda query: query[1], reverse=True)[:n]
+
+  def install(self):
+    "Wrap the connections of the current thread, where the queries run."
+    for connection in connections.all():
+      connection.execute_wrappers.append(self)
+
+  def uninstall(self):
+    for connection in connections.all():
+      if self in connection.execute_wrappers:
+        connection.execute_wrappers.remove(self)
+
+  def duplicates(self, threshold):
+    """
+    Return {sql: runs} of the same SQL text issued at least threshold
+    times, whatever its parameters, the mark of a query issued once per row.
+    """
+    runs = Counter(sql for sql, ms, alias in self.queries)
+    return {sql: n for sql, n in runs.most_common() if n >= threshold}
+
+
+
+
+class RequestTimingMiddleware:
+
+  """
+  Measure a sample of the requests, see the module docstring.
+
+  Put it right after SecurityMiddleware so the total covers the other
+  middleware. Streaming responses are measured up to their first byte.
+  """
+
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+      # keep the hooks on the event loop, sync ones would each hop threads.
+      self.process_view = self.aprocess_view
+      self.process_template_response = self.aprocess_template_response
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+    if random.random() >= sample_rate():
+      return self.get_response(request)
+
+    recorder = QueryRecorder()
+    request._timing = {'start': time.perf_counter()}
+    recorder.install()
+    try:
+      response = self.get_response(request)
+    finally:
+      recorder.uninstall()
+    return self.finish(request, response, recorder)
+
+  async def __acall__(self, request):
+    if random.random() >= sample_rate():
+      return await self.get_response(request)
+
+    # the ORM runs in the sync thread of the request, with its own connections.
+    recorder = QueryRecorder()
+    request._timing = {'start': time.perf_counter()}
+    await sync_to_async(recorder.install)()
+    try:
+      response = await self.get_response(request)
+    finally:
+      await sync_to_async(recorder.uninstall)()
+    return self.finish(request, response, recorder)
+
+  def finish(self, request, response, recorder):
+    timing = request._timing
+    timing['end'] = time.perf_counter()
+    metrics = self.metrics(timing, recorder)
+    response.headers['Server-Timing'] = ', '.join(
+      '%s;dur=%.1f%s' % (name, ms, ';desc="%s"' % desc if desc else '')
+      for name, ms, desc in metrics
+    )
+    if metrics[-1][1] >= slow_request_ms():
+      self.log_slow_request(request, response, metrics, recorder)
+    return response
+
+  def process_view(self, request, view_func, view_args, view_kwargs):
+    mark_view(request)
+
+  async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+    mark_view(request)
+
+  def process_template_response(self, request, response):
+    return mark_render(request, response)
+
+  async def aprocess_template_response(self, request, response):
+    return mark_render(request, response)
+
+  def metrics(self, timing, recorder):
+    "Return (name, ms, description) of the measures, the total last."
+    metrics = [('db', recorder.total_ms, '%s queries' % len(recorder.queries))]
+    if 'view' in timing:
+      view_end = timing.get('render', timing['end'])
+      metrics.append(('view', (view_end - timing['view']) * 1000, ''))
+    if 'rendered' in timing:
+      metrics.append(('template', (timing['rendered'] - timing['render']) * 1000, ''))
+    metrics.append(('total', (timing['end'] - timing['start']) * 1000, ''))
+    return metrics
+
+  def log_slow_request(self, request, response, metrics, recorder):
+    record = {
+      'method': request.method,
+      'path': request.get_full_path(),
+      'status': response.status_code,
+      'queries': len(recorder.queries),
+    }
+    record.update(('%s_ms' % name, round(ms, 1)) for name, ms, desc in metrics)
+    record['slowest'] = [
+      {'ms': round(ms, 2), 'database': alias, 'sql': sql} for sql, ms, alias in recorder.slowest()
+    ]
+    record['duplicates'] = [
+      {'runs': n, 'sql': sql} for sql, n in recorder.duplicates(duplicate_threshold()).items()
+    ]
+    logger.warning(json.dumps(record))
+
+
+
+
+class ReplicaPinningMiddleware:
+
+  """
+  Keep the reads of a POST (or other unsafe method) on the primary database
+  from its start, as set-based writes send no signal pinning them, and those
+  of the same browser for DATASTORE_REPLICA_PIN_SECONDS after it.
+
+  Put it before SessionMiddleware, which writes at the end of the request.
+  """
+
+  cookie_name = 'datastore_primary'
+
+  safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+    token = routers.pinned.set(self.pinned_by(request))
+    try:
+      return self.remember_write(request, self.get_response(request))
+    finally:
+      routers.pinned.reset(token)
+
+  async def __acall__(self, request):
+    token = routers.pinned.set(self.pinned_by(request))
+    try:
+      return self.remember_write(request, await self.get_response(request))
+    finally:
+      routers.pinned.reset(token)
+
+  def pinned_by(self, request):
+    if request.method not in self.safe_methods:
+      return 'write'
+    return 'cookie' if self.cookie_name in request.COOKIES else None
+
+  def remember_write(self, request, response):
+    if request.method not in self.safe_methods and routers.replicas():
+      response.set_cookie(self.cookie_name, '1', max_age=routers.pin_seconds(),
+        httponly=True, samesite='Lax')
+    return response
+
+
+
+
+class StaticFilesMiddleware:
+
+  """
+  Serve STATIC_ROOT, as collectstatic left it, when DATASTORE_SERVE_STATIC is
+  on: the precompressed variant the client accepts and far future caching
+  for the hashed names, see dataStore.staticfiles.
+
+  Put it right after SecurityMiddleware so the assets skip the rest. Files
+  added to STATIC_ROOT are served after a restart.
+  """
+
+  async_capable = True
+
+  def __init__(self, get_response):
+    if not getattr(settings, 'DATASTORE_SERVE_STATIC', False):
+      raise MiddlewareNotUsed
+    self.get_response = get_response
+    self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+    self.index = StaticIndex(settings.STATIC_ROOT)
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+    return self.serve(request) or self.get_response(request)
+
+  async def __acall__(self, request):
+    return self.serve(request) or await self.get_response(request)
+
+  def serve(self, request):
+    if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+      return self.index.response(request, request.path_info[len(self.prefix):])
+    return None
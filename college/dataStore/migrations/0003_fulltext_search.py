@@ -0,0 +1,113 @@
+"""
+Full text indexes used by the admin search boxes.
+
+The FTS5 tables are kept in sync by triggers, so bulk writes that skip the
+model save() stay searchable too. Nothing is created on databases other than
+SQLite, or on SQLite builds without FTS5; the admins then fall back to the
+default search.
+"""
+
+from django.db import migrations
+
+
+FORWARD = [
+    # person names, an external content index over dataStore_person.
+    """CREATE VIRTUAL TABLE "dataStore_person_fts" USING fts5(
+        first_name, middle_name, last_name,
+        content='dataStore_person', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER "dataStore_person_fts_ai" AFTER INSERT ON "dataStore_person" BEGIN
+        INSERT INTO "dataStore_person_fts" (rowid, first_name, middle_name, last_name)
+        VALUES (new.id, new.first_name, new.middle_name, new.last_name);
+    END""",
+    """CREATE TRIGGER "dataStore_person_fts_ad" AFTER DELETE ON "dataStore_person" BEGIN
+        INSERT INTO "dataStore_person_fts" ("dataStore_person_fts", rowid, first_name, middle_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.middle_name, old.last_name);
+    END""",
+    """CREATE TRIGGER "dataStore_person_fts_au" AFTER UPDATE OF first_name, middle_name, last_name
+        ON "dataStore_person" BEGIN
+        INSERT INTO "dataStore_person_fts" ("dataStore_person_fts", rowid, first_name, middle_name, last_name)
+        VALUES ('delete', old.id, old.first_name, old.middle_name, old.last_name);
+        INSERT INTO "dataStore_person_fts" (rowid, first_name, middle_name, last_name)
+        VALUES (new.id, new.first_name, new.middle_name, new.last_name);
+    END""",
+    """INSERT INTO "dataStore_person_fts" ("dataStore_person_fts") VALUES ('rebuild')""",
+
+    # department names. The primary key is the name itself, so the index
+    # keeps its own copy instead of relying on the implicit rowid.
+    """CREATE VIRTUAL TABLE "dataStore_department_fts" USING fts5(
+        name, tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER "dataStore_department_fts_ai" AFTER INSERT ON "dataStore_department" BEGIN
+        INSERT INTO "dataStore_department_fts" (name) VALUES (new.name);
+    END""",
+    """CREATE TRIGGER "dataStore_department_fts_ad" AFTER DELETE ON "dataStore_department" BEGIN
+        DELETE FROM "dataStore_department_fts" WHERE name = old.name;
+    END""",
+    """CREATE TRIGGER "dataStore_department_fts_au" AFTER UPDATE OF name ON "dataStore_department" BEGIN
+        UPDATE "dataStore_department_fts" SET name = new.name WHERE name = old.name;
+    END""",
+    'INSERT INTO "dataStore_department_fts" (name) SELECT name FROM "dataStore_department"',
+
+    # admin log entries, an external content index over django_admin_log.
+    """CREATE VIRTUAL TABLE "dataStore_logentry_fts" USING fts5(
+        object_repr, change_message,
+        content='django_admin_log', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER "dataStore_logentry_fts_ai" AFTER INSERT ON "django_admin_log" BEGIN
+        INSERT INTO "dataStore_logentry_fts" (rowid, object_repr, change_message)
+        VALUES (new.id, new.object_repr, new.change_message);
+    END""",
+    """CREATE TRIGGER "dataStore_logentry_fts_ad" AFTER DELETE ON "django_admin_log" BEGIN
+        INSERT INTO "dataStore_logentry_fts" ("dataStore_logentry_fts", rowid, object_repr, change_message)
+        VALUES ('delete', old.id, old.object_repr, old.change_message);
+    END""",
+    """CREATE TRIGGER "dataStore_logentry_fts_au" AFTER UPDATE OF object_repr, change_message
+        ON "django_admin_log" BEGIN
+        INSERT INTO "dataStore_logentry_fts" ("dataStore_logentry_fts", rowid, object_repr, change_message)
+        VALUES ('delete', old.id, old.object_repr, old.change_message);
+        INSERT INTO "dataStore_logentry_fts" (rowid, object_repr, change_message)
+        VALUES (new.id, new.object_repr, new.change_message);
+    END""",
+    """INSERT INTO "dataStore_logentry_fts" ("dataStore_logentry_fts") VALUES ('rebuild')""",
+]
+
+BACKWARD = [
+    'DROP TRIGGER IF EXISTS "%s_fts_%s"' % (table, event)
+    for table in ('dataStore_person', 'dataStore_department', 'dataStore_logentry')
+    for event in ('ai', 'ad', 'au')
+] + [
+    'DROP TABLE IF EXISTS "%s_fts"' % table
+    for table in ('dataStore_person', 'dataStore_department', 'dataStore_logentry')
+]
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_indexes(apps, schema_editor):
+    if has_fts5(schema_editor.connection):
+        for sql in FORWARD:
+            schema_editor.execute(sql, params=None)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in BACKWARD:
+            schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('dataStore', '0002_alter_lecturer_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataStore', '0003_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='department',
+            index=models.Index(fields=['time'], name='department_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='faculty',
+            index=models.Index(fields=['time'], name='faculty_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturer',
+            index=models.Index(fields=['rank', 'salary'], name='lecturer_rank_salary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturer',
+            index=models.Index(fields=['salary'], name='lecturer_salary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['first_name'], name='person_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['sex', 'first_name'], name='person_sex_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['time'], name='person_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['level'], name='student_level_idx'),
+        ),
+    ]
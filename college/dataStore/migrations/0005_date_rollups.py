@@ -0,0 +1,69 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:55
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+
+ROLLUP_FIELDS = [
+    ('dataStore', 'person', 'time'),
+    ('dataStore', 'lecturer', 'time'),
+    ('dataStore', 'student', 'time'),
+    ('dataStore', 'department', 'time'),
+    ('dataStore', 'faculty', 'time'),
+    ('admin', 'logentry', 'action_time'),
+]
+
+
+def fill_rollups(apps, schema_editor):
+    DateRollup = apps.get_model('dataStore', 'DateRollup')
+    using = schema_editor.connection.alias
+    for app_label, model_name, field in ROLLUP_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        days = (
+            model._base_manager.using(using)
+            .annotate(rollup_day=TruncDay(field)).order_by()
+            .values_list('rollup_day').annotate(n=Count('pk'))
+        )
+        counts = Counter()
+        for day, n in days:
+            day = timezone.localtime(day).date() if timezone.is_aware(day) else day.date()
+            counts['year', day.replace(month=1, day=1)] += n
+            counts['month', day.replace(day=1)] += n
+            counts['day', day] += n
+        DateRollup.objects.using(using).bulk_create([
+            DateRollup(model='%s.%s' % (app_label, model_name), period=period, date=date, count=n)
+            for (period, date), n in counts.items()
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('dataStore', '0004_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DateRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='model')),
+                ('period', models.CharField(choices=[('year', 'year'), ('month', 'month'), ('day', 'day')], max_length=5, verbose_name='period')),
+                ('date', models.DateField(verbose_name='date')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+            ],
+            options={
+                'verbose_name': 'date rollup',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='daterollup',
+            constraint=models.UniqueConstraint(fields=('model', 'period', 'date'), name='daterollup_unique'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+PERSON_FIELDS = (
+    'first_name', 'middle_name', 'last_name', 'birthday', 'sex', 'apt_no',
+    'lane_no', 'street', 'city', 'state', 'zipcode', 'time',
+)
+
+# record model, source model and {record field: source attribute} of each.
+RECORD_SOURCES = [
+    ('studentrecord', 'student', {'level': 'level', 'minor': 'minor_id', 'major': 'major_id'}),
+    ('lecturerrecord', 'lecturer', {
+        'rank': 'rank', 'salary': 'salary', 'office_address': 'office_address',
+        'office_phone': 'office_phone', 'department': 'department_id',
+    }),
+]
+
+
+def fill_records(apps, schema_editor):
+    if not getattr(settings, 'DATASTORE_READ_MODELS', False):
+        return
+    using = schema_editor.connection.alias
+    for record_name, model_name, role_fields in RECORD_SOURCES:
+        Record = apps.get_model('dataStore', record_name)
+        model = apps.get_model('dataStore', model_name)
+        rows = model._base_manager.using(using).order_by().values_list(
+            'pk', *PERSON_FIELDS, *role_fields.values())
+        batch = []
+        for row in rows.iterator(chunk_size=2000):
+            values = dict(zip(PERSON_FIELDS + tuple(role_fields), row[1:]))
+            # Person.format_full_name() and Person.format_address().
+            values['full_name'] = ('%(first_name)s %(middle_name)s %(last_name)s' % values).upper()
+            values['address'] = ('no %(apt_no)s, lane %(lane_no)s, %(street)s, %(city)s, %(state)s' % values).title()
+            batch.append(Record(id=row[0], **values))
+            if len(batch) == 1000:
+                Record.objects.using(using).bulk_create(batch)
+                batch = []
+        Record.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataStore', '0005_date_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturerRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=30, verbose_name='first name')),
+                ('middle_name', models.CharField(max_length=30, verbose_name='middle name')),
+                ('last_name', models.CharField(max_length=30, verbose_name='last name')),
+                ('birthday', models.DateField(verbose_name='birthday')),
+                ('sex', models.CharField(choices=[('M', 'male'), ('F', 'female'), ('P', 'private')], max_length=1, verbose_name='sex')),
+                ('apt_no', models.IntegerField(verbose_name='apartment number')),
+                ('lane_no', models.IntegerField(verbose_name='lane number')),
+                ('street', models.CharField(max_length=30, verbose_name='street')),
+                ('city', models.CharField(max_length=30, verbose_name='city')),
+                ('state', models.CharField(max_length=30, verbose_name='state')),
+                ('zipcode', models.IntegerField(verbose_name='zipcode')),
+                ('time', models.DateTimeField()),
+                ('full_name', models.CharField(max_length=92, verbose_name='full name')),
+                ('address', models.CharField(max_length=160, verbose_name='address')),
+                ('rank', models.CharField(choices=[('Ast', 'Assistance'), ('Asc', 'Associate'), ('Adj', 'Adjunct'), ('Res', 'Research'), ('Vst', 'Visiting')], max_length=3, verbose_name='rank')),
+                ('salary', models.CharField(choices=[('A', 'Below $30,000'), ('B', '$30,000 - $60,000'), ('C', '$61,000 - $90,000'), ('D', '$90,000 - $120,000'), ('E', 'Above $120,000')], max_length=3, verbose_name='salary')),
+                ('office_address', models.CharField(max_length=50, verbose_name='office address')),
+                ('office_phone', models.CharField(max_length=15, verbose_name='office phone')),
+                ('department', models.CharField(blank=True, max_length=30, null=True, verbose_name='department')),
+            ],
+            options={
+                'verbose_name': 'lecturer record',
+                'indexes': [models.Index(fields=['first_name'], name='lecturerrecord_first_name_idx'), models.Index(fields=['rank', 'salary'], name='lecturerrecord_rank_idx'), models.Index(fields=['salary'], name='lecturerrecord_salary_idx'), models.Index(fields=['time'], name='lecturerrecord_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=30, verbose_name='first name')),
+                ('middle_name', models.CharField(max_length=30, verbose_name='middle name')),
+                ('last_name', models.CharField(max_length=30, verbose_name='last name')),
+                ('birthday', models.DateField(verbose_name='birthday')),
+                ('sex', models.CharField(choices=[('M', 'male'), ('F', 'female'), ('P', 'private')], max_length=1, verbose_name='sex')),
+                ('apt_no', models.IntegerField(verbose_name='apartment number')),
+                ('lane_no', models.IntegerField(verbose_name='lane number')),
+                ('street', models.CharField(max_length=30, verbose_name='street')),
+                ('city', models.CharField(max_length=30, verbose_name='city')),
+                ('state', models.CharField(max_length=30, verbose_name='state')),
+                ('zipcode', models.IntegerField(verbose_name='zipcode')),
+                ('time', models.DateTimeField()),
+                ('full_name', models.CharField(max_length=92, verbose_name='full name')),
+                ('address', models.CharField(max_length=160, verbose_name='address')),
+                ('level', models.CharField(choices=[('Cls 1', 'Freshman'), ('Cls 2', 'Sophomore'), ('Cls 3', 'Junior'), ('Cls 4', 'Senior'), ('Cls 5', 'Graduate')], max_length=5, verbose_name='Class')),
+                ('minor', models.CharField(blank=True, max_length=30, null=True, verbose_name='minor')),
+                ('major', models.CharField(blank=True, max_length=30, null=True, verbose_name='major')),
+            ],
+            options={
+                'verbose_name': 'student record',
+                'indexes': [models.Index(fields=['first_name'], name='studentrecord_first_name_idx'), models.Index(fields=['level', 'first_name'], name='studentrecord_level_idx'), models.Index(fields=['sex', 'first_name'], name='studentrecord_sex_idx'), models.Index(fields=['time'], name='studentrecord_time_idx')],
+            },
+        ),
+        migrations.RunPython(fill_records, migrations.RunPython.noop),
+    ]
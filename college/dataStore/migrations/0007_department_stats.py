@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# kind of count, model and (department, value) fields of each.
+STAT_SOURCES = [
+    ('major', 'student', 'major', 'level'),
+    ('minor', 'student', 'minor', 'level'),
+    ('lecturer', 'lecturer', 'department', 'rank'),
+]
+
+
+def fill_stats(apps, schema_editor):
+    DepartmentStat = apps.get_model('dataStore', 'DepartmentStat')
+    using = schema_editor.connection.alias
+    for kind, model_name, department, value in STAT_SOURCES:
+        model = apps.get_model('dataStore', model_name)
+        rows = (
+            model._base_manager.using(using).filter(**{'%s__isnull' % department: False})
+            .order_by().values_list(department, value).annotate(n=Count('pk'))
+        )
+        DepartmentStat.objects.using(using).bulk_create([
+            DepartmentStat(department_id=name, kind=kind, value=key, count=n)
+            for name, key, n in rows
+        ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataStore', '0006_read_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('major', 'major students'), ('minor', 'minor students'), ('lecturer', 'lecturers')], max_length=8, verbose_name='kind')),
+                ('value', models.CharField(max_length=5, verbose_name='class or rank')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='dataStore.department', verbose_name='department')),
+            ],
+            options={
+                'verbose_name': 'department statistic',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='departmentstat',
+            constraint=models.UniqueConstraint(fields=('department', 'kind', 'value'), name='departmentstat_unique'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
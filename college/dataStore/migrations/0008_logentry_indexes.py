@@ -0,0 +1,40 @@
+"""
+Indexes for browsing the admin log by date, alone or under the user, content
+type and action filters. django_admin_log belongs to django.contrib.admin,
+so they are created here with plain SQL.
+"""
+
+from django.db import migrations
+
+
+INDEXES = [
+    ('logentry_action_time_idx', ['action_time']),
+    ('logentry_user_time_idx', ['user_id', 'action_time']),
+    ('logentry_content_type_time_idx', ['content_type_id', 'action_time']),
+    ('logentry_action_flag_time_idx', ['action_flag', 'action_time']),
+]
+
+
+def create_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for name, columns in INDEXES:
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+            quote(name), quote('django_admin_log'), ', '.join(quote(column) for column in columns),
+        ), params=None)
+
+
+def drop_indexes(apps, schema_editor):
+    for name, columns in INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(name), params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('dataStore', '0007_department_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
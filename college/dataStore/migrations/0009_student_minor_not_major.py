@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:52
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import F
+
+
+def check_minor_not_major(apps, schema_editor):
+    """
+    Refuse to add the constraint while students written outside the admin
+    form have their major as minor, listing them to be fixed by hand.
+    """
+    Student = apps.get_model('dataStore', 'Student')
+    using = schema_editor.connection.alias
+    conflicts = Student._base_manager.using(using).filter(minor=F('major'))
+    pks = list(conflicts.order_by('pk').values_list('pk', flat=True))
+    if pks:
+        raise IntegrityError(
+            "%d students have the same department as minor and major: %s. Change their minor or "
+            "major, then migrate again." % (len(pks), ', '.join(map(str, pks))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataStore', '0008_logentry_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_minor_not_major, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.CheckConstraint(check=models.Q(('minor', models.F('major')), _negated=True), name='student_minor_not_major', violation_error_message="A student can't have same department as minor and major"),
+        ),
+    ]
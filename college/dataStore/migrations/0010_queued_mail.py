@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataStore', '0009_student_minor_not_major'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedMail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.CharField(max_length=254, verbose_name='from')),
+                ('recipients', models.JSONField(verbose_name='recipients')),
+                ('subject', models.CharField(blank=True, max_length=255, verbose_name='subject')),
+                ('message', models.BinaryField(verbose_name='message')),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('failed', 'failed')], default='queued', max_length=6, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='send after')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('time', models.DateTimeField(auto_now_add=True, verbose_name='queued at')),
+            ],
+            options={
+                'verbose_name': 'queued mail',
+                'verbose_name_plural': 'queued mail',
+                'indexes': [models.Index(fields=['status', 'send_after'], name='queuedmail_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('dataStore', '0010_queued_mail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first', models.BigIntegerField(verbose_name='first ID')),
+                ('last', models.BigIntegerField(verbose_name='last ID')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='datastore_ranges', to='admin.logentry', verbose_name='log entry')),
+            ],
+            options={
+                'verbose_name': 'audit range',
+                'verbose_name_plural': 'audit ranges',
+                'indexes': [models.Index(fields=['first', 'last'], name='auditrange_pk_idx')],
+            },
+        ),
+    ]
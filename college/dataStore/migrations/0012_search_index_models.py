@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:31
+
+import dataStore.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('dataStore', '0011_audit_ranges'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentSearch',
+            fields=[
+                ('department', models.OneToOneField(db_column='name', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dataStore.department')),
+                ('document', dataStore.search.SearchDocument(db_column='dataStore_department_fts')),
+            ],
+            options={
+                'db_table': 'dataStore_department_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='LecturerRecordSearch',
+            fields=[
+                ('record', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dataStore.lecturerrecord')),
+                ('document', dataStore.search.SearchDocument(db_column='dataStore_person_fts')),
+            ],
+            options={
+                'db_table': 'dataStore_person_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='LogEntrySearch',
+            fields=[
+                ('entry', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='admin.logentry')),
+                ('document', dataStore.search.SearchDocument(db_column='dataStore_logentry_fts')),
+            ],
+            options={
+                'db_table': 'dataStore_logentry_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PersonSearch',
+            fields=[
+                ('person', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dataStore.person')),
+                ('document', dataStore.search.SearchDocument(db_column='dataStore_person_fts')),
+            ],
+            options={
+                'db_table': 'dataStore_person_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentRecordSearch',
+            fields=[
+                ('record', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dataStore.studentrecord')),
+                ('document', dataStore.search.SearchDocument(db_column='dataStore_person_fts')),
+            ],
+            options={
+                'db_table': 'dataStore_person_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,9 +1,31 @@
+from django.contrib.admin.models import LogEntry
 from django.db import models
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from . import functions
+from .form import SAME_DEPARTMENT_ERROR
+from .search import SearchDocument
+
 
 # Create your models here.
 
+class PersonQuerySet(models.QuerySet):
+  
+  def with_display(self):
+    """
+    Annotate the full_name and full_address of each person, built by the
+    database as fullName() and address() build them.
+    """
+    if 'full_name' in self.query.annotations:
+      return self
+    return self.annotate(full_name=functions.full_name(), full_address=functions.address())
+
+
+
+
 class Person(models.Model):
   
   """
@@ -32,12 +54,27 @@ class Person(models.Model):
   zipcode = models.IntegerField(verbose_name=_('zipcode'))
   time = models.DateTimeField(auto_now_add=True)
   
+  objects = PersonQuerySet.as_manager()
+  
+  
+  @staticmethod
+  def format_full_name(first_name, middle_name, last_name):
+    "Build a full name from its parts, without needing a model instance."
+    fullname = '%s %s %s' % (first_name, middle_name, last_name)
+    return fullname.upper()
+    
+    
+  @staticmethod
+  def format_address(apt_no, lane_no, street, city, state):
+    "Build an address from its parts, without needing a model instance."
+    address = 'no %s, lane %s, %s, %s, %s' % (apt_no, lane_no, street, city, state)
+    return address.title()
+  
   
   def fullName(self):
     "Returns the person's full name."
     verbose_name=_('full name')
-    fullname = '%s %s %s' % (self.first_name, self.middle_name, self.last_name)
-    return fullname.upper()
+    return self.format_full_name(self.first_name, self.middle_name, self.last_name)
     
     
   def __str__(self):
@@ -48,11 +85,17 @@ class Person(models.Model):
   def address(self):
     "Return the address of the person."
     verbose_name=_('address')
-    address = 'no %s, lane %s, %s, %s, %s' % (self.apt_no, self.lane_no, self.street, self.city, self.state)
-    return address.title()
+    return self.format_address(self.apt_no, self.lane_no, self.street, self.city, self.state)
     
   class Meta:
      verbose_name=_('Person')
+     indexes = [
+       # admin ordering, alone and under the sex filter.
+       models.Index(fields=['first_name'], name='person_first_name_idx'),
+       models.Index(fields=['sex', 'first_name'], name='person_sex_first_name_idx'),
+       # date_hierarchy of the person, student and lecturer admins.
+       models.Index(fields=['time'], name='person_time_idx'),
+     ]
     
     
    
@@ -99,6 +142,11 @@ class Lecturer(Person):
       
   class Meta:
     verbose_name=_('Lecturer')
+    indexes = [
+      # rank and salary filters, alone or together.
+      models.Index(fields=['rank', 'salary'], name='lecturer_rank_salary_idx'),
+      models.Index(fields=['salary'], name='lecturer_salary_idx'),
+    ]
   
    
 
@@ -137,12 +185,29 @@ class Student(Person):
       
    class Meta:
      verbose_name=_('Student')
+     indexes = [
+       models.Index(fields=['level'], name='student_level_idx'),
+     ]
+     constraints = [
+       # also holds for the UPDATEs of dataStore.reassign, which skip the form.
+       models.CheckConstraint(check=~Q(minor=F('major')), name='student_minor_not_major',
+         violation_error_message=SAME_DEPARTMENT_ERROR),
+     ]
  
  
        
 
 
 
+class DepartmentQuerySet(models.QuerySet):
+  
+  def with_display(self):
+    "Annotate the display_name of each department, its str()."
+    return self.annotate(display_name=functions.Title(F('name')))
+    
+    
+    
+    
 class Department(models.Model):
   
   """
@@ -158,16 +223,34 @@ class Department(models.Model):
   faculty = models.ForeignKey("Faculty", on_delete=models.CASCADE, related_name="departments", verbose_name=_('faculty'))
   time = models.DateTimeField(auto_now_add=True)
   
+  objects = DepartmentQuerySet.as_manager()
+  
   
   def __str__(self):
     return self.name.title()
   
   class Meta:
     verbose_name=_('Department')
+    indexes = [
+      models.Index(fields=['time'], name='department_time_idx'),
+    ]
     
  
  
     
+class FacultyQuerySet(models.QuerySet):
+  
+  def with_display(self):
+    "Annotate the display_name of each faculty, its str() in the active language."
+    names = Case(
+      *[When(name=value, then=Value(str(label))) for value, label in Faculty.clgType],
+      default=F('name'), output_field=CharField(),
+    )
+    return self.annotate(display_name=Concat(Value('faculty of '), names, output_field=CharField()))
+    
+    
+    
+    
 class Faculty(models.Model):
   
   """
@@ -190,6 +273,8 @@ class Faculty(models.Model):
   phone_no = models.CharField(max_length=30, verbose_name=_('phone'))
   time = models.DateTimeField(auto_now_add=True)
   
+  objects = FacultyQuerySet.as_manager()
+  
   
   def __str__(self):
     text = "faculty of %s" % (self.get_name_display())
@@ -197,6 +282,292 @@ class Faculty(models.Model):
   
   class Meta:
     verbose_name=_('Faculty')
+    indexes = [
+      models.Index(fields=['time'], name='faculty_time_idx'),
+    ]
   
 
-    
\ No newline at end of file
+      
+  
+  
+  
+class DateRollup(models.Model):
+  
+  """
+  Number of rows of a model created per year, month and day.
+  
+  It is kept up to date on every insert and delete, so the admin date
+  hierarchy doesn't have to scan the tables. See :mod:`dataStore.rollups`.
+  """
+  
+  periodType = (
+      ('year', _('year')),
+      ('month', _('month')),
+      ('day', _('day')),
+    )
+  
+  model = models.CharField(max_length=100, verbose_name=_('model'))
+  period = models.CharField(max_length=5, choices=periodType, verbose_name=_('period'))
+  date = models.DateField(verbose_name=_('date'))
+  count = models.IntegerField(default=0, verbose_name=_('count'))
+  
+  
+  def __str__(self):
+    return '%s %s %s: %s' % (self.model, self.period, self.date, self.count)
+  
+  class Meta:
+    verbose_name=_('date rollup')
+    constraints = [
+      models.UniqueConstraint(fields=['model', 'period', 'date'], name='daterollup_unique'),
+    ]
+  
+  
+  
+  
+class DepartmentStat(models.Model):
+  
+  """
+  Number of majors and minors of a department in one class, or of its
+  lecturers of one rank.
+  
+  Kept up to date on every save and delete of a student or lecturer, so the
+  department and faculty lists don't count the people tables. See
+  :mod:`dataStore.stats`.
+  """
+  
+  kindType = (
+      ('major', _('major students')),
+      ('minor', _('minor students')),
+      ('lecturer', _('lecturers')),
+    )
+  
+  department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='stats', verbose_name=_('department'))
+  kind = models.CharField(max_length=8, choices=kindType, verbose_name=_('kind'))
+  value = models.CharField(max_length=5, verbose_name=_('class or rank'))
+  count = models.IntegerField(default=0, verbose_name=_('count'))
+  
+  
+  def __str__(self):
+    return '%s %s %s: %s' % (self.department_id, self.kind, self.value, self.count)
+  
+  class Meta:
+    verbose_name=_('department statistic')
+    constraints = [
+      models.UniqueConstraint(fields=['department', 'kind', 'value'], name='departmentstat_unique'),
+    ]
+  
+  
+  
+  
+class PersonRecord(models.Model):
+  
+  """
+  Flattened copy of a person row, with its display strings precomputed.
+  
+  Base of the read models below, which let lists and exports of students
+  and lecturers scan one table instead of joining :model:`dataStore.Person`.
+  """
+  
+  id = models.BigIntegerField(primary_key=True, verbose_name=_('ID'))
+  first_name = models.CharField(max_length=30, verbose_name=_('first name'))
+  middle_name = models.CharField(max_length=30, verbose_name=_('middle name'))
+  last_name = models.CharField(max_length=30, verbose_name=_('last name'))
+  birthday = models.DateField(verbose_name=_('birthday'))
+  sex = models.CharField(max_length=1, choices=Person.sexType, verbose_name=_('sex'))
+  apt_no = models.IntegerField(verbose_name=_('apartment number'))
+  lane_no = models.IntegerField(verbose_name=_('lane number'))
+  street = models.CharField(max_length=30, verbose_name=_('street'))
+  city = models.CharField(max_length=30, verbose_name=_('city'))
+  state = models.CharField(max_length=30, verbose_name=_('state'))
+  zipcode = models.IntegerField(verbose_name=_('zipcode'))
+  time = models.DateTimeField()
+  full_name = models.CharField(max_length=92, verbose_name=_('full name'))
+  address = models.CharField(max_length=160, verbose_name=_('address'))
+  
+  
+  def __str__(self):
+    return self.full_name.title()
+  
+  class Meta:
+    abstract = True
+    
+    
+    
+    
+class StudentRecord(PersonRecord):
+  
+  """
+  Read model of :model:`dataStore.Student`, kept in sync by :mod:`dataStore.readmodels`.
+  """
+  
+  level = models.CharField(max_length=5, choices=Student.clsType, verbose_name=_('Class'))
+  minor = models.CharField(max_length=30, null=True, blank=True, verbose_name=_('minor'))
+  major = models.CharField(max_length=30, null=True, blank=True, verbose_name=_('major'))
+  
+  class Meta:
+    verbose_name=_('student record')
+    indexes = [
+      models.Index(fields=['first_name'], name='studentrecord_first_name_idx'),
+      models.Index(fields=['level', 'first_name'], name='studentrecord_level_idx'),
+      models.Index(fields=['sex', 'first_name'], name='studentrecord_sex_idx'),
+      models.Index(fields=['time'], name='studentrecord_time_idx'),
+    ]
+    
+    
+    
+    
+class LecturerRecord(PersonRecord):
+  
+  """
+  Read model of :model:`dataStore.Lecturer`, kept in sync by :mod:`dataStore.readmodels`.
+  """
+  
+  rank = models.CharField(max_length=3, choices=Lecturer.rankType, verbose_name=_('rank'))
+  salary = models.CharField(max_length=3, choices=Lecturer.salaryType, verbose_name=_('salary'))
+  office_address = models.CharField(max_length=50, verbose_name=_('office address'))
+  office_phone = models.CharField(max_length=15, verbose_name=_('office phone'))
+  department = models.CharField(max_length=30, null=True, blank=True, verbose_name=_('department'))
+  
+  class Meta:
+    verbose_name=_('lecturer record')
+    indexes = [
+      models.Index(fields=['first_name'], name='lecturerrecord_first_name_idx'),
+      models.Index(fields=['rank', 'salary'], name='lecturerrecord_rank_idx'),
+      models.Index(fields=['salary'], name='lecturerrecord_salary_idx'),
+      models.Index(fields=['time'], name='lecturerrecord_time_idx'),
+    ]
+    
+    
+    
+    
+class QueuedMail(models.Model):
+  
+  """
+  An outbound email waiting for ``manage.py send_queued_mail``, as the MIME
+  bytes the request built. See :mod:`dataStore.mail`.
+  """
+  
+  statusType = (
+      ('queued', _('queued')),
+      ('failed', _('failed')),
+    )
+  
+  from_email = models.CharField(max_length=254, verbose_name=_('from'))
+  recipients = models.JSONField(verbose_name=_('recipients'))
+  subject = models.CharField(max_length=255, blank=True, verbose_name=_('subject'))
+  message = models.BinaryField(verbose_name=_('message'))
+  status = models.CharField(max_length=6, choices=statusType, default='queued', verbose_name=_('status'))
+  attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_('attempts'))
+  send_after = models.DateTimeField(default=timezone.now, verbose_name=_('send after'))
+  last_error = models.TextField(blank=True, verbose_name=_('last error'))
+  time = models.DateTimeField(auto_now_add=True, verbose_name=_('queued at'))
+  
+  
+  def __str__(self):
+    return '%s → %s' % (self.subject, ', '.join(self.recipients))
+  
+  class Meta:
+    verbose_name=_('queued mail')
+    verbose_name_plural=_('queued mail')
+    indexes = [
+      # the worker reads the due mail, oldest first.
+      models.Index(fields=['status', 'send_after'], name='queuedmail_due_idx'),
+    ]
+    
+    
+    
+    
+class AuditRange(models.Model):
+  
+  """
+  A run of consecutive primary keys logged by one admin log entry of a bulk
+  action, so the history of each object still lists the entry. See
+  :mod:`dataStore.audit`.
+  """
+  
+  entry = models.ForeignKey(LogEntry, on_delete=models.CASCADE, related_name='datastore_ranges', verbose_name=_('log entry'))
+  first = models.BigIntegerField(verbose_name=_('first ID'))
+  last = models.BigIntegerField(verbose_name=_('last ID'))
+  
+  
+  def __str__(self):
+    return '%s-%s' % (self.first, self.last) if self.first != self.last else str(self.first)
+  
+  class Meta:
+    verbose_name=_('audit range')
+    verbose_name_plural=_('audit ranges')
+    indexes = [
+      # the history of an object looks for the ranges holding its ID.
+      models.Index(fields=['first', 'last'], name='auditrange_pk_idx'),
+    ]
+    
+    
+    
+    
+class SearchEntry(models.Model):
+  
+  """
+  A row of an FTS5 index of migration 0003, which creates the tables and
+  keeps them up to date by triggers. The subclasses only map them, for the
+  admin search to join; see :mod:`dataStore.search`.
+  """
+  
+  class Meta:
+    abstract = True
+    managed = False
+    
+    
+    
+    
+class PersonSearch(SearchEntry):
+  
+  person = models.OneToOneField(Person, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry')
+  document = SearchDocument(db_column='dataStore_person_fts')
+  
+  class Meta(SearchEntry.Meta):
+    db_table = 'dataStore_person_fts'
+    
+    
+    
+    
+class StudentRecordSearch(SearchEntry):
+  
+  # the records share the primary keys, and so the index, of the people.
+  record = models.OneToOneField(StudentRecord, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry')
+  document = SearchDocument(db_column='dataStore_person_fts')
+  
+  class Meta(SearchEntry.Meta):
+    db_table = 'dataStore_person_fts'
+    
+    
+    
+    
+class LecturerRecordSearch(SearchEntry):
+  
+  record = models.OneToOneField(LecturerRecord, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry')
+  document = SearchDocument(db_column='dataStore_person_fts')
+  
+  class Meta(SearchEntry.Meta):
+    db_table = 'dataStore_person_fts'
+    
+    
+    
+    
+class DepartmentSearch(SearchEntry):
+  
+  department = models.OneToOneField(Department, on_delete=models.DO_NOTHING, primary_key=True, db_column='name', related_name='search_entry')
+  document = SearchDocument(db_column='dataStore_department_fts')
+  
+  class Meta(SearchEntry.Meta):
+    db_table = 'dataStore_department_fts'
+    
+    
+    
+    
+class LogEntrySearch(SearchEntry):
+  
+  entry = models.OneToOneField(LogEntry, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry')
+  document = SearchDocument(db_column='dataStore_logentry_fts')
+  
+  class Meta(SearchEntry.Meta):
+    db_table = 'dataStore_logentry_fts'
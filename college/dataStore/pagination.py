@@ -0,0 +1,219 @@
+"""
+Cheap row counts for the admin changelists.
+
+Counts are cached per query and dropped whenever a row of the model family is
+written. The shared cache holds the version of each family; a count, keyed
+by that version, is also kept by the process in the "local" cache.
+Unfiltered counts of big tables come from the SQLite statistics
+(``sqlite_stat1``, filled by ANALYZE) and filtered counts stop after
+``DATASTORE_COUNT_LIMIT`` rows. When the count is not exact, the changelist
+only offers previous/next links.
+"""
+
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, PAGE_VAR
+from django.core.cache import cache, caches
+from django.core.paginator import Paginator, InvalidPage
+from django.db import connections, transaction, DatabaseError
+from django.utils.functional import cached_property
+
+
+def count_limit():
+  return getattr(settings, 'DATASTORE_COUNT_LIMIT', 10000)
+
+
+def count_timeout():
+  return getattr(settings, 'DATASTORE_COUNT_TIMEOUT', 300)
+
+
+def local_cache():
+  "The per process cache in front of the shared one, the shared one without it."
+  return caches['local'] if 'local' in settings.CACHES else cache
+
+
+def family_label(model):
+  """
+  Label shared by a model and its multi-table parents and children, since a
+  write to any of them can change the counts of the others.
+  """
+  parents = model._meta.get_parent_list()
+  root = parents[-1] if parents else model
+  return root._meta.label_lower
+
+
+def version_key(model):
+  return 'datastore:count-version:%s' % family_label(model)
+
+
+def count_version(model):
+  """
+  Return the version of the counts of model. A new one is made up when the
+  shared cache lost it, so the copies kept by the processes are not reused.
+  """
+  return cache.get_or_set(version_key(model), time.time_ns, None)
+
+
+def invalidate_counts(model):
+  """
+  Drop the cached counts of model and of its family, now and once the
+  transaction commits, since a count taken in between misses the write.
+  """
+  key = version_key(model)
+  cache.set(key, time.time_ns(), None)
+  transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def table_estimate(model, using):
+  "Return the row count of the table from sqlite_stat1, or None."
+  connection = connections[using]
+  if connection.vendor != 'sqlite':
+    return None
+  try:
+    with connection.cursor() as cursor:
+      cursor.execute(
+        'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [model._meta.db_table]
+      )
+      row = cursor.fetchone()
+  except DatabaseError:
+    return None
+  return int(row[0].split()[0]) if row else None
+
+
+def cached_count(queryset):
+  """
+  Return (count, exact) for queryset.
+
+  count is a lower bound when exact is False: either the table estimate or
+  one more than the count limit.
+  """
+  version = count_version(queryset.model)
+  sql, params = queryset.query.sql_with_params()
+  digest = hashlib.md5(('%s%r' % (sql, params)).encode()).hexdigest()
+  key = 'datastore:count:%s:%s:%s:%s' % (
+    queryset.db, family_label(queryset.model), version, digest
+  )
+
+  result = local_cache().get(key)
+  if result is None:
+    result = cache.get(key)
+    if result is None:
+      limit = count_limit()
+      estimate = None
+      if not queryset.query.where:
+        estimate = table_estimate(queryset.model, queryset.db)
+      if estimate is not None and estimate > limit:
+        result = (estimate, False)
+      else:
+        count = queryset.order_by()[:limit + 1].count()
+        result = (count, count <= limit)
+      cache.set(key, tuple(result), count_timeout())
+    local_cache().set(key, tuple(result), count_timeout())
+  return tuple(result)
+
+
+
+
+class CachedCountPaginator(Paginator):
+
+  """
+  A paginator counting through :func:`cached_count`.
+
+  When the count is not exact it is stretched so that the requested page and
+  the one after it stay reachable.
+  """
+
+  def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True,
+      page_number=1):
+    super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+    self.page_number = page_number
+    self.exact = True
+    self.known_count = None
+
+  @cached_property
+  def count(self):
+    self.known_count, self.exact = cached_count(self.object_list)
+    if self.exact:
+      return self.known_count
+    return max(self.known_count, self.page_number * self.per_page + 1)
+
+  @property
+  def capped(self):
+    "Whether counting stopped at the count limit, rather than being estimated."
+    return not self.exact and self.known_count == count_limit() + 1
+
+
+
+
+class CachedCountChangeList(ChangeList):
+
+  """
+  A changelist taking both of its counts from :func:`cached_count`.
+  """
+
+  def get_results(self, request):
+    paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+    result_count = paginator.count
+
+    if self.model_admin.show_full_result_count:
+      full_result_count, self.full_result_exact = cached_count(self.root_queryset)
+    else:
+      full_result_count, self.full_result_exact = None, True
+    can_show_all = paginator.exact and result_count <= self.list_max_show_all
+    multi_page = result_count > self.list_per_page
+
+    if (self.show_all and can_show_all) or not multi_page:
+      result_list = self.queryset._clone()
+    else:
+      try:
+        result_list = paginator.page(self.page_num).object_list
+      except InvalidPage:
+        raise IncorrectLookupParameters
+
+    self.result_count = result_count
+    self.show_full_result_count = self.model_admin.show_full_result_count
+    self.show_admin_actions = not self.show_full_result_count or bool(full_result_count)
+    self.full_result_count = full_result_count
+    self.result_list = result_list
+    self.can_show_all = can_show_all
+    self.multi_page = multi_page
+    self.paginator = paginator
+
+  @cached_property
+  def previous_page_url(self):
+    if self.page_num > 1:
+      return self.get_query_string({PAGE_VAR: self.page_num - 1})
+
+  @cached_property
+  def next_page_url(self):
+    following = self.queryset[self.page_num * self.list_per_page:]
+    if following.exists():
+      return self.get_query_string({PAGE_VAR: self.page_num + 1})
+
+
+
+
+class CachedCountMixin:
+
+  """
+  Use cached and estimated counts on an admin changelist.
+  """
+
+  paginator = CachedCountPaginator
+
+  def get_changelist(self, request, **kwargs):
+    return CachedCountChangeList
+
+  def get_paginator(self, request, queryset, per_page, orphans=0,
+      allow_empty_first_page=True):
+    try:
+      page_number = int(request.GET.get(PAGE_VAR, 1))
+    except ValueError:
+      page_number = 1
+    return self.paginator(
+      queryset, per_page, orphans, allow_empty_first_page, page_number=page_number
+    )
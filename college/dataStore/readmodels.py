@@ -0,0 +1,161 @@
+"""
+Flattened read models of students and lecturers.
+
+:model:`dataStore.StudentRecord` and :model:`dataStore.LecturerRecord` copy
+the person columns, the department names and the display strings of each
+student and lecturer, so reads scan a single table. They are written in the
+same transaction as the rows they copy, by the signals and the bulk helpers,
+when ``DATASTORE_READ_MODELS`` is on. ``manage.py check_read_models`` finds
+and repairs drift.
+"""
+
+
+from django.conf import settings
+from django.db import transaction, DEFAULT_DB_ALIAS
+
+from .models import Person, Lecturer, Student, StudentRecord, LecturerRecord
+from .pagination import invalidate_counts
+
+
+RECORDS = {
+  Student: StudentRecord,
+  Lecturer: LecturerRecord,
+}
+
+PERSON_FIELDS = (
+  'first_name', 'middle_name', 'last_name', 'birthday', 'sex', 'apt_no',
+  'lane_no', 'street', 'city', 'state', 'zipcode', 'time',
+)
+
+# record field: source attribute, for the fields that differ per role.
+ROLE_FIELDS = {
+  Student: {'level': 'level', 'minor': 'minor_id', 'major': 'major_id'},
+  Lecturer: {
+    'rank': 'rank', 'salary': 'salary', 'office_address': 'office_address',
+    'office_phone': 'office_phone', 'department': 'department_id',
+  },
+}
+
+
+def enabled():
+  return getattr(settings, 'DATASTORE_READ_MODELS', False)
+
+
+def source_fields(model):
+  "Names of the source columns a record of model is built from, pk first."
+  return ('pk',) + PERSON_FIELDS + tuple(ROLE_FIELDS[model].values())
+
+
+def build_record(model, values):
+  """
+  Return an unsaved record from the source_fields() values of a student or
+  lecturer, in a dict.
+  """
+  record = RECORDS[model](id=values['pk'])
+  for name in PERSON_FIELDS:
+    setattr(record, name, values[name])
+  for name, source in ROLE_FIELDS[model].items():
+    setattr(record, name, values[source])
+  record.full_name = Person.format_full_name(record.first_name, record.middle_name, record.last_name)
+  record.address = Person.format_address(
+    record.apt_no, record.lane_no, record.street, record.city, record.state,
+  )
+  return record
+
+
+def record_of(instance):
+  "Return the unsaved record of a Student or Lecturer instance."
+  model = instance._meta.concrete_model
+  values = {name: getattr(instance, name) for name in source_fields(model)}
+  return build_record(model, values)
+
+
+def save_records(model, records, using=DEFAULT_DB_ALIAS):
+  "Insert or replace records of model in bulk."
+  fields = [f.name for f in RECORDS[model]._meta.concrete_fields if not f.primary_key]
+  RECORDS[model].objects.using(using).bulk_create(
+    records, batch_size=500, update_conflicts=True, unique_fields=['id'], update_fields=fields,
+  )
+  invalidate_counts(RECORDS[model])
+
+
+def sync_instances(model, instances, using=DEFAULT_DB_ALIAS):
+  "Write the records of freshly saved students or lecturers."
+  if enabled():
+    save_records(model, [record_of(obj) for obj in instances], using)
+
+
+def sync_people(pks, using=DEFAULT_DB_ALIAS):
+  "Rewrite the records of the given people, whatever their role."
+  if not enabled():
+    return
+  for model in RECORDS:
+    rows = model._base_manager.using(using).filter(pk__in=pks).values(*source_fields(model))
+    save_records(model, [build_record(model, values) for values in rows], using)
+
+
+def drop_department(name, using=DEFAULT_DB_ALIAS):
+  "Mirror the SET_NULL of the department foreign keys, which sends no signal."
+  if not enabled():
+    return
+  StudentRecord.objects.using(using).filter(minor=name).update(minor=None)
+  StudentRecord.objects.using(using).filter(major=name).update(major=None)
+  LecturerRecord.objects.using(using).filter(department=name).update(department=None)
+
+
+def delete_records(model, pks, using=DEFAULT_DB_ALIAS):
+  if enabled():
+    RECORDS[model].objects.using(using).filter(pk__in=pks).delete()
+    invalidate_counts(RECORDS[model])
+
+
+def check_records(model, chunk_size=2000, using=DEFAULT_DB_ALIAS):
+  """
+  Compare the records of model with their source rows, walking both tables
+  in primary key order one chunk at a time.
+
+  Yield (kind, pk, record) with kind 'missing' or 'stale' and the expected
+  record, or 'orphan' and None.
+  """
+  record_model = RECORDS[model]
+  compared = [f.attname for f in record_model._meta.concrete_fields]
+  last = None
+  while True:
+    rows = model._base_manager.using(using).order_by('pk')
+    if last is not None:
+      rows = rows.filter(pk__gt=last)
+    expected = {
+      values['pk']: build_record(model, values)
+      for values in rows.values(*source_fields(model))[:chunk_size]
+    }
+    stop = max(expected) if len(expected) == chunk_size else None
+
+    records = record_model.objects.using(using).order_by('pk')
+    if last is not None:
+      records = records.filter(pk__gt=last)
+    if stop is not None:
+      records = records.filter(pk__lte=stop)
+    actual = {pk: values for pk, *values in records.values_list(*compared).iterator()}
+
+    for pk, record in expected.items():
+      if pk not in actual:
+        yield 'missing', pk, record
+      elif actual[pk] != [getattr(record, name) for name in compared[1:]]:
+        yield 'stale', pk, record
+    for pk in actual.keys() - expected.keys():
+      yield 'orphan', pk, None
+
+    if stop is None:
+      return
+    last = stop
+
+
+def repair_records(model, problems, using=DEFAULT_DB_ALIAS):
+  "Fix what check_records() found. Return the number of rows written or deleted."
+  problems = list(problems)
+  with transaction.atomic(using=using):
+    save_records(model, [record for kind, pk, record in problems if record is not None], using)
+    orphans = [pk for kind, pk, record in problems if kind == 'orphan']
+    RECORDS[model].objects.using(using).filter(pk__in=orphans).delete()
+  invalidate_counts(RECORDS[model])
+  return len(problems)
@@ -0,0 +1,147 @@
+"""
+Set based reassignment of students and lecturers.
+
+:func:`reassign` moves every student of a queryset to another major, minor
+or class, or every lecturer to another department, with one UPDATE of the
+people table and one of the read model, whatever the number of rows. The
+department counts move by one GROUP BY of the rows taken before the UPDATE,
+and one admin log entry, listing the rows as :mod:`dataStore.audit` does,
+sums the change up. The minor of a student can't be its major by the
+``student_minor_not_major`` check constraint, so an UPDATE breaking it fails
+as a whole, without a row checked in Python.
+
+The admin action :func:`reassign_selected` and ``manage.py reassign`` both
+call it.
+"""
+
+
+from collections import Counter
+
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.models import CHANGE
+from django.db import models, router, transaction, IntegrityError
+from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.utils.translation import gettext_lazy as _
+
+from . import audit, readmodels, stats
+from .form import ReassignForm, SAME_DEPARTMENT_ERROR
+from .models import Lecturer, Student
+from .pagination import invalidate_counts
+
+
+# fields of each model reassign() sets.
+REASSIGN_FIELDS = {
+  Student: ('major', 'minor', 'level'),
+  Lecturer: ('department',),
+}
+
+
+def column_values(model, changes):
+  "Return {attname: value} of {field name: value} changes, departments by primary key."
+  values = {}
+  for name, value in changes.items():
+    field = model._meta.get_field(name)
+    values[field.attname] = value.pk if isinstance(value, models.Model) else value
+  return values
+
+
+def moved_counts(model, rows, values):
+  """
+  Return the department count deltas of setting values on rows, from one
+  GROUP BY of their counted fields.
+  """
+  deltas = Counter()
+  groups = rows.order_by().values(*stats.source_fields(model)).annotate(datastore_rows=Count('pk'))
+  for group in groups:
+    n = group.pop('datastore_rows')
+    for key in stats.counted(model, group):
+      deltas[key] -= n
+    for key in stats.counted(model, dict(group, **values)):
+      deltas[key] += n
+  return deltas
+
+
+def log_reassignment(user, model, changes, pks, using):
+  "Write the admin log entry summing up a reassignment of the rows pks."
+  fields = [model._meta.get_field(name) for name in changes]
+  summary = ', '.join(
+    '%s: %s' % (field.verbose_name, dict(field.flatchoices).get(value, value))
+    for field, value in zip(fields, changes.values())
+  )
+  audit.log_bulk_action(
+    user, model, pks, CHANGE, '%s %s → %s' % (len(pks), model._meta.verbose_name_plural, summary),
+    [{'changed': {'fields': [str(field.verbose_name) for field in fields]}}], using,
+  )
+
+
+def reassign(queryset, changes, user=None, using=None):
+  """
+  Set {field name: value} changes on every row of a Student or Lecturer
+  queryset, in one transaction, and log it as done by user if given. Return
+  the number of rows changed.
+
+  Raise IntegrityError, and change nothing, when a student would get its
+  minor as major or the other way round.
+  """
+  model = queryset.model
+  unknown = set(changes) - set(REASSIGN_FIELDS[model])
+  if unknown or not changes:
+    raise ValueError("Can't reassign %s of %s." % (', '.join(sorted(unknown)) or 'nothing', model.__name__))
+  using = using or router.db_for_write(model)
+  values = column_values(model, changes)
+  # the changelist queryset may carry annotations, search and ordering.
+  rows = model._base_manager.using(using).filter(pk__in=queryset.order_by().values('pk'))
+
+  with transaction.atomic(using=using):
+    deltas = moved_counts(model, rows, values)
+    pks = list(rows.values_list('pk', flat=True)) if user is not None else []
+    if readmodels.enabled():
+      record_values = {
+        name: values[source] for name, source in readmodels.ROLE_FIELDS[model].items() if source in values
+      }
+      readmodels.RECORDS[model].objects.using(using).filter(pk__in=rows.values('pk')).update(**record_values)
+    # last, the statements above select the rows by their old values.
+    count = rows.update(**values)
+    stats.apply_deltas(deltas, using)
+    if count and user is not None:
+      log_reassignment(user, model, changes, pks, using)
+  invalidate_counts(model)
+  if readmodels.enabled():
+    invalidate_counts(readmodels.RECORDS[model])
+  return count
+
+
+@admin.action(description=_('Reassign selected %(verbose_name_plural)s'), permissions=['change'])
+def reassign_selected(modeladmin, request, queryset):
+  """
+  Ask for the new values of the selected rows, then reassign them all at
+  once, the rows of every page when "select all" was used.
+  """
+  model = queryset.model
+  form = ReassignForm(model, REASSIGN_FIELDS[model], request.POST if 'apply' in request.POST else None)
+  if form.is_valid():
+    try:
+      count = reassign(queryset, form.changes(), request.user)
+    except IntegrityError:
+      modeladmin.message_user(request, _("Nothing was changed: %s.") % SAME_DEPARTMENT_ERROR, messages.ERROR)
+      return None
+    name = model._meta.verbose_name if count == 1 else model._meta.verbose_name_plural
+    modeladmin.message_user(request, _('Reassigned %(count)d %(name)s.') % {'count': count, 'name': name},
+      messages.SUCCESS)
+    return None
+
+  opts = model._meta
+  context = {
+    **modeladmin.admin_site.each_context(request),
+    'title': _('Reassign %s') % opts.verbose_name_plural,
+    'opts': opts,
+    'form': form,
+    'count': queryset.count(),
+    'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+    'select_across': request.POST.get('select_across', '0'),
+    'action_checkbox_name': ACTION_CHECKBOX_NAME,
+    'media': modeladmin.media + form.media,
+  }
+  return TemplateResponse(request, 'admin/dataStore/reassign.html', context)
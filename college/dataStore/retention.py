@@ -0,0 +1,115 @@
+"""
+Retention of the admin log and of the sessions.
+
+Entries older than ``DATASTORE_LOG_RETENTION_DAYS`` are moved, oldest first,
+to gzipped JSON lines files under ``DATASTORE_LOG_ARCHIVE_DIR`` by
+``manage.py archive_log_entries``. Each batch is read, written and flushed to
+the archive, then deleted in its own short transaction, so the admin keeps
+writing meanwhile. A batch whose delete fails is archived again by the next
+run: readers of the archives should keep the last line of each id.
+
+Expired sessions are deleted the same way, a batch per transaction, by
+``manage.py purge_sessions``; Django's clearsessions deletes them all in one
+statement, which holds the SQLite write lock for as long.
+"""
+
+
+import json
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import AuditRange
+from .pagination import invalidate_counts
+from .rollups import add_to_rollups
+
+
+ARCHIVE_FIELDS = (
+  'id', 'action_time', 'user_id', 'user__username', 'content_type__app_label',
+  'content_type__model', 'object_id', 'object_repr', 'action_flag', 'change_message',
+)
+
+
+def retention_days():
+  return getattr(settings, 'DATASTORE_LOG_RETENTION_DAYS', 365)
+
+
+def archive_dir():
+  return getattr(settings, 'DATASTORE_LOG_ARCHIVE_DIR', settings.BASE_DIR / 'archive')
+
+
+def delete_entries(pks, using=DEFAULT_DB_ALIAS):
+  """
+  DELETE the log entries pks with one statement, without loading them, and
+  uncount them from the rollups. Return the number deleted.
+  """
+  connection = connections[using]
+  qn = connection.ops.quote_name
+  with transaction.atomic(using=using):
+    times = list(LogEntry.objects.using(using).filter(pk__in=pks).values_list('action_time', flat=True))
+    with connection.cursor() as cursor:
+      # the ranges of the bulk entries first, their change message keeps the IDs.
+      cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+        qn(AuditRange._meta.db_table), qn(AuditRange._meta.get_field('entry').column), ', '.join(['%s'] * len(pks)),
+      ), list(pks))
+      cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (
+        qn(LogEntry._meta.db_table), qn(LogEntry._meta.pk.column), ', '.join(['%s'] * len(pks)),
+      ), list(pks))
+    add_to_rollups(LogEntry, times, -1, using=using)
+  invalidate_counts(LogEntry)
+  return len(times)
+
+
+def archive_entries(before, stream, batch_size=1000, pause=0, using=DEFAULT_DB_ALIAS):
+  """
+  Move the log entries older than the before datetime to the text stream,
+  one JSON object per line, batch_size entries at a time, sleeping pause
+  seconds between batches. Return the number moved.
+  """
+  moved = 0
+  entries = LogEntry.objects.using(using).filter(action_time__lt=before).order_by('action_time', 'pk')
+  while True:
+    rows = list(entries.values(*ARCHIVE_FIELDS)[:batch_size])
+    if not rows:
+      return moved
+    for row in rows:
+      stream.write(json.dumps(row, default=lambda value: value.isoformat()) + '\n')
+    stream.flush()
+    moved += delete_entries([row['id'] for row in rows], using)
+    if pause:
+      time.sleep(pause)
+
+
+def session_purge_batch():
+  return getattr(settings, 'DATASTORE_SESSION_PURGE_BATCH', 1000)
+
+
+def session_model():
+  "Return the model of the sessions of SESSION_ENGINE, None when they have no table."
+  store = import_module(settings.SESSION_ENGINE).SessionStore
+  return store.get_model_class() if hasattr(store, 'get_model_class') else None
+
+
+def purge_sessions(batch_size=None, pause=0, using=DEFAULT_DB_ALIAS):
+  """
+  Delete the expired sessions, batch_size at a time, sleeping pause seconds
+  between batches. Return the number deleted.
+  """
+  model = session_model()
+  if model is None:
+    return 0
+  batch_size = batch_size or session_purge_batch()
+  deleted = 0
+  while True:
+    with transaction.atomic(using=using):
+      keys = list(model.objects.using(using).filter(expire_date__lt=timezone.now())
+        .values_list('pk', flat=True)[:batch_size])
+      if not keys:
+        return deleted
+      deleted += model.objects.using(using).filter(pk__in=keys).delete()[0]
+    if pause:
+      time.sleep(pause)
@@ -0,0 +1,168 @@
+"""
+Per model counts of rows created each year, month and day.
+
+The counts live in :model:`dataStore.DateRollup`. Signals add or remove one
+row per save or delete, the bulk helpers add theirs in one go, and
+``manage.py rebuild_rollups`` recomputes everything. The admin date
+hierarchy reads the counts instead of running DISTINCT over the tables, and
+probes the indexes of filtered lists the counts don't cover.
+"""
+
+
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Count, Min, Max
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from .models import Person, Lecturer, Student, Department, Faculty, DateRollup
+
+
+# models kept rolled up, and the field behind their date_hierarchy.
+ROLLUP_FIELDS = {
+  Person: 'time',
+  Lecturer: 'time',
+  Student: 'time',
+  Department: 'time',
+  Faculty: 'time',
+  LogEntry: 'action_time',
+}
+
+
+def periods(value):
+  "Return the first day of the year, month and day holding value."
+  if isinstance(value, datetime.datetime):
+    value = local_date(value)
+  return (
+    ('year', value.replace(month=1, day=1)),
+    ('month', value.replace(day=1)),
+    ('day', value),
+  )
+
+
+def add_to_rollups(model, values, sign=1, using=DEFAULT_DB_ALIAS):
+  """
+  Count the given date or datetime values in the rollups of model, or
+  uncount them with sign=-1.
+  """
+  deltas = Counter()
+  for value in values:
+    for period, date in periods(value):
+      deltas[period, date] += sign
+  apply_deltas(model, deltas, using)
+
+
+def apply_deltas(model, deltas, using=DEFAULT_DB_ALIAS):
+  "Add the {(period, date): delta} counts to the rollups of model, with upserts."
+  if not deltas:
+    return
+  connection = connections[using]
+  qn = connection.ops.quote_name
+  sql = (
+    'INSERT INTO {table} ({model}, {period}, {date}, {count}) VALUES (%s, %s, %s, %s) '
+    'ON CONFLICT ({model}, {period}, {date}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}'
+  ).format(table=qn(DateRollup._meta.db_table), model=qn('model'), period=qn('period'),
+    date=qn('date'), count=qn('count'))
+  label = model._meta.label_lower
+  with connection.cursor() as cursor:
+    cursor.executemany(sql, [
+      (label, period, connection.ops.adapt_datefield_value(date), delta)
+      for (period, date), delta in deltas.items() if delta
+    ])
+
+
+def rebuild_rollups(model, using=DEFAULT_DB_ALIAS):
+  "Recompute the rollups of model from its table, with one GROUP BY."
+  field = ROLLUP_FIELDS[model]
+  days = (
+    model._base_manager.using(using)
+    .annotate(rollup_day=TruncDay(field)).order_by()
+    .values_list('rollup_day').annotate(n=Count('pk'))
+  )
+  deltas = Counter()
+  for day, n in days.iterator():
+    for period, date in periods(day):
+      deltas[period, date] += n
+
+  with transaction.atomic(using=using):
+    DateRollup.objects.using(using).filter(model=model._meta.label_lower).delete()
+    apply_deltas(model, deltas, using)
+
+
+def rollup_dates(model, period, year=None, month=None, using=DEFAULT_DB_ALIAS):
+  "Return the dates of the given period holding at least one row, in order."
+  rows = DateRollup.objects.using(using).filter(
+    model=model._meta.label_lower, period=period, count__gt=0,
+  )
+  if year:
+    rows = rows.filter(date__year=year)
+  if month:
+    rows = rows.filter(date__month=month)
+  return list(rows.order_by('date').values_list('date', flat=True))
+
+
+def local_date(value):
+  return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def day_start(date):
+  "Return the datetime starting date, aware when time zones are on."
+  value = datetime.datetime.combine(date, datetime.time.min)
+  return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def next_period(period, date):
+  if period == 'year':
+    return date.replace(year=date.year + 1, month=1, day=1)
+  if period == 'month':
+    return (date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+  return date + datetime.timedelta(days=1)
+
+
+def probe_dates(queryset, field, period, year=None, month=None):
+  """
+  rollup_dates() for a filtered queryset the rollups can't answer: one MIN()
+  per period holding rows, each jumping past the previous period, so an
+  index on the filtered columns and field reads a handful of rows instead of
+  all of them.
+  """
+  start = end = None
+  if year:
+    start = datetime.date(int(year), int(month or 1), 1)
+    end = next_period('month' if month else 'year', start)
+  rows = queryset.order_by()
+  dates = []
+  while True:
+    bounded = rows
+    if start:
+      bounded = bounded.filter(**{'%s__gte' % field: day_start(start)})
+    if end:
+      bounded = bounded.filter(**{'%s__lt' % field: day_start(end)})
+    first = bounded.aggregate(first=Min(field))['first']
+    if first is None:
+      return dates
+    date = dict(periods(local_date(first)))[period]
+    dates.append(date)
+    start = next_period(period, date)
+
+
+def probe_range(queryset, field):
+  "rollup_range() for a filtered queryset, with two separate indexed lookups."
+  rows = queryset.order_by()
+  first = rows.aggregate(first=Min(field))['first']
+  last = rows.aggregate(last=Max(field))['last']
+  return {
+    'first': first and local_date(first),
+    'last': last and local_date(last),
+  }
+
+
+def rollup_range(model, using=DEFAULT_DB_ALIAS):
+  "Return the first and last days holding at least one row."
+  return DateRollup.objects.using(using).filter(
+    model=model._meta.label_lower, period='day', count__gt=0,
+  ).aggregate(first=Min('date'), last=Max('date'))
@@ -0,0 +1,66 @@
+"""
+Send the reads of the college data, the admin log and the sessions to the
+read replicas in ``DATASTORE_READ_REPLICAS``, and every write to the primary.
+
+Once a row of those apps is saved or deleted, see :mod:`dataStore.signals`,
+the reads of the rest of the request stay on the primary, and those of a POST
+(or other unsafe method) do from its start.
+:class:`dataStore.middleware.ReplicaPinningMiddleware` keeps the next few
+seconds of that browser there too, so a redirect after a save does not show
+stale rows while the replicas catch up. Asking where to write pins nothing,
+the admin does it to render a change form.
+"""
+
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+ROUTED_APPS = {'dataStore', 'admin', 'sessions'}
+
+# why the reads of the current context go to the primary: None, 'cookie' or 'write'.
+pinned = ContextVar('datastore_pinned_to_primary', default=None)
+
+
+def replicas():
+  return getattr(settings, 'DATASTORE_READ_REPLICAS', [])
+
+
+def pin_seconds():
+  return getattr(settings, 'DATASTORE_REPLICA_PIN_SECONDS', 5)
+
+
+def pin_to_primary():
+  pinned.set('write')
+
+
+
+
+class ReplicaRouter:
+
+  def db_for_read(self, model, **hints):
+    if model._meta.app_label not in ROUTED_APPS or not replicas():
+      return None
+    if pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+      return DEFAULT_DB_ALIAS
+    return random.choice(replicas())
+
+  def db_for_write(self, model, **hints):
+    if model._meta.app_label not in ROUTED_APPS:
+      return None
+    return DEFAULT_DB_ALIAS
+
+  def allow_relation(self, obj1, obj2, **hints):
+    databases = {DEFAULT_DB_ALIAS, *replicas()}
+    if obj1._state.db in databases and obj2._state.db in databases:
+      return True
+    return None
+
+  def allow_migrate(self, db, app_label, model_name=None, **hints):
+    # replicas are copies of the primary, schema included.
+    if db in replicas():
+      return False
+    return None
@@ -0,0 +1,124 @@
+"""
+Full text search over the SQLite FTS5 indexes created by migration 0003.
+
+Admins mix in :class:`FullTextSearchMixin` and name the index to use. Search
+terms are matched as word prefixes and results are ranked with bm25. When the
+index is not there (another database, or SQLite without FTS5) the default
+``LIKE`` search of the admin is used instead.
+
+Each index is mapped by unmanaged models, one per model it serves, whose
+``search_entry`` relation joins it to the indexed rows, so the searched
+querysets stay plain ORM queries that can be nested in others.
+"""
+
+
+import re
+
+from django.contrib.admin.views.main import ORDER_VAR
+from django.db import connections, models
+from django.db.models import FloatField, Func, Lookup
+
+
+
+
+class SearchDocument(models.TextField):
+
+  """
+  The hidden column of an FTS5 table, named after the table, which the
+  ``match`` lookup and :class:`Rank` take.
+  """
+
+
+
+
+@SearchDocument.register_lookup
+class Match(Lookup):
+
+  "document__match=query: the rows of the index matching an FTS5 query."
+
+  lookup_name = 'match'
+
+  def as_sql(self, compiler, connection):
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, rhs_params = self.process_rhs(compiler, connection)
+    return '%s MATCH %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+
+
+class Rank(Func):
+
+  "bm25() rank of the matching row of an index, lower is better."
+
+  function = 'bm25'
+  output_field = FloatField()
+
+
+class SearchIndex:
+
+  """
+  An FTS5 table, joined to the searched models by their ``search_entry``
+  relation.
+  """
+
+  def __init__(self, table):
+    self.table = table
+    self._available = {}
+
+  def available(self, using):
+    "Return whether the index exists in the database, checked once per alias."
+    if using not in self._available:
+      connection = connections[using]
+      self._available[using] = (
+        connection.vendor == 'sqlite'
+        and self.table in connection.introspection.table_names()
+      )
+    return self._available[using]
+
+  def search(self, queryset, match):
+    """
+    Join queryset to the rows matching the FTS5 query and annotate them with
+    their bm25 rank, lower is better.
+
+    The index is joined rather than queried per row: a correlated bm25()
+    subquery re-runs the whole MATCH for every matching row.
+    """
+    return queryset.filter(search_entry__document__match=match).annotate(
+      search_rank=Rank('search_entry__document'))
+
+
+PERSON_INDEX = SearchIndex('dataStore_person_fts')
+DEPARTMENT_INDEX = SearchIndex('dataStore_department_fts')
+LOGENTRY_INDEX = SearchIndex('dataStore_logentry_fts')
+
+
+def match_expression(search_term):
+  """
+  Turn an admin search term into an FTS5 query where every word must match
+  as a prefix, e.g. ``jo sm`` gives ``"jo"* "sm"*``.
+  """
+  words = re.findall(r'\w+', search_term)
+  return ' '.join('"%s"*' % word for word in words)
+
+
+
+
+class FullTextSearchMixin:
+
+  """
+  Serve the admin search box from a full text index.
+
+  Results are sorted by relevance unless the user picked a column ordering.
+  """
+
+  search_index = None
+
+  def get_search_results(self, request, queryset, search_term):
+    match = match_expression(search_term)
+    if not match or not self.search_index or not self.search_index.available(queryset.db):
+      return super().get_search_results(request, queryset, search_term)
+
+    queryset = self.search_index.search(queryset, match)
+    if ORDER_VAR not in request.GET:
+      queryset = queryset.order_by('search_rank', *queryset.query.order_by)
+    return queryset, False
@@ -0,0 +1,103 @@
+"""
+Signal receivers keeping the derived data of the app in step with writes.
+"""
+
+
+from admin_interface.models import Theme
+from django.contrib.admin.models import LogEntry
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import readmodels, routers, sqlite, stats
+from .models import Person, Lecturer, Student, Department, Faculty
+from .pagination import invalidate_counts
+from .rollups import ROLLUP_FIELDS, add_to_rollups
+from .views import clear_logo_cache
+
+
+COUNTED_MODELS = (Person, Lecturer, Student, Department, Faculty, LogEntry)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def drop_cached_counts(sender, **kwargs):
+  if sender in COUNTED_MODELS:
+    invalidate_counts(sender)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def pin_reads_to_primary(sender, **kwargs):
+  # the replicas may not have the row yet, see dataStore.routers.
+  if sender._meta.app_label in routers.ROUTED_APPS:
+    routers.pin_to_primary()
+
+
+@receiver(post_save)
+def count_created_row(sender, instance, created, using, **kwargs):
+  # parents of a multi-table model are saved without their own signal.
+  if created and sender in ROLLUP_FIELDS:
+    for model in [sender] + sender._meta.get_parent_list():
+      add_to_rollups(model, [getattr(instance, ROLLUP_FIELDS[model])], using=using)
+
+
+@receiver(post_delete)
+def uncount_deleted_row(sender, instance, using, **kwargs):
+  if sender in ROLLUP_FIELDS:
+    add_to_rollups(sender, [getattr(instance, ROLLUP_FIELDS[sender])], -1, using=using)
+
+
+@receiver(post_save, sender=Theme)
+@receiver(post_delete, sender=Theme)
+def drop_cached_logo(sender, **kwargs):
+  clear_logo_cache()
+
+
+@receiver(post_save)
+def sync_read_model(sender, instance, using, **kwargs):
+  if sender in readmodels.RECORDS:
+    readmodels.sync_instances(sender, [instance], using)
+  elif sender is Person:
+    readmodels.sync_people([instance.pk], using)
+
+
+@receiver(post_delete)
+def delete_read_model(sender, instance, using, **kwargs):
+  if sender in readmodels.RECORDS:
+    readmodels.delete_records(sender, [instance.pk], using)
+  elif sender is Department:
+    readmodels.drop_department(instance.pk, using)
+
+
+@receiver(pre_save)
+def remember_counted_values(sender, instance, using, **kwargs):
+  # a save may reassign the person, its old department has to lose it.
+  if sender in stats.STAT_FIELDS:
+    instance._stats_before = stats.stored_values(sender, instance.pk, using)
+
+
+@receiver(post_save)
+def move_department_stats(sender, instance, using, **kwargs):
+  if sender in stats.STAT_FIELDS:
+    before = instance.__dict__.pop('_stats_before', None)
+    stats.move_counts(sender, before, stats.instance_values(sender, instance), using)
+
+
+@receiver(post_delete)
+def uncount_department_stats(sender, instance, using, **kwargs):
+  if sender in stats.STAT_FIELDS:
+    stats.move_counts(sender, stats.instance_values(sender, instance), None, using)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+  if connection.vendor == 'sqlite':
+    sqlite.register_functions(connection)
+    sqlite.apply_pragmas(connection)
+
+
+@receiver(request_finished)
+def maintain_sqlite(sender, **kwargs):
+  sqlite.maintain_due_connections()
@@ -0,0 +1,72 @@
+"""
+The SQLite connection profile.
+
+Every new SQLite connection gets the ``DATASTORE_SQLITE_PRAGMAS``: the
+cache, mmap and temp_store pragmas keep more of the database in memory, and
+WAL journaling, when the settings turn it on, lets readers go on while the
+admin writes. Connections are kept across requests by ``CONN_MAX_AGE``, so
+the pragmas are paid once per connection, and each connection runs ``PRAGMA
+optimize`` and a passive WAL checkpoint every
+``DATASTORE_SQLITE_MAINTENANCE_INTERVAL`` seconds, after a request.
+
+Connections also get the SQL functions of :mod:`dataStore.functions` that
+SQLite lacks.
+"""
+
+
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def pragmas():
+  return getattr(settings, 'DATASTORE_SQLITE_PRAGMAS', {})
+
+
+def maintenance_interval():
+  return getattr(settings, 'DATASTORE_SQLITE_MAINTENANCE_INTERVAL', 3600)
+
+
+def apply_pragmas(connection, values=None):
+  "Run PRAGMA name = value for each item of values, the profile by default."
+  values = pragmas() if values is None else values
+  with connection.cursor() as cursor:
+    for name, value in values.items():
+      cursor.execute('PRAGMA %s = %s' % (name, value))
+  connection.datastore_maintenance_due = time.monotonic() + maintenance_interval()
+
+
+def register_functions(connection):
+  "Add the functions SQLite lacks and dataStore.functions uses."
+  connection.connection.create_function('datastore_title', 1,
+    lambda value: None if value is None else str(value).title(), deterministic=True)
+  connection.connection.create_function('datastore_upper', 1,
+    lambda value: None if value is None else str(value).upper(), deterministic=True)
+
+
+def read_pragmas(connection, names):
+  "Return {name: current value} of the given pragmas."
+  with connection.cursor() as cursor:
+    return {name: cursor.execute('PRAGMA %s' % name).fetchone()[0] for name in names}
+
+
+def maintain(connection):
+  """
+  Let SQLite refresh the statistics its planner and the changelist counts
+  read, and move the WAL back into the database without waiting on readers.
+  """
+  with connection.cursor() as cursor:
+    cursor.execute('PRAGMA optimize')
+    cursor.execute('PRAGMA wal_checkpoint(PASSIVE)')
+  connection.datastore_maintenance_due = time.monotonic() + maintenance_interval()
+
+
+def maintain_due_connections():
+  "Run maintain() on the open SQLite connections of this thread that are due."
+  now = time.monotonic()
+  for connection in connections.all(initialized_only=True):
+    if (connection.vendor == 'sqlite' and connection.connection is not None
+        and not connection.in_atomic_block
+        and getattr(connection, 'datastore_maintenance_due', now) <= now):
+      maintain(connection)
@@ -0,0 +1,178 @@
+"""
+Fingerprinted, precompressed static files, served by the application.
+
+``collectstatic`` with :class:`CompressedManifestStaticFilesStorage` writes a
+content hashed copy of every file, as ManifestStaticFilesStorage does, and a
+gzip (and brotli, when the ``brotli`` package is installed) variant next to
+each text file, so nothing is compressed per request.
+:class:`dataStore.middleware.StaticFilesMiddleware` serves ``STATIC_ROOT``
+from a :class:`StaticIndex`: the variant the client accepts, and
+``Cache-Control: immutable`` for one year on the hashed names, which change
+whenever their content does.
+"""
+
+
+import gzip
+import json
+import mimetypes
+import os
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml')
+
+# smaller files gain less than the headers of the response.
+MIN_COMPRESS_SIZE = 512
+
+# Content-Encoding: suffix of the variant file, by order of preference.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def max_age():
+  return getattr(settings, 'DATASTORE_STATIC_MAX_AGE', 60)
+
+
+def encoders():
+  "Return {suffix: compress function} of the available encodings."
+  functions = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+  if brotli is not None:
+    functions['.br'] = lambda data: brotli.compress(data, quality=11)
+  return functions
+
+
+def compress_file(path):
+  """
+  Write the compressed variants of the file at path that are smaller than
+  it. Return the suffixes written.
+  """
+  with open(path, 'rb') as stream:
+    data = stream.read()
+  written = []
+  if len(data) < MIN_COMPRESS_SIZE:
+    return written
+  for suffix, compress in encoders().items():
+    compressed = compress(data)
+    if len(compressed) < len(data) * 0.95:
+      with open(path + suffix, 'wb') as stream:
+        stream.write(compressed)
+      written.append(suffix)
+  return written
+
+
+def accepted_encodings(header):
+  "Return the content codings of an Accept-Encoding header with a non-zero q."
+  codings = set()
+  for item in header.split(','):
+    coding, _, params = item.strip().partition(';')
+    q = 1.0
+    if params.strip().startswith('q='):
+      try:
+        q = float(params.strip()[2:])
+      except ValueError:
+        q = 0
+    if coding and q > 0:
+      codings.add(coding.strip().lower())
+  return codings
+
+
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+  "ManifestStaticFilesStorage also writing the compressed variants of the text files."
+
+  def post_process(self, paths, dry_run=False, **options):
+    names = set()
+    for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+      if not isinstance(processed, Exception):
+        names.update(n for n in (name, hashed_name) if n)
+      yield name, hashed_name, processed
+    if dry_run:
+      return
+    for name in sorted(names):
+      if name.endswith(COMPRESSIBLE) and self.exists(name):
+        compress_file(self.path(name))
+
+
+
+
+class StaticIndex:
+
+  """
+  The files of a static root with their size, date and variants, read once,
+  as collectstatic left them.
+  """
+
+  def __init__(self, root, manifest_name='staticfiles.json'):
+    self.root = str(root)
+    self.files = {}
+    hashed = set()
+    try:
+      with open(os.path.join(self.root, manifest_name)) as stream:
+        hashed = set(json.load(stream).get('paths', {}).values())
+    except (OSError, ValueError):
+      pass
+    suffixes = tuple(ENCODINGS.values())
+    for directory, dirnames, filenames in os.walk(self.root):
+      for filename in filenames:
+        if filename.endswith(suffixes):
+          continue
+        path = os.path.join(directory, filename)
+        name = os.path.relpath(path, self.root).replace(os.sep, '/')
+        self.files[name] = {
+          'path': path,
+          'immutable': name in hashed,
+          'content_type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+          'variants': {
+            'identity': self.variant(path),
+            **{
+              coding: self.variant(path + suffix)
+              for coding, suffix in ENCODINGS.items() if os.path.exists(path + suffix)
+            },
+          },
+        }
+
+  def variant(self, path):
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+  def response(self, request, name):
+    "Return the response serving name to request, None if there is no such file."
+    entry = self.files.get(unquote(name))
+    if entry is None:
+      return None
+    codings = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    coding = next((c for c in ENCODINGS if c in codings and c in entry['variants']), 'identity')
+    variant = entry['variants'][coding]
+
+    etag = '"%x-%x-%s"' % (variant['mtime'], variant['size'], coding)
+    headers = {
+      'ETag': etag,
+      'Last-Modified': http_date(variant['mtime']),
+      'Cache-Control': IMMUTABLE if entry['immutable'] else 'public, max-age=%d' % max_age(),
+    }
+    if len(entry['variants']) > 1:
+      headers['Vary'] = 'Accept-Encoding'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+      response = HttpResponseNotModified()
+    else:
+      response = FileResponse(open(variant['path'], 'rb'), content_type=entry['content_type'])
+      response.headers.pop('Content-Disposition', None)
+      response.headers['Content-Length'] = variant['size']
+      if coding != 'identity':
+        response.headers['Content-Encoding'] = coding
+    for header, value in headers.items():
+      response.headers[header] = value
+    return response
@@ -0,0 +1,150 @@
+"""
+Per department counts of major students, minor students and lecturers.
+
+The counts live in :model:`dataStore.DepartmentStat`, one row per department,
+kind and student class or lecturer rank. Signals move a person's counts when
+it is saved or deleted, reassignments included, the bulk helpers add theirs
+in one go, and ``manage.py rebuild_stats`` recomputes everything. Updates
+through ``QuerySet.update()`` skip the signals and need a rebuild, except
+those of :func:`dataStore.reassign.reassign`, which moves the counts itself.
+
+The department and faculty admin lists read their totals from here instead
+of counting the people tables.
+"""
+
+
+from collections import Counter
+
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Lecturer, Student, Department, DepartmentStat
+
+
+# kinds of count of each model, with the (department, value) fields behind them.
+STAT_FIELDS = {
+  Student: {'major': ('major_id', 'level'), 'minor': ('minor_id', 'level')},
+  Lecturer: {'lecturer': ('department_id', 'rank')},
+}
+
+# annotation holding the total of each kind.
+TOTALS = {'major': 'major_count', 'minor': 'minor_count', 'lecturer': 'lecturer_count'}
+
+
+def source_fields(model):
+  "Return the attnames of model read by its counts."
+  return sorted({name for fields in STAT_FIELDS[model].values() for name in fields})
+
+
+def counted(model, values):
+  """
+  Return the (department, kind, value) counts a row holds, given {attname:
+  value} of its source fields.
+  """
+  keys = []
+  for kind, (department, value) in STAT_FIELDS[model].items():
+    if values[department] is not None:
+      keys.append((values[department], kind, values[value]))
+  return keys
+
+
+def stored_values(model, pk, using=DEFAULT_DB_ALIAS):
+  "Return the source fields of the row pk as saved, None if there is none."
+  if pk is None:
+    return None
+  return model._base_manager.using(using).filter(pk=pk).values(*source_fields(model)).first()
+
+
+def instance_values(model, instance):
+  return {name: getattr(instance, name) for name in source_fields(model)}
+
+
+def move_counts(model, before, after, using=DEFAULT_DB_ALIAS):
+  """
+  Move the counts of a row from its before to its after values, either of
+  which may be None for a created or deleted row.
+  """
+  deltas = Counter()
+  if before is not None:
+    deltas.subtract(counted(model, before))
+  if after is not None:
+    deltas.update(counted(model, after))
+  apply_deltas(deltas, using)
+
+
+def add_to_stats(model, objs, using=DEFAULT_DB_ALIAS):
+  "Count the new instances objs of model."
+  deltas = Counter()
+  for obj in objs:
+    deltas.update(counted(model, instance_values(model, obj)))
+  apply_deltas(deltas, using)
+
+
+def apply_deltas(deltas, using=DEFAULT_DB_ALIAS):
+  "Add the {(department, kind, value): delta} counts, with upserts."
+  deltas = {key: delta for key, delta in deltas.items() if delta}
+  if not deltas:
+    return
+  connection = connections[using]
+  qn = connection.ops.quote_name
+  # a deleted instance may still point to a department deleted since, skip those.
+  sql = (
+    'INSERT INTO {table} ({department}, {kind}, {value}, {count}) SELECT %s, %s, %s, %s '
+    'WHERE EXISTS (SELECT 1 FROM {departments} WHERE {name} = %s) '
+    'ON CONFLICT ({department}, {kind}, {value}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}'
+  ).format(table=qn(DepartmentStat._meta.db_table), department=qn('department_id'),
+    kind=qn('kind'), value=qn('value'), count=qn('count'),
+    departments=qn(Department._meta.db_table), name=qn(Department._meta.pk.column))
+  with connection.cursor() as cursor:
+    cursor.executemany(sql, [key + (delta, key[0]) for key, delta in deltas.items()])
+
+
+def rebuild_stats(using=DEFAULT_DB_ALIAS):
+  "Recompute every count from the people tables, with one GROUP BY per kind."
+  deltas = Counter()
+  for model, kinds in STAT_FIELDS.items():
+    for kind, (department, value) in kinds.items():
+      rows = (
+        model._base_manager.using(using).filter(**{'%s__isnull' % department: False})
+        .order_by().values_list(department, value).annotate(n=Count('pk'))
+      )
+      for name, key, n in rows.iterator():
+        deltas[name, kind, key] += n
+
+  with transaction.atomic(using=using):
+    DepartmentStat.objects.using(using).all().delete()
+    apply_deltas(deltas, using)
+
+
+def with_totals(queryset, department='department'):
+  """
+  Annotate queryset with the major_count, minor_count and lecturer_count of
+  the departments whose ``department`` lookup matches its rows: the
+  department itself by default, ``department__faculty`` for faculties.
+  """
+  return queryset.annotate(**{
+    name: Coalesce(Subquery(
+      DepartmentStat.objects.filter(**{department: OuterRef('pk')}, kind=kind)
+      .order_by().values('kind').annotate(total=Sum('count')).values('total'),
+      output_field=IntegerField(),
+    ), 0)
+    for kind, name in TOTALS.items()
+  })
+
+
+def breakdown(departments, using=DEFAULT_DB_ALIAS):
+  """
+  Return {kind: {value: count}} summed over the given department names, the
+  values in the order of their choices.
+  """
+  rows = (
+    DepartmentStat.objects.using(using).filter(department__in=departments, count__gt=0)
+    .order_by().values_list('kind', 'value').annotate(total=Sum('count'))
+  )
+  counts = {(kind, value): total for kind, value, total in rows}
+  choices = {'major': Student.clsType, 'minor': Student.clsType, 'lecturer': Lecturer.rankType}
+  return {
+    kind: {label: counts[kind, value] for value, label in choices[kind] if (kind, value) in counts}
+    for kind in TOTALS
+  }
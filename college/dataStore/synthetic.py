@@ -0,0 +1,183 @@
+"""
+Reproducible synthetic college data, for benchmarks and local load tests.
+
+Rows are written with raw bulk INSERTs and explicit primary keys, so the
+``time`` column can be spread over several years instead of being set to now.
+Only run it against a scratch database.
+"""
+
+
+import datetime
+import random
+
+from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.db.models import Min, Max
+from django.utils import timezone
+
+from .bulk import insert_rows
+from .models import Person, Lecturer, Student, Department, Faculty
+
+
+FIRST_NAMES = (
+  'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda',
+  'david', 'elizabeth', 'william', 'barbara', 'richard', 'susan', 'joseph', 'jessica',
+  'thomas', 'sarah', 'chinedu', 'ngozi', 'wei', 'fang', 'amadou', 'aminata',
+  'pierre', 'camille', 'emeka', 'funmilayo', 'hiroshi', 'yuki', 'olusegun', 'zainab',
+)
+
+LAST_NAMES = (
+  'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis',
+  'okafor', 'adeyemi', 'okonkwo', 'bello', 'wang', 'li', 'zhang', 'liu',
+  'martin', 'bernard', 'dubois', 'diallo', 'traore', 'tanaka', 'suzuki', 'ibrahim',
+)
+
+STREETS = ('main street', 'church road', 'market lane', 'station road', 'park avenue')
+CITIES = (('lagos', 'lagos'), ('ibadan', 'oyo'), ('abuja', 'fct'), ('enugu', 'enugu'))
+
+SUBJECTS = (
+  'physics', 'chemistry', 'biology', 'mathematics', 'statistics', 'geology',
+  'civil eng', 'mechanical eng', 'electrical eng', 'computer eng', 'chemical eng',
+  'agronomy', 'animal science', 'soil science', 'fisheries', 'forestry',
+  'anatomy', 'physiology', 'pharmacology', 'nursing', 'pathology',
+  'economics', 'accounting', 'banking', 'marketing', 'finance',
+  'history', 'philosophy', 'english', 'french', 'linguistics', 'music',
+)
+
+# admin actions of the log entries, mostly changes.
+ACTIONS = (
+  (ADDITION, '[{"added": {}}]'),
+  (CHANGE, '[{"changed": {"fields": ["Level"]}}]'),
+  (CHANGE, '[{"changed": {"fields": ["First name", "Last name"]}}]'),
+  (CHANGE, '[{"changed": {"fields": ["Salary"]}}]'),
+  (DELETION, ''),
+)
+
+SEED_USERNAME = 'synthetic'
+
+
+def person_fields(rng, pk, start, span):
+  first = rng.choice(FIRST_NAMES)
+  city, state = rng.choice(CITIES)
+  return dict(
+    id=pk,
+    first_name=first,
+    middle_name=rng.choice(FIRST_NAMES),
+    last_name=rng.choice(LAST_NAMES),
+    birthday=datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(20000)),
+    sex=rng.choice('MFP'),
+    apt_no=rng.randrange(1, 500),
+    lane_no=rng.randrange(1, 50),
+    street=rng.choice(STREETS),
+    city=city,
+    state=state,
+    zipcode=rng.randrange(100000, 999999),
+    time=start + datetime.timedelta(seconds=rng.randrange(span)),
+  )
+
+
+def create_departments(using=DEFAULT_DB_ALIAS):
+  "Create every faculty and one department per subject, if missing."
+  faculties = [
+    Faculty.objects.using(using).get_or_create(name=code, defaults={
+      'dean': 'dean of %s' % code.lower(), 'phone_no': '0800%04d' % n,
+    })[0]
+    for n, (code, label) in enumerate(Faculty.clgType)
+  ]
+  for n, subject in enumerate(SUBJECTS):
+    Department.objects.using(using).get_or_create(name=subject, defaults={
+      'phone_no': '0700%04d' % n, 'office_no': 100 + n,
+      'faculty': faculties[n * len(faculties) // len(SUBJECTS)],
+    })
+  return list(Department.objects.using(using).order_by('name').values_list('name', flat=True))
+
+
+def populate(students=0, lecturers=0, seed=0, years=5, batch_size=5000, using=DEFAULT_DB_ALIAS):
+  """
+  Add the given number of synthetic students and lecturers.
+
+  The same seed gives the same rows on an empty database. Returns the number
+  of people created.
+  """
+  rng = random.Random(seed)
+  departments = create_departments(using)
+  span = years * 365 * 24 * 3600
+  start = timezone.now() - datetime.timedelta(seconds=span)
+  next_id = (Person.objects.using(using).aggregate(last=Max('id'))['last'] or 0) + 1
+
+  plan = [(Student, students), (Lecturer, lecturers)]
+  for model, total in plan:
+    for offset in range(0, total, batch_size):
+      objs = []
+      for pk in range(next_id, next_id + min(batch_size, total - offset)):
+        obj = model(**person_fields(rng, pk, start, span))
+        obj.person_ptr_id = pk
+        if model is Student:
+          obj.level = rng.choice(Student.clsType)[0]
+          obj.major_id, obj.minor_id = rng.sample(departments, 2)
+          if rng.random() < 0.3:
+            obj.minor_id = None
+        else:
+          obj.rank = rng.choice(Lecturer.rankType)[0]
+          obj.salary = rng.choice(Lecturer.salaryType)[0]
+          obj.office_address = 'block %s' % rng.randrange(1, 20)
+          obj.office_phone = '0900%06d' % pk
+          obj.department_id = rng.choice(departments)
+        objs.append(obj)
+
+      with transaction.atomic(using=using):
+        insert_rows(Person, objs, using=using)
+        insert_rows(model, objs, using=using)
+      next_id += len(objs)
+
+  return students + lecturers
+
+
+def create_log_entries(count=0, seed=0, years=5, batch_size=5000, using=DEFAULT_DB_ALIAS):
+  """
+  Add count synthetic admin log entries on the existing students and
+  lecturers, made by a "synthetic" staff user without a usable password.
+  Returns the number of entries created.
+  """
+  targets = []
+  for model in (Student, Lecturer):
+    bounds = model.objects.using(using).aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is not None:
+      content_type = ContentType.objects.db_manager(using).get_for_model(model)
+      targets.append((content_type.pk, model._meta.verbose_name, bounds['first'], bounds['last']))
+  if not count or not targets:
+    return 0
+
+  User = get_user_model()
+  user = User.objects.db_manager(using).filter(username=SEED_USERNAME).first()
+  if user is None:
+    user = User(username=SEED_USERNAME, is_staff=True)
+    user.set_unusable_password()
+    user.save(using=using)
+
+  rng = random.Random(seed)
+  span = years * 365 * 24 * 3600
+  start = timezone.now() - datetime.timedelta(seconds=span)
+  next_id = (LogEntry.objects.using(using).aggregate(last=Max('id'))['last'] or 0) + 1
+  for offset in range(0, count, batch_size):
+    objs = []
+    for pk in range(next_id, next_id + min(batch_size, count - offset)):
+      content_type_id, name, first, last = rng.choice(targets)
+      flag, message = rng.choice(ACTIONS)
+      objs.append(LogEntry(
+        id=pk,
+        action_time=start + datetime.timedelta(seconds=rng.randrange(span)),
+        user_id=user.pk,
+        content_type_id=content_type_id,
+        object_id=str(rng.randint(first, last)),
+        object_repr='%s %s (%s)' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), name),
+        action_flag=flag,
+        change_message=message,
+      ))
+    with transaction.atomic(using=using):
+      insert_rows(LogEntry, objs, using=using)
+    next_id += len(objs)
+
+  return count
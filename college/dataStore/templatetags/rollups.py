@@ -0,0 +1,125 @@
+"""
+Date hierarchy for the admin changelists, read from the date rollups, or
+probed through the indexes when other filters apply.
+"""
+
+
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from dataStore.rollups import ROLLUP_FIELDS, probe_dates, probe_range, rollup_dates, rollup_range
+
+
+register = template.Library()
+
+
+def uses_rollups(cl):
+  """
+  The rollups count every row, so they can only stand in for the queryset
+  when nothing but the date hierarchy filters it.
+  """
+  if cl.query:
+    return False
+  lookups = {'%s__%s' % (cl.date_hierarchy, part) for part in ('year', 'month', 'day')}
+  return set(cl.get_filters_params()) <= lookups
+
+
+def rollup_date_hierarchy(cl):
+  """
+  Same as the admin date_hierarchy tag, with the dates taken from
+  :model:`dataStore.DateRollup`, or probed period by period in the
+  changelist queryset, instead of a DISTINCT over all its rows.
+  """
+  if ROLLUP_FIELDS.get(cl.model) != cl.date_hierarchy:
+    return date_hierarchy(cl)
+
+  field_name = cl.date_hierarchy
+  using = cl.queryset.db
+  if uses_rollups(cl):
+    find_dates = lambda period, year=None, month=None: rollup_dates(cl.model, period, year, month, using)
+    find_range = lambda: rollup_range(cl.model, using)
+  else:
+    find_dates = lambda period, year=None, month=None: probe_dates(cl.queryset, field_name, period, year, month)
+    find_range = lambda: probe_range(cl.queryset, field_name)
+
+  year_field = '%s__year' % field_name
+  month_field = '%s__month' % field_name
+  day_field = '%s__day' % field_name
+  year_lookup = cl.params.get(year_field)
+  month_lookup = cl.params.get(month_field)
+  day_lookup = cl.params.get(day_field)
+
+  def link(filters):
+    return cl.get_query_string(filters, ['%s__' % field_name])
+
+  if not (year_lookup or month_lookup or day_lookup):
+    # select appropriate start level
+    date_range = find_range()
+    if date_range['first'] and date_range['last']:
+      if date_range['first'].year == date_range['last'].year:
+        year_lookup = date_range['first'].year
+        if date_range['first'].month == date_range['last'].month:
+          month_lookup = date_range['first'].month
+
+  if year_lookup and month_lookup and day_lookup:
+    day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+    return {
+      'show': True,
+      'back': {
+        'link': link({year_field: year_lookup, month_field: month_lookup}),
+        'title': capfirst(formats.date_format(day, 'YEAR_MONTH_FORMAT')),
+      },
+      'choices': [{'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))}],
+    }
+  elif year_lookup and month_lookup:
+    days = find_dates('day', year_lookup, month_lookup)
+    return {
+      'show': True,
+      'back': {'link': link({year_field: year_lookup}), 'title': str(year_lookup)},
+      'choices': [
+        {
+          'link': link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+          'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT')),
+        }
+        for day in days
+      ],
+    }
+  elif year_lookup:
+    months = find_dates('month', year_lookup)
+    return {
+      'show': True,
+      'back': {'link': link({}), 'title': _('All dates')},
+      'choices': [
+        {
+          'link': link({year_field: year_lookup, month_field: month.month}),
+          'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+        }
+        for month in months
+      ],
+    }
+  else:
+    years = find_dates('year')
+    return {
+      'show': True,
+      'back': None,
+      'choices': [
+        {'link': link({year_field: str(year.year)}), 'title': str(year.year)}
+        for year in years
+      ],
+    }
+
+
+@register.tag(name='rollup_date_hierarchy')
+def rollup_date_hierarchy_tag(parser, token):
+  return InclusionAdminNode(
+    parser, token,
+    func=rollup_date_hierarchy,
+    template_name='date_hierarchy.html',
+    takes_context=False,
+  )
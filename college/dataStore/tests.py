@@ -0,0 +1,1398 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import socketserver
+import tempfile
+import threading
+
+from admin_interface.models import Theme
+from django.contrib.admin import site
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction, IntegrityError
+from django.http import HttpResponse
+from django.test import (
+  AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .admin import PersonAdmin
+from . import api, audit, retention, routers, sqlite, stats
+from .bulk import bulk_create_people
+from .models import (
+  Person, Lecturer, Student, Department, Faculty, DateRollup, DepartmentStat, StudentRecord, QueuedMail,
+  LecturerRecord, AuditRange,
+)
+from .middleware import QueryRecorder, ReplicaPinningMiddleware
+from .mail import send_batch
+from .pagination import invalidate_counts
+from .form import SAME_DEPARTMENT_ERROR
+from .reassign import reassign
+from .routers import ReplicaRouter
+from .rollups import add_to_rollups
+from .views import aindex, clear_logo_cache
+from .staticfiles import StaticIndex
+from .warmup import uncached_loaders, warm_templates
+from .search import match_expression
+
+
+def make_person_fields(n):
+  "Return the Person fields for the n-th synthetic person."
+  return dict(
+    first_name='first%s' % n, middle_name='middle%s' % n,
+    last_name='last%s' % n, birthday=datetime.date(2000, 1, 1),
+    sex='M', apt_no=n, lane_no=n, street='street', city='city',
+    state='state', zipcode=1000 + n,
+  )
+
+
+
+
+class ChangelistQueryCountTest(TestCase):
+
+  """
+  The changelist of every admin should run the same number of queries
+  whatever the number of rows on the page.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    cls.faculties = [
+      Faculty.objects.create(name=name, dean='dean %s' % name, phone_no='0')
+      for name in ('Sci', 'Eng', 'Med')
+    ]
+    cls.departments = [
+      Department.objects.create(name='dept%s' % n, phone_no='0', office_no=n,
+        faculty=cls.faculties[n % len(cls.faculties)])
+      for n in range(6)
+    ]
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def add_rows(self, model, start, stop):
+    for n in range(start, stop):
+      if model is Student:
+        Student.objects.create(level='Cls 1',
+          minor=self.departments[n % 6], major=self.departments[(n + 1) % 6],
+          **make_person_fields(n))
+      elif model is Lecturer:
+        Lecturer.objects.create(rank='Ast', salary='A', office_address='office',
+          office_phone='0', department=self.departments[n % 6],
+          **make_person_fields(n))
+      elif model is Person:
+        Person.objects.create(**make_person_fields(n))
+      elif model is LogEntry:
+        LogEntry.objects.create(user=self.user, object_id=n, object_repr='row %s' % n,
+          content_type=ContentType.objects.get_for_model([Person, Faculty][n % 2]),
+          action_flag=ADDITION)
+      else:
+        Department.objects.create(name='more%s' % n, phone_no='0', office_no=n,
+          faculty=self.faculties[n % len(self.faculties)])
+
+  def count_queries(self, model):
+    url = reverse('admin:%s_%s_changelist' % (model._meta.app_label, model._meta.model_name))
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get(url)
+    self.assertEqual(response.status_code, 200)
+    return len(queries)
+
+  def assertConstantQueries(self, model):
+    # The first admin page creates the default admin-interface theme.
+    self.count_queries(model)
+    self.add_rows(model, 0, 2)
+    few = self.count_queries(model)
+    self.add_rows(model, 2, 30)
+    many = self.count_queries(model)
+    self.assertEqual(few, many)
+
+  def test_person_changelist(self):
+    self.assertConstantQueries(Person)
+
+  def test_student_changelist(self):
+    self.assertConstantQueries(Student)
+
+  def test_lecturer_changelist(self):
+    self.assertConstantQueries(Lecturer)
+
+  def test_department_changelist(self):
+    self.assertConstantQueries(Department)
+
+  def test_log_entry_changelist(self):
+    self.assertConstantQueries(LogEntry)
+
+
+
+
+class ImportPeopleTest(TestCase):
+
+  """
+  The import_people command writes valid rows in batches and rejects the others.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    for name in ('Physics', 'Maths'):
+      Department.objects.create(name=name, phone_no='0', office_no=1, faculty=faculty)
+
+  def write_file(self, name, content):
+    path = os.path.join(self.tmpdir.name, name)
+    with open(path, 'w') as stream:
+      stream.write(content)
+    return path
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.tmpdir.cleanup)
+
+  def test_import_students_csv(self):
+    fields = make_person_fields(1)
+    header = ','.join(list(fields) + ['level', 'minor', 'major'])
+    row = ','.join(str(value) for value in fields.values())
+    path = self.write_file('students.csv', '\n'.join([
+      header,
+      row + ',Cls 1,physics,Maths',
+      row + ',Cls 2,Maths,maths',
+      row + ',Cls 3,Chemistry,Maths',
+      row + ',Cls 4,,',
+    ]))
+    out, err = io.StringIO(), io.StringIO()
+    call_command('import_people', path, role='student', batch_size=1, stdout=out, stderr=err)
+
+    self.assertIn('Imported 2 student(s), rejected 2 row(s)', out.getvalue())
+    self.assertIn("same department", err.getvalue())
+    self.assertIn("Unknown department 'Chemistry'", err.getvalue())
+    self.assertEqual(Person.objects.count(), 2)
+    student = Student.objects.get(level='Cls 1')
+    self.assertEqual((student.minor_id, student.major_id), ('Physics', 'Maths'))
+    self.assertEqual(student.birthday, datetime.date(2000, 1, 1))
+
+  def test_import_lecturers_jsonl(self):
+    rows = [
+      dict(make_person_fields(n), rank='Ast', salary='A', office_address='office',
+        office_phone='0', department='Physics')
+      for n in range(5)
+    ]
+    path = self.write_file('lecturers.jsonl', '\n'.join(json.dumps(row, default=str) for row in rows))
+    call_command('import_people', path, role='lecturer', batch_size=2, stdout=io.StringIO())
+
+    self.assertEqual(Lecturer.objects.filter(department='Physics').count(), 5)
+
+  def test_bad_jsonl_lines_are_rejected(self):
+    row = dict(make_person_fields(1), level='Cls 1', major='Physics')
+    path = self.write_file('students.jsonl', '\n'.join([
+      json.dumps(row, default=str),
+      '{"first_name": "broken",',
+      json.dumps(dict(row, minor=5), default=str),
+      '[1, 2]',
+      json.dumps(dict(row, level='Cls 2'), default=str),
+    ]))
+    out, err = io.StringIO(), io.StringIO()
+    call_command('import_people', path, role='student', batch_size=2, stdout=out, stderr=err)
+
+    self.assertIn('Imported 2 student(s), rejected 3 row(s)', out.getvalue())
+    self.assertIn('students.jsonl:2: Invalid JSON', err.getvalue())
+    self.assertIn("students.jsonl:3: Unknown department '5'", err.getvalue())
+    self.assertIn('students.jsonl:4: Not a JSON object', err.getvalue())
+    self.assertEqual(Student.objects.count(), 2)
+
+
+
+
+class ExportActionTest(TestCase):
+
+  """
+  The export actions stream the selected rows with the same display strings
+  as the model methods.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.department = Department.objects.create(name='Physics', phone_no='0',
+      office_no=1, faculty=faculty)
+    cls.students = [
+      Student.objects.create(level='Cls 1', major=cls.department, **make_person_fields(n))
+      for n in range(3)
+    ]
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def export(self, action):
+    response = self.client.post(reverse('admin:dataStore_student_changelist'), {
+      'action': action,
+      '_selected_action': [student.pk for student in self.students[:2]],
+    })
+    self.assertTrue(response.streaming)
+    return b''.join(response.streaming_content).decode()
+
+  def test_export_csv(self):
+    lines = self.export('export_csv').splitlines()
+    self.assertEqual(lines[0].split(',')[:3], ['id', 'full_name', 'address'])
+    self.assertEqual(len(lines), 3)
+    student = self.students[0]
+    self.assertIn(student.fullName(), lines[1])
+    self.assertIn('"%s"' % student.address(), lines[1])
+
+  def test_export_jsonl(self):
+    rows = [json.loads(line) for line in self.export('export_jsonl').splitlines()]
+    self.assertEqual([row['id'] for row in rows], [s.pk for s in self.students[:2]])
+    self.assertEqual(rows[0]['full_name'], self.students[0].fullName())
+    self.assertEqual(rows[0]['major'], 'Physics')
+
+
+
+
+class FullTextSearchTest(TestCase):
+
+  """
+  Admin searches go through the FTS5 indexes, which follow every write.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.physics = Department.objects.create(name='Physics', phone_no='0',
+      office_no=1, faculty=faculty)
+    cls.ada = Student.objects.create(level='Cls 1', **dict(make_person_fields(1),
+      first_name='Ada', middle_name='King', last_name='Lovelace'))
+    cls.alan = Lecturer.objects.create(rank='Ast', salary='A', office_address='office',
+      office_phone='0', **dict(make_person_fields(2),
+      first_name='Alan', middle_name='Mathison', last_name='Turing'))
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def search(self, model, term):
+    url = reverse('admin:dataStore_%s_changelist' % model._meta.model_name)
+    response = self.client.get(url, {'q': term})
+    self.assertEqual(response.status_code, 200)
+    return list(response.context['cl'].result_list)
+
+  def test_match_expression(self):
+    self.assertEqual(match_expression('jo  "sm'), '"jo"* "sm"*')
+    self.assertEqual(match_expression('%'), '')
+
+  def test_prefix_search(self):
+    self.assertEqual(self.search(Person, 'lov'), [self.ada.person_ptr])
+    self.assertEqual(self.search(Student, 'ada lo'), [self.ada])
+    self.assertEqual(self.search(Student, 'turing'), [])
+    self.assertEqual(self.search(Lecturer, 'Math'), [self.alan])
+    self.assertEqual(self.search(Department, 'phy'), [self.physics])
+
+  def test_index_follows_writes(self):
+    self.ada.last_name = 'Byron'
+    self.ada.save()
+    self.assertEqual(self.search(Student, 'lovelace'), [])
+    self.assertEqual(self.search(Student, 'byron'), [self.ada])
+
+    self.alan.delete()
+    self.assertEqual(self.search(Person, 'alan'), [])
+
+    self.physics.delete()
+    self.assertEqual(self.search(Department, 'physics'), [])
+
+  def test_ranking(self):
+    turing = Person.objects.create(**dict(make_person_fields(3),
+      first_name='Turing', middle_name='Turing', last_name='Turing'))
+    self.assertEqual(self.search(Person, 'turing'), [turing, self.alan.person_ptr])
+
+  def test_action_on_search_results(self):
+    # reassign() nests the searched queryset in subqueries, which re-alias it.
+    Student.objects.create(level='Cls 1', **make_person_fields(3))
+    for model, person, term, changes in (
+      (Student, self.ada, 'ada', {'level': 'Cls 2'}),
+      (Lecturer, self.alan, 'turing', {'department': 'Physics'}),
+    ):
+      url = reverse('admin:dataStore_%s_changelist' % model._meta.model_name) + '?q=' + term
+      response = self.client.post(url, dict(changes, action='reassign_selected', select_across='1',
+        apply='1', **{ACTION_CHECKBOX_NAME: [person.pk]}), follow=True)
+      self.assertContains(response, 'Reassigned 1 ')
+    self.assertEqual(sorted(Student.objects.values_list('level', flat=True)), ['Cls 1', 'Cls 2'])
+    self.assertEqual(Lecturer.objects.get().department, self.physics)
+
+
+
+
+class CachedCountTest(TestCase):
+
+  """
+  Changelist counts are cached until the next write, and capped on big tables.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    for n in range(12):
+      Person.objects.create(**dict(make_person_fields(n), sex='MF'[n % 2]))
+
+  def setUp(self):
+    cache.clear()
+    self.client.force_login(self.user)
+    self.url = reverse('admin:dataStore_person_changelist')
+
+  def test_counts_are_cached_until_a_write(self):
+    # The first admin page creates the default admin-interface theme.
+    self.client.get(self.url)
+    invalidate_counts(Person)
+    with CaptureQueriesContext(connection) as first:
+      self.client.get(self.url)
+    with CaptureQueriesContext(connection) as second:
+      response = self.client.get(self.url)
+    counts = lambda queries: [q for q in queries.captured_queries if 'COUNT(' in q['sql']]
+    self.assertEqual(len(counts(first)), 2)
+    self.assertEqual(counts(second), [])
+    self.assertEqual(response.context['cl'].result_count, 12)
+
+    Person.objects.create(**make_person_fields(12))
+    response = self.client.get(self.url)
+    self.assertEqual(response.context['cl'].result_count, 13)
+    self.assertEqual(response.context['cl'].full_result_count, 13)
+
+  @override_settings(DATASTORE_COUNT_LIMIT=5)
+  def test_capped_count_pages_with_next_links(self):
+    admin = PersonAdmin(Person, site)
+    admin.list_per_page = 2
+
+    cl = admin.get_changelist_instance(self.get_request({'sex': 'M', 'p': '2'}))
+    self.assertFalse(cl.paginator.exact)
+    self.assertEqual(len(cl.result_list), 2)
+    self.assertEqual(cl.previous_page_url, '?p=1&sex=M')
+    self.assertEqual(cl.next_page_url, '?p=3&sex=M')
+
+    cl = admin.get_changelist_instance(self.get_request({'sex': 'M', 'p': '3'}))
+    self.assertEqual(len(cl.result_list), 2)
+    self.assertIsNone(cl.next_page_url)
+
+    response = self.client.get(self.url, {'sex': 'M'})
+    self.assertContains(response, 'more than 5')
+
+  def get_request(self, params):
+    request = RequestFactory().get(self.url, params)
+    request.user = self.user
+    return request
+
+
+
+
+class DateRollupTest(TestCase):
+
+  """
+  The date rollups follow inserts and deletes, and feed the date hierarchy.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def counts(self, model, period):
+    return dict(DateRollup.objects.filter(model=model._meta.label_lower, period=period)
+      .values_list('date', 'count'))
+
+  def test_rollups_follow_writes(self):
+    student = Student.objects.create(level='Cls 1', **make_person_fields(1))
+    Student.objects.create(level='Cls 1', **make_person_fields(2))
+    today = timezone.localdate()
+    self.assertEqual(self.counts(Student, 'day'), {today: 2})
+    self.assertEqual(self.counts(Person, 'month'), {today.replace(day=1): 2})
+    self.assertEqual(self.counts(Lecturer, 'year'), {})
+
+    student.delete()
+    self.assertEqual(self.counts(Student, 'day'), {today: 1})
+    self.assertEqual(self.counts(Person, 'year'), {today.replace(month=1, day=1): 1})
+
+  def test_rebuild(self):
+    people = [Student(level='Cls 1', **make_person_fields(n)) for n in range(3)]
+    bulk_create_people(Student, people)
+    expected = self.counts(Person, 'day')
+    self.assertEqual(sum(expected.values()), 3)
+
+    DateRollup.objects.all().delete()
+    call_command('rebuild_rollups', stdout=io.StringIO())
+    self.assertEqual(self.counts(Person, 'day'), expected)
+    self.assertEqual(self.counts(Student, 'day'), expected)
+
+  def test_date_hierarchy_reads_rollups(self):
+    Person.objects.create(**make_person_fields(1))
+    # dates outside of the table, only the rollups know about them.
+    add_to_rollups(Person, [datetime.date(2001, 5, 3), datetime.date(2001, 7, 1)])
+    url = reverse('admin:dataStore_person_changelist')
+
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get(url)
+    self.assertFalse([q for q in queries.captured_queries if 'DISTINCT' in q['sql']])
+    self.assertContains(response, '?time__year=2001')
+
+    response = self.client.get(url, {'time__year': '2001'})
+    self.assertContains(response, '?time__month=5&amp;time__year=2001')
+    self.assertContains(response, '?time__month=7&amp;time__year=2001')
+
+    response = self.client.get(url, {'sex': 'M'})
+    self.assertNotContains(response, 'time__year=2001')
+
+
+
+
+class DepartmentStatTest(TestCase):
+
+  """
+  The department counts follow saves, reassignments and deletes, and feed
+  sortable columns of the department and faculty lists.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    cls.sci = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.arts = Faculty.objects.create(name='Arts', dean='dean of arts', phone_no='0')
+    cls.physics = Department.objects.create(name='Physics', phone_no='0', office_no=1, faculty=cls.sci)
+    cls.maths = Department.objects.create(name='Maths', phone_no='0', office_no=2, faculty=cls.sci)
+    cls.music = Department.objects.create(name='Music', phone_no='0', office_no=3, faculty=cls.arts)
+
+  def counts(self):
+    return {
+      (stat.department_id, stat.kind, stat.value): stat.count
+      for stat in DepartmentStat.objects.filter(count__gt=0)
+    }
+
+  def test_counts_follow_writes(self):
+    student = Student.objects.create(level='Cls 1', major=self.physics, minor=self.maths,
+      **make_person_fields(1))
+    Lecturer.objects.create(rank='Ast', salary='A', office_address='office', office_phone='0',
+      department=self.physics, **make_person_fields(2))
+    self.assertEqual(self.counts(), {
+      ('Physics', 'major', 'Cls 1'): 1, ('Maths', 'minor', 'Cls 1'): 1,
+      ('Physics', 'lecturer', 'Ast'): 1,
+    })
+
+    student.major, student.minor, student.level = self.music, None, 'Cls 2'
+    student.save()
+    self.assertEqual(self.counts(), {
+      ('Music', 'major', 'Cls 2'): 1, ('Physics', 'lecturer', 'Ast'): 1,
+    })
+
+    Person.objects.get(pk=student.pk).delete()
+    self.physics.delete()
+    self.assertEqual(self.counts(), {})
+
+  def test_bulk_inserts_and_rebuild(self):
+    bulk_create_people(Student, [
+      Student(level='Cls %s' % (n % 2 + 1), major=self.physics, **make_person_fields(n))
+      for n in range(5)
+    ])
+    expected = {('Physics', 'major', 'Cls 1'): 3, ('Physics', 'major', 'Cls 2'): 2}
+    self.assertEqual(self.counts(), expected)
+
+    DepartmentStat.objects.update(count=0)
+    call_command('rebuild_stats', stdout=io.StringIO())
+    self.assertEqual(self.counts(), expected)
+    self.assertEqual(stats.breakdown(['Physics'])['major'], {'Freshman': 3, 'Sophomore': 2})
+
+  def test_admin_columns_sort(self):
+    for n, department in enumerate([self.physics, self.maths, self.maths]):
+      Student.objects.create(level='Cls 1', major=department, **make_person_fields(n))
+    self.client.force_login(self.user)
+
+    response = self.client.get(reverse('admin:dataStore_department_changelist'), {'o': '-5'})
+    self.assertEqual([d.name for d in response.context['cl'].result_list], ['Maths', 'Physics', 'Music'])
+    self.assertEqual(response.context['cl'].result_list[0].major_count, 2)
+
+    response = self.client.get(reverse('admin:dataStore_faculty_changelist'), {'o': '-4'})
+    self.assertEqual([(f.name, f.major_count) for f in response.context['cl'].result_list],
+      [('Sci', 3), ('Arts', 0)])
+
+    response = self.client.get(reverse('admin:dataStore_faculty_change', args=['Sci']))
+    self.assertContains(response, 'Freshman 3')
+
+
+
+
+class ReassignTest(TestCase):
+
+  """
+  Bulk reassignments update every row at once, move the department counts
+  and read models along, and respect the minor/major check constraint.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.physics, cls.maths, cls.music = [
+      Department.objects.create(name=name, phone_no='0', office_no=n, faculty=faculty)
+      for n, name in enumerate(['Physics', 'Maths', 'Music'])
+    ]
+    for n in range(6):
+      Student.objects.create(level='Cls %s' % (n % 2 + 1), major=cls.physics,
+        minor=cls.maths if n < 2 else None, **make_person_fields(n))
+
+  def counts(self):
+    return {
+      (stat.department_id, stat.kind, stat.value): stat.count
+      for stat in DepartmentStat.objects.filter(count__gt=0)
+    }
+
+  def test_reassign(self):
+    with CaptureQueriesContext(connection) as queries:
+      count = reassign(Student.objects.filter(major=self.physics, level='Cls 1'),
+        {'major': self.music, 'level': 'Cls 4'}, self.user)
+    self.assertEqual(count, 3)
+    self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+    self.assertEqual(Student.objects.filter(major=self.music, level='Cls 4').count(), 3)
+    self.assertEqual(StudentRecord.objects.filter(major='Music', level='Cls 4').count(), 3)
+
+    counts = self.counts()
+    call_command('rebuild_stats', stdout=io.StringIO())
+    self.assertEqual(counts, self.counts())
+    self.assertEqual(counts[('Music', 'major', 'Cls 4')], 3)
+
+    entry = LogEntry.objects.get()
+    self.assertEqual(entry.object_repr, '3 Students → major: Music, Class: Senior')
+    self.assertEqual(entry.get_change_message(), 'Changed major and Class.')
+    self.assertEqual(entry.datastore_ranges.count(), 3)
+    self.assertIsNone(entry.get_admin_url())
+
+  def test_minor_not_major_constraint(self):
+    with self.assertRaises(IntegrityError):
+      reassign(Student.objects.all(), {'minor': self.physics})
+    self.assertFalse(Student.objects.filter(minor=self.physics).exists())
+    self.assertEqual(self.counts()[('Maths', 'minor', 'Cls 1')], 1)
+    with self.assertRaises(IntegrityError), transaction.atomic():
+      Student.objects.create(level='Cls 1', major=self.maths, minor=self.maths, **make_person_fields(9))
+
+  def test_admin_form_single_error(self):
+    request = RequestFactory().get('/')
+    request.user = self.user
+    form_class = site._registry[Student].get_form(request)
+    data = dict(make_person_fields(9), level='Cls 1', major='Maths', minor='Maths')
+    form = form_class(data)
+    self.assertFalse(form.is_valid())
+    self.assertEqual(form.errors.as_data(), {'__all__': form.errors.as_data()['__all__']})
+    self.assertEqual([str(error) for error in form.non_field_errors()], [str(SAME_DEPARTMENT_ERROR)])
+
+  def test_admin_action(self):
+    self.client.force_login(self.user)
+    url = reverse('admin:dataStore_student_changelist')
+    data = {'action': 'reassign_selected', 'select_across': '1', 'index': '0',
+      ACTION_CHECKBOX_NAME: [Student.objects.first().pk]}
+    response = self.client.post(url, data)
+    self.assertContains(response, 'the 6 selected')
+
+    data.pop('index')
+    response = self.client.post(url, dict(data, apply='1', major='Maths', minor='Maths'))
+    self.assertContains(response, 'have same department')
+    # the database refuses Physics as minor of the Physics majors.
+    response = self.client.post(url, dict(data, apply='1', minor='Physics'), follow=True)
+    self.assertContains(response, 'Nothing was changed')
+    response = self.client.post(url, dict(data, apply='1', major='Music'), follow=True)
+    self.assertContains(response, 'Reassigned 6 Students.')
+    self.assertEqual(Student.objects.filter(major=self.music).count(), 6)
+
+  def test_admin_action_on_search(self):
+    self.client.force_login(self.user)
+    url = reverse('admin:dataStore_student_changelist') + '?q=first1'
+    data = {'action': 'reassign_selected', 'select_across': '1', 'apply': '1', 'level': 'Cls 4',
+      ACTION_CHECKBOX_NAME: [Student.objects.first().pk]}
+    response = self.client.post(url, data, follow=True)
+    self.assertContains(response, 'Reassigned 1 Student.')
+    self.assertEqual(list(Student.objects.filter(level='Cls 4').values_list('first_name', flat=True)), ['first1'])
+    self.assertEqual(StudentRecord.objects.get(level='Cls 4').first_name, 'first1')
+
+
+
+
+class BulkAuditTest(TestCase):
+
+  """
+  Bulk actions on people write one admin log entry listing the primary keys,
+  still found by the history of each object.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.physics = Department.objects.create(name='Physics', phone_no='0', office_no=1, faculty=faculty)
+    cls.students = [
+      Student.objects.create(level='Cls 1', major=cls.physics, **make_person_fields(n)) for n in range(6)
+    ]
+
+  def test_compact_pks(self):
+    self.assertEqual(audit.compact_pks([9, 3, 1, 2, 3, 7, 8]), '1-3,7-9')
+    self.assertEqual(audit.parse_pks('1-3,7-9,12'), [(1, 3), (7, 9), (12, 12)])
+    self.assertEqual(audit.compact_pks([]), '')
+
+  def test_delete_selected(self):
+    self.client.force_login(self.user)
+    deleted = [student.pk for student in self.students if student is not self.students[2]]
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.post(reverse('admin:dataStore_student_changelist'), {
+        'action': 'delete_selected', 'post': 'yes', ACTION_CHECKBOX_NAME: deleted})
+    self.assertEqual(response.status_code, 302)
+    self.assertEqual(Student.objects.count(), 1)
+    inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "django_admin_log"')]
+    self.assertEqual(len(inserts), 1)
+
+    entry = LogEntry.objects.get()
+    self.assertEqual(entry.action_flag, DELETION)
+    self.assertTrue(entry.object_repr.startswith('5 Students: '))
+    self.assertEqual(json.loads(entry.change_message), [{'objects': audit.compact_pks(deleted)}])
+    for pk in deleted:
+      self.assertEqual(list(audit.history(Student, pk)), [entry])
+    self.assertFalse(audit.history(Student, self.students[2].pk).exists())
+
+    self.assertEqual(retention.delete_entries([entry.pk]), 1)
+    self.assertFalse(AuditRange.objects.exists())
+
+  def test_delete_selected_departments(self):
+    for n, name in enumerate(['Chemistry', 'Biology']):
+      Department.objects.create(name=name, phone_no='0', office_no=n, faculty=self.physics.faculty)
+    self.client.force_login(self.user)
+    with CaptureQueriesContext(connection) as queries:
+      self.client.post(reverse('admin:dataStore_department_changelist'), {
+        'action': 'delete_selected', 'post': 'yes', ACTION_CHECKBOX_NAME: ['Chemistry', 'Biology']})
+    self.assertFalse(Department.objects.filter(name__in=['Chemistry', 'Biology']).exists())
+    # an executemany() is recorded as "2 times: INSERT ...".
+    inserts = [q for q in queries.captured_queries if 'INSERT INTO "django_admin_log"' in q['sql']]
+    self.assertEqual(len(inserts), 1)
+
+    # departments are keyed by name: an entry each, found by Django's own history.
+    self.assertEqual(
+      sorted(LogEntry.objects.filter(action_flag=DELETION).values_list('object_id', 'object_repr')),
+      [('Biology', 'Biology'), ('Chemistry', 'Chemistry')])
+    self.assertEqual(audit.history(Department, 'Biology').count(), 1)
+    self.assertFalse(AuditRange.objects.exists())
+    self.assertEqual(DateRollup.objects.get(model='admin.logentry', period='year').count, 2)
+
+  def test_delete_one(self):
+    self.client.force_login(self.user)
+    student = self.students[0]
+    self.client.post(reverse('admin:dataStore_student_delete', args=[student.pk]), {'post': 'yes'})
+    entry = LogEntry.objects.get()
+    self.assertEqual((entry.object_id, entry.action_flag), (str(student.pk), DELETION))
+    self.assertFalse(AuditRange.objects.exists())
+
+  def test_history_view(self):
+    student = self.students[3]
+    LogEntry.objects.log_action(self.user.pk, ContentType.objects.get_for_model(Student).pk,
+      student.pk, str(student), ADDITION)
+    reassign(Student.objects.filter(pk__gte=student.pk), {'level': 'Cls 2'}, self.user)
+    self.client.force_login(self.user)
+    response = self.client.get(reverse('admin:dataStore_student_history', args=[student.pk]))
+    self.assertEqual(
+      [entry.action_flag for entry in response.context['action_list']], [ADDITION, CHANGE])
+    self.assertContains(response, 'Changed Class.')
+
+
+
+class DisplayExpressionTest(TestCase):
+
+  """
+  The display strings built by the database match the model methods, and
+  make the person list sortable on them.
+  """
+
+  def test_matches_python(self):
+    faculty = Faculty.objects.create(name='Med', dean='dean', phone_no='0')
+    Department.objects.create(name='child health', phone_no='0', office_no=1, faculty=faculty)
+    Student.objects.create(level='Cls 1', **dict(make_person_fields(1),
+      first_name='o\'neil', street="king's 2nd road", city='port-harcourt'))
+    Lecturer.objects.create(rank='Ast', salary='A', office_address='office', office_phone='0',
+      **make_person_fields(2))
+
+    for person in Person.objects.with_display():
+      self.assertEqual(person.full_name, person.fullName())
+      self.assertEqual(person.full_address, person.address())
+    for model in (Department, Faculty):
+      for obj in model.objects.with_display():
+        self.assertEqual(obj.display_name, str(obj))
+
+  def test_non_ascii_names(self):
+    Student.objects.create(level='Cls 1', **dict(make_person_fields(1),
+      first_name='élodie', middle_name='straße', last_name='øyvind'))
+    person = Person.objects.with_display().get()
+    self.assertEqual(person.full_name, 'ÉLODIE STRASSE ØYVIND')
+    self.assertEqual(person.full_name, person.fullName())
+    self.assertTrue(Person.objects.with_display().filter(full_name__startswith='ÉLODIE').exists())
+    self.assertEqual(StudentRecord.objects.get().full_name, person.full_name)
+
+  def test_sortable_columns(self):
+    for n, name in enumerate(['bola', 'ada', 'chi']):
+      Person.objects.create(**dict(make_person_fields(n), first_name='f', middle_name='m', last_name=name))
+    self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+    response = self.client.get(reverse('admin:dataStore_person_changelist'), {'o': '-1'})
+    self.assertEqual([p.last_name for p in response.context['cl'].result_list], ['chi', 'bola', 'ada'])
+
+
+
+
+class AutocompleteTest(TestCase):
+
+  """
+  Department and faculty pickers are served from the in-memory index, which
+  follows writes.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Med', dean='dean', phone_no='0')
+    for n, name in enumerate(['child health', 'anatomy', 'chemistry']):
+      Department.objects.create(name=name, phone_no='0', office_no=n, faculty=faculty)
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def complete(self, term, field='major', model='student'):
+    response = self.client.get(reverse('app:autocomplete'), {
+      'term': term, 'app_label': 'dataStore', 'model_name': model, 'field_name': field,
+    })
+    self.assertEqual(response.status_code, 200)
+    return [result['text'] for result in response.json()['results']]
+
+  def test_prefix_matches_from_index(self):
+    self.assertEqual(self.complete('ch'), ['Chemistry', 'Child Health'])
+    self.assertEqual(self.complete('HEAL'), ['Child Health'])
+    self.assertEqual(self.complete('medic', 'faculty', 'department'), ['faculty of Medicine'])
+    with CaptureQueriesContext(connection) as queries:
+      self.assertEqual(self.complete(''), ['Anatomy', 'Chemistry', 'Child Health'])
+    self.assertFalse([q for q in queries.captured_queries if 'dataStore_department' in q['sql']])
+
+    Department.objects.create(name='chest medicine', phone_no='0', office_no=9,
+      faculty=Faculty.objects.get())
+    self.assertEqual(self.complete('che'), ['Chemistry', 'Chest Medicine'])
+
+  def test_widget_and_permissions(self):
+    response = self.client.get(reverse('admin:dataStore_student_add'))
+    self.assertContains(response, 'data-ajax--url="%s"' % reverse('app:autocomplete'))
+
+    self.client.logout()
+    response = self.client.get(reverse('app:autocomplete'), {
+      'term': 'ch', 'app_label': 'dataStore', 'model_name': 'student', 'field_name': 'major',
+    })
+    self.assertEqual(response.status_code, 302)
+
+
+
+
+class LogRetentionTest(TestCase):
+
+  """
+  Old admin log entries are archived and deleted in batches, and the audit
+  list filters stay small.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    cls.other = User.objects.create_user('other', is_staff=True)
+    content_type = ContentType.objects.get_for_model(Student)
+    for n in range(5):
+      LogEntry.objects.create(user=cls.user if n % 2 else cls.other, content_type=content_type,
+        object_id=n, object_repr='row %s' % n, action_flag=ADDITION, change_message='[]')
+    cls.old = timezone.now() - datetime.timedelta(days=400)
+    LogEntry.objects.filter(object_id__in=['0', '1', '2']).update(action_time=cls.old)
+    call_command('rebuild_rollups', stdout=io.StringIO())
+
+  def test_archive_old_entries(self):
+    with tempfile.TemporaryDirectory() as directory:
+      out = io.StringIO()
+      call_command('archive_log_entries', days=365, batch_size=2, output_dir=directory, stdout=out)
+      self.assertIn('Archived 3 log entries', out.getvalue())
+      [path] = os.listdir(directory)
+      with gzip.open(os.path.join(directory, path), 'rt') as stream:
+        rows = [json.loads(line) for line in stream]
+
+    self.assertEqual(sorted(row['object_repr'] for row in rows), ['row 0', 'row 1', 'row 2'])
+    self.assertEqual(rows[0]['content_type__model'], 'student')
+    self.assertEqual(parse_datetime(rows[0]['action_time']), self.old)
+    self.assertEqual(LogEntry.objects.count(), 2)
+    self.assertFalse(DateRollup.objects.filter(model='admin.logentry', count__lt=0).exists())
+    self.assertEqual(sum(DateRollup.objects.filter(model='admin.logentry', period='year')
+      .values_list('count', flat=True)), 2)
+
+    out = io.StringIO()
+    call_command('archive_log_entries', dry_run=True, stdout=out)
+    self.assertIn('0 log entries', out.getvalue())
+
+  def test_audit_filters(self):
+    self.client.force_login(self.user)
+    url = reverse('admin:admin_logentry_changelist')
+    User.objects.create_user('idle', is_staff=True)
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get(url, {'action_flag__exact': ADDITION})
+    self.assertContains(response, '<option value="other">')
+    self.assertNotContains(response, '<option value="idle">')
+    suggestions = [q['sql'] for q in queries.captured_queries if 'EXISTS' in q['sql']]
+    self.assertEqual(len(suggestions), 1)
+    self.assertIn('LIMIT 50', suggestions[0])
+    self.assertContains(response, '<input type="hidden" name="action_flag__exact" value="1">')
+
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get(url, {'username': 'other'})
+    self.assertEqual(response.context['cl'].result_count, 3)
+    # the date hierarchy of a filtered list probes the indexes.
+    self.assertFalse([q for q in queries.captured_queries if 'DISTINCT' in q['sql']])
+    for year in {self.old.year, timezone.now().year}:
+      self.assertContains(response, 'action_time__year=%s' % year)
+    response = self.client.get(url, {'username': 'other', 'action_time__year': self.old.year})
+    self.assertContains(response, 'action_time__month=%s&amp;' % timezone.localtime(self.old).month)
+    content_type = ContentType.objects.get_for_model(Student)
+    response = self.client.get(url, {'content_type': content_type.pk, 'username': 'admin'})
+    self.assertEqual(response.context['cl'].result_count, 2)
+
+
+
+
+class SessionTest(TestCase):
+
+  """
+  Cached sessions spare the session table, and expired ones are purged in batches.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+  @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+  def test_cached_sessions(self):
+    self.client.force_login(self.user)
+    url = reverse('admin:index')
+    self.client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+      self.assertEqual(self.client.get(url).status_code, 200)
+    self.assertFalse([q for q in queries.captured_queries if 'django_session' in q['sql']])
+
+  def test_purge_expired_sessions(self):
+    for n in range(5):
+      Session.objects.create(session_key='expired%s' % n, session_data='',
+        expire_date=timezone.now() - datetime.timedelta(days=1))
+    Session.objects.create(session_key='current', session_data='',
+      expire_date=timezone.now() + datetime.timedelta(days=1))
+    out = io.StringIO()
+    with CaptureQueriesContext(connection) as queries:
+      call_command('purge_sessions', batch_size=2, stdout=out)
+    self.assertIn('Deleted 5 expired sessions', out.getvalue())
+    self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('DELETE')]), 3)
+    self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['current'])
+
+    with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'):
+      out = io.StringIO()
+      call_command('purge_sessions', stdout=out)
+      self.assertIn('nothing to purge', out.getvalue())
+
+
+
+
+class FailingEmailBackend(mail.backends.base.BaseEmailBackend):
+
+  def send_messages(self, email_messages):
+    raise OSError('connection refused')
+
+
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+
+  "A local SMTP server that accepts every message and counts connections."
+
+  allow_reuse_address = True
+  daemon_threads = True
+
+  def __init__(self):
+    self.connections = 0
+    self.messages = []
+    super().__init__(('127.0.0.1', 0), SMTPHandler)
+
+
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    self.server.connections += 1
+    self.wfile.write(b'220 stand-in\r\n')
+    while line := self.rfile.readline():
+      command = line[:4].upper()
+      if command == b'DATA':
+        self.wfile.write(b'354 go on\r\n')
+        data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+        self.server.messages.append(data)
+      elif command == b'QUIT':
+        self.wfile.write(b'221 bye\r\n')
+        return
+      self.wfile.write(b'250 ok\r\n')
+
+
+
+
+@override_settings(EMAIL_BACKEND='dataStore.mail.QueuedEmailBackend',
+  DATASTORE_MAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailQueueTest(TestCase):
+
+  """
+  Requests only queue their mail, which the worker sends in batches, with
+  retries further and further apart.
+  """
+
+  def test_password_reset_is_queued(self):
+    User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+    response = self.client.post(reverse('admin_password_reset'), {'email': 'staff@example.com'})
+    self.assertEqual(response.status_code, 302)
+    self.assertEqual(mail.outbox, [])
+    self.assertEqual(QueuedMail.objects.get().recipients, ['staff@example.com'])
+
+    out = io.StringIO()
+    call_command('send_queued_mail', stdout=out)
+    self.assertIn('Sent 1 messages', out.getvalue())
+    [message] = mail.outbox
+    self.assertEqual(message.to, ['staff@example.com'])
+    self.assertIn('/reset/', message.body)
+    self.assertFalse(QueuedMail.objects.exists())
+
+  @override_settings(DATASTORE_MAIL_BACKEND='dataStore.tests.FailingEmailBackend', DATASTORE_MAIL_MAX_ATTEMPTS=2)
+  def test_retry_with_backoff(self):
+    mail.send_mail('Hello', 'body', 'from@example.com', ['to@example.com'])
+    with self.assertLogs('dataStore.mail', 'WARNING'):
+      self.assertEqual(send_batch(), (0, 1))
+    row = QueuedMail.objects.get()
+    self.assertEqual((row.status, row.attempts, row.last_error), ('queued', 1, 'connection refused'))
+    self.assertGreater(row.send_after, timezone.now() + datetime.timedelta(seconds=50))
+    self.assertEqual(send_batch(), (0, 0))
+
+    QueuedMail.objects.update(send_after=timezone.now())
+    with self.assertLogs('dataStore.mail', 'WARNING'):
+      self.assertEqual(send_batch(), (0, 1))
+    self.assertEqual(QueuedMail.objects.get().status, 'failed')
+
+  def test_smtp_batch_reuses_the_connection(self):
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    self.addCleanup(server.server_close)
+    self.addCleanup(server.shutdown)
+    for n in range(3):
+      mail.send_mail('Message %s' % n, 'body %s' % n, 'from@example.com', ['to%s@example.com' % n])
+
+    with override_settings(DATASTORE_MAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1', EMAIL_PORT=server.server_address[1], EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD=''):
+      self.assertEqual(send_batch(), (3, 0))
+    self.assertEqual(server.connections, 1)
+    self.assertIn(b'Subject: Message 2', server.messages[2])
+
+
+
+
+class TemplateWarmupTest(SimpleTestCase):
+
+  def test_warm_up_fills_the_cached_loader(self):
+    engine = engines['django'].engine
+    [loader] = engine.template_loaders
+    self.assertIsInstance(loader, CachedLoader)
+    loader.reset()
+
+    compiled, failed = warm_templates()
+    self.assertGreater(compiled, 50)
+    cached = {name for name, value in loader.get_template_cache.items() if not isinstance(value, type)}
+    # the admin templates, and the app template the dataStore one extends.
+    for name in ('admin/change_list.html', 'admin/base_site.html', 'admin_interface:admin/base_site.html'):
+      self.assertTrue(any(key.startswith(name) for key in cached), name)
+    self.assertEqual(uncached_loaders(settings.TEMPLATES[0]['OPTIONS']['loaders'])[0], 'apptemplates.Loader')
+
+
+
+
+class StaticFilesTest(SimpleTestCase):
+
+  """
+  collectstatic writes hashed, precompressed files which the index serves
+  by Accept-Encoding, with far future caching for the hashed names.
+  """
+
+  def test_collect_and_serve(self):
+    with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, STORAGES={
+        **settings.STORAGES, 'staticfiles': {'BACKEND': 'dataStore.staticfiles.CompressedManifestStaticFilesStorage'}}):
+      call_command('collectstatic', interactive=False, verbosity=0)
+      with open(os.path.join(root, 'staticfiles.json')) as stream:
+        hashed = json.load(stream)['paths']['admin/css/base.css']
+      self.assertNotEqual(hashed, 'admin/css/base.css')
+      self.assertTrue(os.path.exists(os.path.join(root, hashed + '.gz')))
+      index = StaticIndex(root)
+
+      factory = RequestFactory()
+      response = index.response(factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), hashed)
+      body = b''.join(response.streaming_content)
+      self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+      self.assertEqual(response.headers['Content-Type'], 'text/css')
+      self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+      self.assertIn('immutable', response.headers['Cache-Control'])
+      with open(os.path.join(root, hashed), 'rb') as stream:
+        self.assertEqual(gzip.decompress(body), stream.read())
+
+      plain = index.response(factory.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0'), 'admin/css/base.css')
+      self.assertNotIn('Content-Encoding', plain.headers)
+      self.assertEqual(plain.headers['Cache-Control'], 'public, max-age=60')
+      plain.file_to_stream.close()
+
+      cached = index.response(factory.get('/', HTTP_ACCEPT_ENCODING='gzip',
+        HTTP_IF_NONE_MATCH=response.headers['ETag']), hashed)
+      self.assertEqual(cached.status_code, 304)
+      self.assertIsNone(index.response(factory.get('/'), 'admin/css/missing.css'))
+
+
+
+
+class IndexViewTest(TestCase):
+
+  """
+  The landing page caches the theme logo and answers conditional requests.
+  """
+
+  def setUp(self):
+    clear_logo_cache()
+    self.url = reverse('app:index')
+
+  def test_logo_is_cached_until_the_theme_is_saved(self):
+    theme = Theme.objects.get_active()
+    theme.logo = 'admin-interface/logo/first.png'
+    theme.save()
+    self.assertContains(self.client.get(self.url), 'admin-interface/logo/first.png')
+    with self.assertNumQueries(0):
+      self.client.get(self.url)
+
+    theme.logo = 'admin-interface/logo/second.png'
+    theme.save()
+    self.assertContains(self.client.get(self.url), 'admin-interface/logo/second.png')
+
+  def test_conditional_get(self):
+    response = self.client.get(self.url)
+    self.assertTrue(response.has_header('ETag'))
+    self.assertTrue(response.has_header('Last-Modified'))
+
+    etag = response['ETag']
+    response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(response.status_code, 304)
+
+    theme = Theme.objects.get_active()
+    theme.logo = 'admin-interface/logo/new.png'
+    theme.save()
+    response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(response.status_code, 200)
+
+  async def test_async_index(self):
+    request = AsyncRequestFactory().get(self.url)
+    request.LANGUAGE_CODE = 'en'
+    response = await aindex(request)
+    self.assertEqual(response.status_code, 200)
+
+    request = AsyncRequestFactory().get(self.url, headers={'if-none-match': response['ETag']})
+    request.LANGUAGE_CODE = 'en'
+    self.assertEqual((await aindex(request)).status_code, 304)
+
+
+
+
+class ReadModelTest(TestCase):
+
+  """
+  The student and lecturer read models follow every write, and the checker
+  finds and repairs drift.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    faculty = Faculty.objects.create(name='Sci', dean='dean', phone_no='0')
+    cls.physics = Department.objects.create(name='Physics', phone_no='0',
+      office_no=1, faculty=faculty)
+
+  def test_records_follow_writes(self):
+    student = Student.objects.create(level='Cls 1', minor=self.physics, **make_person_fields(1))
+    record = StudentRecord.objects.get(pk=student.pk)
+    self.assertEqual(record.full_name, student.fullName())
+    self.assertEqual(record.address, student.address())
+    self.assertEqual(record.minor, 'Physics')
+
+    person = Person.objects.get(pk=student.pk)
+    person.first_name = 'renamed'
+    person.save()
+    self.assertEqual(StudentRecord.objects.get(pk=student.pk).first_name, 'renamed')
+
+    self.physics.delete()
+    self.assertIsNone(StudentRecord.objects.get(pk=student.pk).minor)
+
+    student.delete()
+    self.assertFalse(StudentRecord.objects.exists())
+
+  def test_bulk_inserts_write_records(self):
+    bulk_create_people(Lecturer, [
+      Lecturer(rank='Ast', salary='A', office_address='office', office_phone='0',
+        department=self.physics, **make_person_fields(n))
+      for n in range(3)
+    ])
+    self.assertEqual(LecturerRecord.objects.filter(department='Physics').count(), 3)
+
+  def test_check_and_repair(self):
+    students = [Student.objects.create(level='Cls 1', **make_person_fields(n)) for n in range(5)]
+    StudentRecord.objects.filter(pk=students[0].pk).delete()
+    StudentRecord.objects.filter(pk=students[1].pk).update(full_name='wrong')
+    StudentRecord.objects.create(**dict(make_person_fields(9), id=999, time=timezone.now(),
+      level='Cls 1', full_name='', address=''))
+
+    with self.assertRaises(CommandError):
+      call_command('check_read_models', chunk_size=2, stdout=io.StringIO())
+    out = io.StringIO()
+    call_command('check_read_models', repair=True, chunk_size=2, stdout=out)
+    self.assertIn('1 missing, 1 stale, 1 orphan', out.getvalue())
+    call_command('check_read_models', stdout=io.StringIO())
+
+  def test_record_changelist_scans_one_table(self):
+    Student.objects.create(level='Cls 1', **make_person_fields(1))
+    self.client.force_login(self.user)
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get(reverse('admin:dataStore_studentrecord_changelist'))
+    self.assertContains(response, reverse('admin:dataStore_student_change',
+      args=[Student.objects.get().pk]))
+    page = [q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql']]
+    self.assertTrue(page)
+    self.assertFalse([sql for sql in page if 'JOIN' in sql])
+
+
+
+
+class SeedAndBenchmarkTest(TestCase):
+
+  def test_seed_is_reproducible(self):
+    call_command('seed_college', students=20, lecturers=5, log_entries=30, seed=3, stdout=io.StringIO())
+    self.assertEqual(Student.objects.count(), 20)
+    self.assertEqual(Lecturer.objects.count(), 5)
+    self.assertEqual(LogEntry.objects.count(), 30)
+    self.assertEqual(StudentRecord.objects.count(), 20)
+    names = list(Person.objects.order_by('pk').values_list('first_name', 'last_name'))
+
+    Person.objects.all().delete()
+    call_command('seed_college', students=20, lecturers=5, log_entries=0, seed=3, stdout=io.StringIO())
+    self.assertEqual(list(Person.objects.order_by('pk').values_list('first_name', 'last_name')), names)
+
+  def test_benchmark_report(self):
+    User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    call_command('seed_college', students=20, lecturers=5, log_entries=30, stdout=io.StringIO())
+    out = io.StringIO()
+    call_command('benchmark_college', requests=2, warmup=0, only=['student'], stdout=out)
+    report = json.loads(out.getvalue())
+    self.assertEqual(report['rows']['dataStore.Student'], 20)
+    self.assertTrue(report['scenarios'])
+    for scenario in report['scenarios']:
+      self.assertIn('student', scenario['name'])
+      self.assertEqual(scenario['status'], [200])
+      self.assertLessEqual(scenario['p50_ms'], scenario['p99_ms'])
+      self.assertGreater(scenario['queries'], 0)
+
+
+
+
+class RequestTimingTest(TestCase):
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+  def setUp(self):
+    self.client.force_login(self.user)
+    self.url = reverse('admin:dataStore_person_changelist')
+    self.client.get(self.url)
+
+  @override_settings(DATASTORE_TIMING_SAMPLE_RATE=1)
+  def test_server_timing(self):
+    header = self.client.get(self.url).headers['Server-Timing']
+    names = [metric.split(';')[0] for metric in header.split(', ')]
+    self.assertEqual(names, ['db', 'view', 'template', 'total'])
+    self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+
+  @override_settings(DATASTORE_TIMING_SAMPLE_RATE=1)
+  async def test_server_timing_under_asgi(self):
+    await self.async_client.aforce_login(self.user)
+    header = (await self.async_client.get(self.url)).headers['Server-Timing']
+    self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+    self.assertIn('template;dur=', header)
+
+  @override_settings(DATASTORE_TIMING_SAMPLE_RATE=0)
+  def test_unsampled(self):
+    self.assertNotIn('Server-Timing', self.client.get(self.url).headers)
+
+  @override_settings(DATASTORE_TIMING_SAMPLE_RATE=1, DATASTORE_SLOW_REQUEST_MS=0)
+  def test_slow_request_log(self):
+    with self.assertLogs('dataStore.timing', 'WARNING') as logs:
+      self.client.get(self.url)
+    record = json.loads(logs.records[0].getMessage())
+    self.assertEqual(record['path'], self.url)
+    self.assertEqual(record['status'], 200)
+    self.assertEqual(len(record['slowest']), min(5, record['queries']))
+    self.assertEqual(record['duplicates'], [])
+
+  def test_duplicate_queries(self):
+    recorder = QueryRecorder()
+    recorder.queries = [('SELECT a WHERE id = %s', 1, 'default')] * 6 + [('SELECT b', 9, 'default')]
+    self.assertEqual(recorder.duplicates(5), {'SELECT a WHERE id = %s': 6})
+    self.assertEqual(recorder.slowest(1), [('SELECT b', 9, 'default')])
+
+
+
+
+class SQLiteProfileTest(TestCase):
+
+  def test_pragmas_are_applied(self):
+    values = sqlite.read_pragmas(connection, ['cache_size', 'temp_store', 'busy_timeout'])
+    self.assertEqual(values, {'cache_size': -64000, 'temp_store': 2, 'busy_timeout': 5000})
+
+  def test_no_maintenance_inside_a_transaction(self):
+    connection.datastore_maintenance_due = 0
+    sqlite.maintain_due_connections()
+    self.assertEqual(connection.datastore_maintenance_due, 0)
+
+
+
+
+@override_settings(DATASTORE_READ_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+
+  def setUp(self):
+    self.router = ReplicaRouter()
+    self.token = routers.pinned.set(None)
+    self.addCleanup(routers.pinned.reset, self.token)
+
+  def test_reads_go_to_the_replicas_until_a_write(self):
+    self.assertEqual(self.router.db_for_read(Student), 'replica')
+    self.assertEqual(self.router.db_for_read(LogEntry), 'replica')
+    self.assertIsNone(self.router.db_for_read(User))
+    self.assertEqual(self.router.db_for_write(Student), 'default')
+    self.assertEqual(self.router.db_for_read(Student), 'replica')
+    routers.pin_to_primary()
+    self.assertEqual(self.router.db_for_read(Student), 'default')
+
+  def test_no_migrations_on_replicas(self):
+    self.assertIs(self.router.allow_migrate('replica', 'dataStore'), False)
+    self.assertIsNone(self.router.allow_migrate('default', 'dataStore'))
+
+  def test_pin_cookie(self):
+    def view(request):
+      return HttpResponse(self.router.db_for_read(Student))
+
+    middleware = ReplicaPinningMiddleware(view)
+    factory = RequestFactory()
+    response = middleware(factory.post('/'))
+    self.assertEqual(response.content, b'default')
+    self.assertEqual(response.cookies['datastore_primary']['max-age'], 5)
+
+    request = factory.get('/')
+    request.COOKIES['datastore_primary'] = '1'
+    response = middleware(request)
+    self.assertEqual(response.content, b'default')
+    self.assertNotIn('datastore_primary', response.cookies)
+    self.assertEqual(middleware(factory.get('/')).content, b'replica')
+
+
+
+
+class ReplicaPinningTest(TestCase):
+
+  """
+  Writes pin the reads of the request to the primary, rendering a form doesn't.
+  """
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    cls.student = Student.objects.create(level='Cls 1', **make_person_fields(1))
+
+  def pinned_after(self, view):
+    "Return why the reads of a GET still go to the primary once view(request) ran."
+    def pin(request):
+      view(request)
+      return HttpResponse(str(routers.pinned.get()))
+    request = RequestFactory().get('/')
+    request.user = self.user
+    return ReplicaPinningMiddleware(pin)(request).content.decode()
+
+  def test_change_form_get(self):
+    change_view = site._registry[Student].change_view
+    self.assertEqual(self.pinned_after(lambda request: change_view(request, str(self.student.pk)).render()), 'None')
+    self.assertEqual(self.pinned_after(lambda request: self.student.save()), 'write')
+
+
+
+
+class ApiTest(TestCase):
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    call_command('seed_college', students=45, lecturers=5, log_entries=0, stdout=io.StringIO())
+    # people created in the same instant are sorted by id.
+    Person.objects.filter(pk__lte=10).update(time=timezone.now())
+    StudentRecord.objects.filter(pk__lte=10).update(time=timezone.now())
+
+  def setUp(self):
+    self.client.force_login(self.user)
+
+  def test_pages_cover_every_row_once(self):
+    url, ids = reverse('api:students') + '?limit=10&fields=id,level', []
+    while url:
+      with CaptureQueriesContext(connection) as queries:
+        page = self.client.get(url).json()
+      self.assertNotIn('OFFSET', queries.captured_queries[-1]['sql'])
+      self.assertTrue(all(set(row) == {'id', 'level'} for row in page['results']))
+      ids += [row['id'] for row in page['results']]
+      url = page['next']
+    self.assertEqual(sorted(ids), sorted(Student.objects.values_list('pk', flat=True)))
+    self.assertEqual(len(ids), len(set(ids)))
+
+  def test_filters_match_the_admin(self):
+    for name, model in (('students', Student), ('lecturers', Lecturer), ('departments', Department)):
+      self.assertEqual(api.RESOURCES[name].filters, tuple(site._registry[model].list_filter))
+
+    response = self.client.get(reverse('api:departments'), {'faculty__name': 'Sci', 'fields': 'name,faculty'})
+    rows = response.json()['results']
+    self.assertEqual(rows, sorted(rows, key=lambda row: row['name']))
+    self.assertEqual({row['faculty'] for row in rows}, {'Sci'})
+
+  def test_bad_requests(self):
+    url = reverse('api:students')
+    for params in ({'fields': 'id,password'}, {'limit': 'all'}, {'cursor': 'nope'}):
+      self.assertEqual(self.client.get(url, params).status_code, 400)
+    self.client.logout()
+    self.assertEqual(self.client.get(url).status_code, 403)
+
+  def test_tampered_cursors(self):
+    cursors = [
+      ('students', ['2024-13-45T00:00:00+00:00', 1]),
+      ('students', ['2024-01-01T00:00:00+00:00', 'abc']),
+      ('students', [None, 1]),
+      ('faculties', [['Sci']]),
+    ]
+    for name, values in cursors:
+      response = self.client.get(reverse('api:%s' % name), {'cursor': api.encode_cursor(values)})
+      self.assertEqual(response.status_code, 400, values)
+      self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
@@ -1,8 +1,12 @@
-from django.urls import path
-from . import views
-
-urlpatterns = [
-  
-  path('', views.index, name='index'),
-  
+from django.conf import settings
+from django.urls import path
+from . import views
+from .autocomplete import autocomplete_view
+
+urlpatterns = [
+  
+  path('', views.aindex if settings.DATASTORE_ASYNC_VIEWS else views.index, name='index'),
+  
+  path('autocomplete/', autocomplete_view, name='autocomplete'),
+  
 ]
\ No newline at end of file
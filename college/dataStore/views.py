@@ -1,21 +1,97 @@
+import hashlib
+import time
+
+from admin_interface.models import Theme
+from django.core.cache import cache
+from django.db import DatabaseError
 from django.shortcuts import render
-from django.http import HttpResponse
-from django.db import connection
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+
+
+LOGO_CACHE_KEY = 'datastore:index-logo'
+
+# seconds a process trusts its own copy before asking the shared cache again.
+LOGO_LOCAL_TIMEOUT = 30
+
+_local_logo = {}
+
+
+def local_logo():
+   entry = _local_logo.get('entry')
+   if entry and entry['expires'] > time.monotonic():
+      return entry
+   return None
+
+
+def keep_logo(entry):
+   _local_logo['entry'] = dict(entry, expires=time.monotonic() + LOGO_LOCAL_TIMEOUT)
+   return _local_logo['entry']
+
+
+def active_logo():
+   """
+   Return the logo of the active admin-interface theme and when it was looked
+   up, as a dict. It is kept in process and in the shared cache until a theme
+   is saved or deleted.
+   """
+   entry = local_logo() or cache.get(LOGO_CACHE_KEY)
+   if entry is None:
+      try:
+         logo = Theme.objects.filter(active=True).values_list('logo', flat=True).first()
+      except DatabaseError:
+         # the admin-interface tables are not migrated yet.
+         return {'logo': '', 'modified': timezone.now()}
+      entry = {'logo': logo or '', 'modified': timezone.now().replace(microsecond=0)}
+      cache.set(LOGO_CACHE_KEY, entry, None)
+   return keep_logo(entry)
+
+
+async def aactive_logo():
+   "active_logo() with the async cache and ORM."
+   entry = local_logo() or await cache.aget(LOGO_CACHE_KEY)
+   if entry is None:
+      try:
+         logo = await Theme.objects.filter(active=True).values_list('logo', flat=True).afirst()
+      except DatabaseError:
+         return {'logo': '', 'modified': timezone.now()}
+      entry = {'logo': logo or '', 'modified': timezone.now().replace(microsecond=0)}
+      await cache.aset(LOGO_CACHE_KEY, entry, None)
+   return keep_logo(entry)
+
+
+def clear_logo_cache():
+   cache.delete(LOGO_CACHE_KEY)
+   _local_logo.clear()
+
+
+def index_response(request, entry):
+   """
+   Render the index page with the logo entry, or answer 304 to a conditional
+   request, as @condition would.
+   """
+   text = '%s:%s' % (entry['logo'], request.LANGUAGE_CODE)
+   etag = quote_etag(hashlib.md5(text.encode()).hexdigest())
+   last_modified = int(entry['modified'].timestamp())
+
+   response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+   if response is None:
+      response = render(request, 'index.html', {"logo": entry['logo']})
+   response.headers.setdefault('ETag', etag)
+   response.headers.setdefault('Last-Modified', http_date(last_modified))
+   return response
 
 
 
 # return the index page
+@cache_control(no_cache=True)
 def index(request):
-   try:
-      # select company recently uploaded logo.
-      with connection.cursor() as cursor:
-        cursor.execute("SELECT logo FROM admin_interface_theme")
-        path = cursor.fetchone()
-        path = path[0]
-        print(path)
-
-   except:
-      path = 0
-  
-  
-   return render(request, 'index.html', {"logo": path})
\ No newline at end of file
+   return index_response(request, active_logo())
+
+
+# the index page for ASGI deployments, see DATASTORE_ASYNC_VIEWS.
+@cache_control(no_cache=True)
+async def aindex(request):
+   return index_response(request, await aactive_logo())
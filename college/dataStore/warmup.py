@@ -0,0 +1,80 @@
+"""
+Template warm-up for the worker processes.
+
+The template loaders are wrapped in Django's cached loader, so a template is
+read and compiled once per process. :func:`warm_templates` compiles the
+templates of the admin and of dataStore up front, with the parents and
+includes they name, so the first requests of a worker don't pay for it.
+``college/wsgi.py`` and ``college/asgi.py`` call it at start; with a
+preloading server (``gunicorn --preload``) the forked workers share the
+compiled templates.
+"""
+
+
+from pathlib import Path
+
+from django.apps import apps
+from django.template import engines, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+# apps whose templates are compiled at start.
+WARM_APPS = ('admin', 'admin_interface', 'dataStore')
+
+
+def uncached_loaders(loaders):
+  "Return the loaders of a TEMPLATES entry without the cached loader around them."
+  unwrapped = []
+  for loader in loaders:
+    if isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER:
+      unwrapped.extend(loader[1])
+    else:
+      unwrapped.append(loader)
+  return unwrapped
+
+
+def template_names(app_labels=WARM_APPS):
+  "Yield the name of each .html template shipped by the given apps."
+  for label in app_labels:
+    try:
+      root = Path(apps.get_app_config(label).path) / 'templates'
+    except LookupError:
+      continue
+    for path in sorted(root.rglob('*.html')):
+      yield path.relative_to(root).as_posix()
+
+
+def named_templates(template):
+  "Yield the constant template names a template extends or includes."
+  for node_type, attribute in ((ExtendsNode, 'parent_name'), (IncludeNode, 'template')):
+    for node in template.nodelist.get_nodes_by_type(node_type):
+      name = getattr(node, attribute).var
+      if isinstance(name, str):
+        yield name
+
+
+def warm_templates(app_labels=WARM_APPS, using='django'):
+  """
+  Compile the templates of the given apps into the cached loader of the
+  engine. Return (compiled, failed) counts; templates made for other
+  engines or missing a parent count as failed.
+  """
+  engine = engines[using].engine
+  pending = list(template_names(app_labels))
+  seen = set()
+  compiled = failed = 0
+  while pending:
+    name = pending.pop()
+    if name in seen:
+      continue
+    seen.add(name)
+    try:
+      template = engine.get_template(name)
+    except (TemplateDoesNotExist, TemplateSyntaxError):
+      failed += 1
+      continue
+    compiled += 1
+    pending.extend(named_templates(template))
+  return compiled, failed